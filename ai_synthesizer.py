@@ -1,16 +1,28 @@
 import json
 import time
-import google.generativeai as genai
+import threading
 from pydantic import ValidationError
 
 from config import logger, GEMINI_API_KEY, GEMINI_MODEL, TIMEZONE
 from utils import NewsItem, get_week_date_range
+from models import Newsletter, Alert, SECTION_MODELS, compute_stats
+import instrumentation
 
-# Configure Gemini
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    logger.warning("GEMINI_API_KEY is not set. AI synthesis will fail or use fallback.")
+_genai = None
+_genai_lock = threading.Lock()
+
+def get_genai():
+    """Imports and configures google.generativeai on first use; it is slow to import."""
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            if GEMINI_API_KEY:
+                genai.configure(api_key=GEMINI_API_KEY)
+            else:
+                logger.warning("GEMINI_API_KEY is not set. AI synthesis will fail or use fallback.")
+            _genai = genai
+    return _genai
 
 SYSTEM_PROMPT = """
 You are a professional cybersecurity intelligence analyst writing an executive weekly newsletter.
@@ -26,6 +38,7 @@ STRICT RULES — VIOLATIONS ARE NOT ACCEPTABLE:
 8. Output ONLY valid JSON matching the schema provided. No markdown, no prose, no preamble.
 
 INPUT DATA FORMAT: JSON array of news items with fields: source_name, title, summary, url, published_date, severity, cve_ids, category, language, region
+(and, for items with known CVEs: cvss, known_exploited, affected_products — copy affected_products verbatim)
 
 OUTPUT SCHEMA (return only this JSON, nothing else):
 {
@@ -85,7 +98,7 @@ OUTPUT SCHEMA (return only this JSON, nothing else):
 }
 """
 
-def generate_fallback_digest(items: list[NewsItem]) -> dict:
+def generate_fallback_digest(items: list[NewsItem], period: str = None) -> Newsletter:
     """Fallback if AI fails. Creates raw digest from items."""
     logger.warning("Using RAW DIGEST mode — AI synthesis unavailable")
     
@@ -99,16 +112,17 @@ def generate_fallback_digest(items: list[NewsItem]) -> dict:
     criticals = []
     vulns = []
     latam = []
-    cves_set = set()
     
     for item in sorted_items:
-        cves_set.update(item.cve_ids)
         entry = {
             "title": item.title,
             "severity": item.severity,
             "description": item.summary,
             "cve_ids": item.cve_ids,
-            "affected_products": [],
+            "affected_products": item.affected_products,
+            "cvss": item.cvss,
+            "kev": item.kev,
+            "cwe_ids": item.cwe_ids,
             "source_name": item.source_name,
             "source_url": item.url
         }
@@ -120,92 +134,120 @@ def generate_fallback_digest(items: list[NewsItem]) -> dict:
         else:
             vulns.append(entry)
 
-    return {
-        "week_label": f"Week of {get_week_date_range(TIMEZONE)} (RAW DIGEST MODE)",
+    return Newsletter.model_validate({
+        "week_label": f"Week of {period or get_week_date_range(TIMEZONE)} (RAW DIGEST MODE)",
         "executive_summary": "RAW DIGEST — AI SYNTHESIS UNAVAILABLE.",
         "critical_alerts": criticals[:5],
         "vulnerabilities_and_patches": vulns[:5],
         "breaches_and_incidents": [],
         "latam_venezuela_intelligence": latam[:5],
         "recommended_actions": [],
-        "stats": {
-            "total_items_analyzed": len(items),
-            "critical_count": sum(1 for i in items if i.severity == "CRITICAL"),
-            "high_count": sum(1 for i in items if i.severity == "HIGH"),
-            "medium_count": sum(1 for i in items if i.severity == "MEDIUM"),
-            "sources_scraped": len(set(i.source_name for i in items)),
-            "cves_identified": len(cves_set)
-        }
-    }
+        "stats": compute_stats(items)
+    })
+
+
+def _apply_index_data(entry: Alert, item: NewsItem):
+    """CVE index facts of the source item replace whatever the model wrote for them."""
+    if item.cvss is not None or item.kev:
+        entry.severity = item.severity
+    entry.cvss, entry.kev, entry.cwe_ids = item.cvss, item.kev, item.cwe_ids
+    if item.affected_products:
+        entry.affected_products = item.affected_products
+
+def validate_newsletter(raw: dict, items: list[NewsItem]) -> Newsletter:
+    """
+    Single pass over the LLM output: every section entry is type-checked and
+    dropped if its source_url was not part of the input (anti-hallucination).
+    Stats are recomputed locally from the input items.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f"AI output is a {type(raw).__name__}, expected a JSON object")
+
+    items_by_url = {i.url: i for i in items}
+    # stats and still_open are always computed locally
+    data = {k: v for k, v in raw.items() if k not in SECTION_MODELS and k not in ("stats", "still_open")}
 
+    for section, model in SECTION_MODELS.items():
+        entries = raw.get(section) or []
+        valid_entries = []
+        for entry in entries if isinstance(entries, list) else []:
+            try:
+                parsed = model.model_validate(entry)
+            except ValidationError as ve:
+                logger.warning(f"Dropped malformed entry from {section}: {ve.error_count()} validation error(s)")
+                continue
+            # Only keep entries whose source_url we actually provided
+            if parsed.source_url not in items_by_url:
+                logger.warning(f"HALLUCINATION DETECTED: Removed fabricated URL {parsed.source_url} from {section}")
+                continue
+            if isinstance(parsed, Alert):
+                _apply_index_data(parsed, items_by_url[parsed.source_url])
+            valid_entries.append(parsed)
+        data[section] = valid_entries
 
-def analyze_with_ai(items: list[NewsItem], is_retry=False) -> dict:
+    data["stats"] = compute_stats(items)
+    return Newsletter.model_validate(data)
+
+
+def analyze_with_ai(items: list[NewsItem], is_retry=False, model=None, period: str = None) -> Newsletter:
     valid_items = [i for i in items if i.url] # Enforce rule: must have URL
     
     if not valid_items:
         logger.warning("No valid items with URLs given to AI Synthesizer.")
-        return generate_fallback_digest([])
+        return generate_fallback_digest([], period)
 
     input_json = json.dumps([i.to_dict() for i in valid_items], ensure_ascii=False)
     
     try:
-        model = genai.GenerativeModel(GEMINI_MODEL)
+        # `model` lets benchmarks inject a stub with the same generate_content API
+        model = model or get_genai().GenerativeModel(GEMINI_MODEL)
         
-        prompt = SYSTEM_PROMPT + f"\n\nINPUT DATA:\n{input_json}\n\nOUTPUT SCHEMA ONLY JSON:"
+        prompt = (
+            SYSTEM_PROMPT + f"\n\nREPORTING PERIOD: {period or get_week_date_range(TIMEZONE)}"
+            f"\n\nINPUT DATA:\n{input_json}\n\nOUTPUT SCHEMA ONLY JSON:"
+        )
         
         # We request strict JSON
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                response_mime_type="application/json",
-                temperature=0.1 # Low temp = more factual
+        with instrumentation.span("gemini", model=GEMINI_MODEL, items=len(valid_items)) as s:
+            response = model.generate_content(
+                prompt,
+                generation_config={
+                    "response_mime_type": "application/json",
+                    "temperature": 0.1 # Low temp = more factual
+                }
             )
-        )
-        
-        # Parse JSON
-        result = json.loads(response.text)
-        
-        # Validate post-check (Anti-Hallucination)
-        all_input_urls = {i.url for i in valid_items}
-        
-        def filter_fabricated_urls(section):
-            valid_entries = []
-            for entry in result.get(section, []):
-                # Only keep entries whose source_url we actually provided
-                if entry.get("source_url") in all_input_urls:
-                    valid_entries.append(entry)
-                else:
-                    logger.warning(f"HALLUCINATION DETECTED: Removed fabricated URL {entry.get('source_url')} from {section}")
-            result[section] = valid_entries
-
-        filter_fabricated_urls("critical_alerts")
-        filter_fabricated_urls("vulnerabilities_and_patches")
-        filter_fabricated_urls("breaches_and_incidents")
-        filter_fabricated_urls("latam_venezuela_intelligence")
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                s.set("prompt_tokens", getattr(usage, "prompt_token_count", 0))
+                s.set("output_tokens", getattr(usage, "candidates_token_count", 0))
         
-        return result
+        # Parse JSON, then validate and filter in one pass (Anti-Hallucination)
+        with instrumentation.span("validate"):
+            return validate_newsletter(json.loads(response.text), valid_items)
         
-    except json.JSONDecodeError as de:
-        logger.error(f"Failed to parse AI output as JSON: {de}")
+    except (json.JSONDecodeError, ValidationError, ValueError) as de:
+        logger.error(f"Failed to parse AI output against the newsletter schema: {de}")
         if not is_retry:
             logger.info("Retrying AI synthesis with stricter prompt...")
+            instrumentation.add("retries")
             time.sleep(30)
-            return analyze_with_ai(valid_items, is_retry=True)
+            return analyze_with_ai(valid_items, is_retry=True, model=model, period=period)
     except Exception as e:
         logger.error(f"Error during AI Synthesis: {e}")
         if not is_retry:
             logger.info("Retrying AI synthesis due to error...")
+            instrumentation.add("retries")
             time.sleep(30)
-            return analyze_with_ai(valid_items, is_retry=True)
+            return analyze_with_ai(valid_items, is_retry=True, model=model, period=period)
             
     # Fallback if both tries fail
-    return generate_fallback_digest(valid_items)
+    return generate_fallback_digest(valid_items, period)
 
 
-def synthesize(items: list[NewsItem]) -> dict:
-    """Main entrypoint for synthesis"""
+def synthesize(items: list[NewsItem], model=None, period: str = None) -> Newsletter:
+    """Main entrypoint for synthesis. `period` is the date range covered (default: the current week)."""
     logger.info(f"Synthesizing {len(items)} items using Gemini AI")
-    if not GEMINI_API_KEY:
-        return generate_fallback_digest(items)
+    if not GEMINI_API_KEY and model is None:
+        return generate_fallback_digest(items, period)
         
-    return analyze_with_ai(items)
+    return analyze_with_ai(items, model=model, period=period)
@@ -1,14 +1,26 @@
 import os
+import time
+import sqlite3
+import functools
 import streamlit as st
 from datetime import datetime
-import threading
 
-from config import logger, TIMEZONE
+from config import logger, TIMEZONE, OUTPUT_DIR, DASHBOARD_ITEMS_TTL, DASHBOARD_SYNTHESIS_TTL, DASHBOARD_ARTIFACTS_TTL
 import scraper
-import ai_synthesizer
-import pdf_generator
-import whatsapp_formatter
-from utils import deduplicate_items, get_week_label
+import item_store
+import source_registry
+import source_health
+import cve_index
+import search_index
+import delta
+import pipeline
+import instrumentation
+import jobs
+import archive
+import result_cache
+import rollup
+from utils import deduplicate_items, get_week_label, week_bounds
+import assets
 
 # Must be the first Streamlit command
 st.set_page_config(
@@ -19,10 +31,10 @@ st.set_page_config(
 )
 
 # === CUSTOM CSS (APPLE-LIKE AESTHETIC) ===
+# Fonts are embedded from the local assets/ directory — no network fetch
+st.markdown(f"<style>{assets.font_face_css(embed=True)}</style>", unsafe_allow_html=True)
 st.markdown("""
 <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&display=swap');
-    
     html, body, [class*="css"] {
         font-family: 'Inter', sans-serif;
         background-color: #FBFBFD; /* Apple Light Gray */
@@ -125,45 +137,276 @@ def save_env_file(content):
     with open(env_path, "w", encoding="utf-8") as f:
         f.write(content)
 
-def generate_newsletter():
-    with st.spinner("🚀 Initializing intelligence collection pipeline..."):
-        try:
-            # Step 1
-            st.info("📡 Scraping threat intelligence sources...")
-            raw_items = scraper.collect_all_sources()
-            all_items = deduplicate_items(raw_items)
-            
-            if len(all_items) == 0:
-                st.warning("⚠️ No intel found for the current week!")
-                return
-            
-            # Step 2
-            st.info(f"🧠 Synthesizing {len(all_items)} articles with Gemini AI...")
-            newsletter_data = ai_synthesizer.synthesize(all_items)
-            
-            # Step 3
-            st.info("📄 Compiling Executive PDF and WhatsApp Formats...")
-            pdf_path = pdf_generator.generate(newsletter_data)
-            wa_path = whatsapp_formatter.generate(newsletter_data)
-            
-            st.success("✅ Generation Complete!")
-            return pdf_path, wa_path
-            
-        except Exception as e:
-            st.error(f"❌ Error during generation: {str(e)}")
-            logger.exception("Streamlit generation error")
-            return None, None
+def generate_newsletter(job: jobs.Job, cache: result_cache.TTLCache, week: str, refresh: bool = False, rerender: bool = False):
+    """
+    Job function: the full pipeline for `week`, reporting stage progress on `job`.
+    Scraped items, synthesis and rendered artifacts are reused from `cache`;
+    `refresh` drops the week's cached stages, `rerender` only the artifacts.
+    """
+    report = None
+    try:
+        with instrumentation.run("dashboard") as report:
+            return _run_pipeline(job, cache, week, refresh, rerender)
+    finally:
+        # Failed and cancelled runs get a summary too (status "error")
+        if report is not None:
+            instrumentation.write_summary(report, week)
+
+def _collect_items(week: str):
+    with instrumentation.span("scrape"):
+        scraper.refresh_stale_sources()
+        raw_items = item_store.items_between(*week_bounds(TIMEZONE))
+    with instrumentation.span("dedup"):
+        items = deduplicate_items(raw_items)
+    with instrumentation.span("enrich") as s:
+        s.set("items", cve_index.enrich(items))
+    # Precomputed counts for monthly/quarterly roll-ups, as the weekly run stores them
+    try:
+        rollup.store_week_aggregate(week, items)
+    except Exception as e:
+        logger.error(f"Failed to store this week's aggregate: {e}")
+    return items
+
+def _synthesize(items, week: str):
+    with instrumentation.span("synthesize"):
+        newsletter = delta.synthesize(items, week)
+    search_index.index_newsletter_safely(newsletter, week)
+    return newsletter
+
+def _rendered(result: dict) -> bool:
+    """Both artifacts exist and the PDF is a real PDF, not the .txt fallback dump."""
+    pdf_path, wa_path = result["pdf_path"], result["wa_path"]
+    return bool(pdf_path and wa_path) and pdf_path.endswith(".pdf") and os.path.exists(pdf_path) and os.path.exists(wa_path)
+
+def _age(age):
+    return f"cached {age / 60:.0f} min ago" if age is not None else "fresh"
+
+def _run_pipeline(job: jobs.Job, cache: result_cache.TTLCache, week: str, refresh: bool, rerender: bool):
+    if refresh:
+        cache.invalidate(lambda key: key[1] == week)
+
+    # Step 1
+    job.update("scrape", 0.05, "Scraping threat intelligence sources...")
+    all_items, items_age = cache.get_or_compute(("items", week), DASHBOARD_ITEMS_TTL, lambda: _collect_items(week))
+    
+    if len(all_items) == 0:
+        return None
+    
+    # Step 2
+    job.update("synthesize", 0.4, f"Synthesizing {len(all_items)} articles with Gemini AI...")
+    newsletter_data, synthesis_age = cache.get_or_compute(
+        ("synthesis", week, result_cache.items_fingerprint(all_items)), DASHBOARD_SYNTHESIS_TTL,
+        lambda: _synthesize(all_items, week)
+    )
+    
+    # Step 3
+    job.update("render", 0.8, "Compiling Executive PDF and WhatsApp Formats...")
+    render_key = ("render", week, result_cache.newsletter_fingerprint(newsletter_data))
+    result, render_age = cache.get(render_key)
+    if rerender or result is None or not _rendered(result):
+        rendered = pipeline.render_outputs(newsletter_data)
+        result, render_age = {"pdf_path": rendered.pdf_path, "wa_path": rendered.wa_path, "timings": rendered.timings}, None
+        if _rendered(result):
+            cache.set(render_key, result, DASHBOARD_ARTIFACTS_TTL)
+        else:
+            cache.invalidate(lambda key: key == render_key) # partial render: try again next run
+    else:
+        logger.info(f"Reusing rendered artifacts for {week} ({render_age:.0f}s old)")
+
+    return {**result, "sources": {"items": _age(items_age), "synthesis": _age(synthesis_age), "render": _age(render_age)}}
+
+@st.cache_resource
+def get_result_cache() -> result_cache.TTLCache:
+    """Pipeline stage results, shared by every session of this server process."""
+    return result_cache.TTLCache()
+
+@st.cache_resource
+def get_job_runner() -> jobs.JobRunner:
+    """One runner per server process, shared by every session."""
+    return jobs.JobRunner(max_workers=1)
+
+def current_job(runner: jobs.JobRunner, week_label: str):
+    """This session's job, else the latest job for the week started by anyone."""
+    return runner.get(st.session_state.get("job_id", "")) or runner.latest(week_label)
+
+@st.fragment(run_every=2)
+def show_job_progress(runner: jobs.JobRunner, job_id: str):
+    """Polls a running job; a full rerun shows the result once it finishes."""
+    job = runner.get(job_id)
+    if job is None or not job.active:
+        st.rerun()
+    st.progress(job.progress, text=f"🚀 {job.message or 'Queued...'} ({job.elapsed:.0f}s)")
+    if st.button("✋ Cancel", key=f"cancel_{job.job_id}"):
+        runner.cancel(job.job_id)
+        st.toast("Cancelling after the current stage...")
+
+def show_job_result(job: jobs.Job):
+    if job.status == jobs.FAILED:
+        st.error(f"❌ Error during generation: {job.error}")
+    elif job.status == jobs.CANCELLED:
+        st.warning("✋ Generation cancelled.")
+    elif job.result is None:
+        st.warning("⚠️ No intel found for the current week!")
+    else:
+        # Keep the result for this session so the downloads survive reruns and job history eviction
+        st.session_state["last_result"] = job.result
+        show_downloads(job.result)
+
+def show_downloads(result: dict):
+    timings = " · ".join(f"{k}: {v:.1f}s" for k, v in result["timings"].items())
+    st.success(f"✅ Generation Complete! ({timings})")
+    st.caption(" · ".join(f"{stage}: {origin}" for stage, origin in result.get("sources", {}).items()))
+    pdf_out, wa_out = result["pdf_path"], result["wa_path"]
+    if not _rendered(result):
+        st.warning("The PDF or WhatsApp text could not be generated; see the logs. The next run renders them again.")
+    else:
+        st.markdown("### Downloads")
+        st.download_button(
+            "📥 Download PDF Report", read_archive_file(pdf_out, os.path.getmtime(pdf_out)),
+            file_name=os.path.basename(pdf_out), mime="application/pdf", type="primary"
+        )
+        st.download_button(
+            "📱 Download WhatsApp Text", read_archive_file(wa_out, os.path.getmtime(wa_out)),
+            file_name=os.path.basename(wa_out), mime="text/plain"
+        )
+
+def show_run_performance():
+    """Charts the stage and per-source timings of the latest run summary."""
+    summary = instrumentation.latest_summary()
+    if not summary:
+        st.caption("No run summary yet. Generate a newsletter to collect timings.")
+        return
+
+    st.caption(f"Run `{summary['run_id']}` ({summary['name']}) started {summary['started_at']} — {summary['duration']:.1f}s total, status: {summary['status']}")
+    st.markdown("**Stage durations (s)**")
+    st.bar_chart(summary["stages"])
+    if summary["sources"]:
+        st.markdown("**Fetch duration per source (s)**")
+        st.bar_chart({name: info["duration"] for name, info in summary["sources"].items()})
+        st.dataframe(
+            [{"source": name, **info} for name, info in summary["sources"].items()],
+            use_container_width=True
+        )
+    if summary["totals"]:
+        st.json(summary["totals"])
+
+STATE_ICONS = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+
+def show_source_health():
+    """Circuit breaker state and health score of every registered source."""
+    rows = source_health.snapshot(source_registry.get_registry().sources)
+    tripped = [r["source"] for r in rows if r["state"] == "open"]
+    if tripped:
+        st.warning(f"Skipping {len(tripped)} unhealthy source(s): {', '.join(tripped)}")
+    st.dataframe(
+        [{"": STATE_ICONS.get(r["state"], ""), **r} for r in rows],
+        use_container_width=True, hide_index=True
+    )
+
+ARCHIVE_PAGE_SIZE = 20
+
+@st.cache_data(show_spinner=False)
+def load_archive_index(output_dir: str, version: float) -> list:
+    """File metadata only; `version` (the directory mtime) invalidates the cache when files change."""
+    return archive.scan(output_dir)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def read_archive_file(path: str, modified: float) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def show_archives():
+    entries = load_archive_index(OUTPUT_DIR, archive.directory_version(OUTPUT_DIR))
+    if not entries:
+        st.info("No reports generated yet.")
+        return
+
+    col_week, col_kind = st.columns(2)
+    weeks = sorted({e.week for e in entries if e.week}, reverse=True)
+    week = col_week.selectbox("Period", ["All periods"] + weeks)
+    kinds = col_kind.multiselect(
+        "Type", list(archive.KINDS), default=list(archive.REPORT_KINDS), format_func=archive.KINDS.get
+    )
+    matches = [e for e in entries if e.kind in kinds and (week == "All periods" or e.week == week)]
+    if not matches:
+        st.info("No files match the selected filters.")
+        return
+
+    pages = (len(matches) - 1) // ARCHIVE_PAGE_SIZE + 1
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+    st.caption(f"{len(matches)} file(s)")
+
+    prepared = st.session_state.get("prepared_download")
+    for entry in matches[(page - 1) * ARCHIVE_PAGE_SIZE:page * ARCHIVE_PAGE_SIZE]:
+        col_name, col_meta, col_action = st.columns([4, 3, 2])
+        col_name.markdown(f"**{entry.name}**  \n{archive.KINDS[entry.kind]}")
+        col_meta.caption(f"{entry.week or '—'} · {archive.human_size(entry.size)} · {entry.modified:%Y-%m-%d %H:%M}")
+        if prepared == entry.path:
+            # Bytes are only read for the one file the user asked for
+            col_action.download_button(
+                "📥 Download", read_archive_file(entry.path, entry.modified.timestamp()),
+                file_name=entry.name, mime=entry.mime, key=f"dl_{entry.name}"
+            )
+        elif col_action.button("Prepare download", key=f"prep_{entry.name}"):
+            st.session_state["prepared_download"] = entry.path
+            st.rerun()
+
+SEARCH_LIMIT = 50
+
+def show_search():
+    """Full-text search over every stored item and past newsletter (item_store FTS5 indexes)."""
+    if not item_store.search_available():
+        st.warning("Full-text search needs SQLite with FTS5, which this Python build lacks.")
+        return
+
+    with st.form("search"):
+        query = st.text_input("Search", placeholder="e.g. ransomware healthcare, Fortinet VPN")
+        col_cve, col_vendor, col_source = st.columns(3)
+        cve = col_cve.text_input("CVE", placeholder="CVE-2024-3400")
+        vendor = col_vendor.text_input("Vendor / product")
+        sources = [s["name"] for s in source_registry.get_registry().sources]
+        source = col_source.selectbox("Source", ["All sources"] + sources)
+        col_dates, col_kind = st.columns(2)
+        dates = col_dates.date_input("Date range", value=(), help="Leave empty to search everything")
+        kind = col_kind.radio("Search in", ["Collected items", "Past newsletters"], horizontal=True)
+        submitted = st.form_submit_button("🔎 Search")
+
+    if not submitted:
+        return
+    if not (query or cve or vendor or source != "All sources" or dates):
+        st.info("Enter search words or pick a filter.")
+        return
+
+    start, end = (tuple(dates) + (None, None))[:2]
+    search = search_index.search_items if kind == "Collected items" else search_index.search_reports
+    started = time.perf_counter()
+    try:
+        hits = search(query, cve, vendor, "" if source == "All sources" else source, start, end or start, limit=SEARCH_LIMIT)
+    except sqlite3.OperationalError as e:
+        st.error(f"Invalid search: {e}")
+        return
+    st.caption(f"{len(hits)}{'+' if len(hits) == SEARCH_LIMIT else ''} result(s) in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for hit in hits:
+        cves = " ".join(f"`{c}`" for c in hit.cve_ids)
+        section = f" · {hit.section.replace('_', ' ')}" if hit.section else ""
+        st.markdown(f"**[{hit.title}]({hit.url})**  \n{hit.when} · {hit.source_name}{section} {cves}")
+        if hit.snippet:
+            st.caption(hit.snippet)
 
 # === UI LAYOUT ===
 
 st.title("🛡️ Cyber Intelligence Automation")
 st.markdown("Generate business-class weekly cybersecurity briefings instantly.")
 
-tab1, tab2, tab3 = st.tabs(["⚡ Dashboard", "⚙️ Configuration (.env)", "📂 Output Archives"])
+tab1, tab2, tab3, tab4 = st.tabs(["⚡ Dashboard", "⚙️ Configuration (.env)", "📂 Output Archives", "🔎 Search"])
 
 # --- TAB 1: DASHBOARD ---
 with tab1:
     st.markdown("### Control Center")
+    runner = get_job_runner()
+    week_label = get_week_label(TIMEZONE)
+    job = current_job(runner, week_label)
     col1, col2 = st.columns([2, 1])
     
     with col1:
@@ -171,25 +414,52 @@ with tab1:
             "Pressing the button below will bypass the scheduler and manually trigger the intelligence gathering, "
             "AI synthesis, and report generation pipeline for the current week."
         )
-        if st.button("🚀 Generate Newsletter Now", use_container_width=True):
-            pdf_out, wa_out = generate_newsletter()
-            
-            if pdf_out and wa_out:
-                st.balloons()
-                st.markdown("### Downloads")
-                with open(pdf_out, "rb") as f:
-                    st.download_button("📥 Download PDF Report", f, file_name=os.path.basename(pdf_out), type="primary")
-                with open(wa_out, "rb") as f:
-                    st.download_button("📱 Download WhatsApp Text", f, file_name=os.path.basename(wa_out))
+        busy = bool(job and job.active)
+        refresh = st.checkbox("Ignore cached scrape and synthesis", help="Re-poll the sources and call Gemini again")
+        col_gen, col_render = st.columns(2)
+        generate_clicked = col_gen.button("🚀 Generate Newsletter Now", use_container_width=True, disabled=busy)
+        rerender_clicked = col_render.button(
+            "🔁 Re-render outputs", use_container_width=True, disabled=busy,
+            help="Rebuild the PDF and WhatsApp text from the cached scrape and synthesis"
+        )
+        if generate_clicked or rerender_clicked:
+            previous = runner.latest(week_label)
+            job = runner.submit(week_label, functools.partial(
+                generate_newsletter, cache=get_result_cache(), week=week_label,
+                refresh=refresh, rerender=rerender_clicked
+            ))
+            st.session_state["job_id"] = job.job_id
+            if job is previous:
+                st.toast("A generation for this week is already running — following it.")
+            else:
+                st.toast("Generation started in the background.")
+
+        if job is not None:
+            if job.active:
+                show_job_progress(runner, job.job_id)
+            else:
+                show_job_result(job)
+        elif "last_result" in st.session_state:
+            show_downloads(st.session_state["last_result"])
+
+        cached = [e for e in get_result_cache().entries() if e["key"][1] == week_label]
+        if cached:
+            st.caption("Cached for this week: " + ", ".join(
+                f"{e['key'][0]} ({e['age_s'] // 60} min old, expires in {e['expires_in_s'] // 60} min)" for e in cached
+            ))
                     
     with col2:
         st.info(
             "**System Status**\n\n"
-            "🟢 Engine: Ready\n\n"
+            + (f"🟡 Engine: Running ({job.stage})\n\n" if job and job.active else "🟢 Engine: Ready\n\n") +
             f"🕒 Timezone: `{TIMEZONE}`\n\n"
-            f"📅 Current Week: `{get_week_label(TIMEZONE)}`\n\n"
+            f"📅 Current Week: `{week_label}`\n\n"
             "🤖 AI Model: `gemini-1.5-flash`"
         )
+        show_source_health()
+
+    with st.expander("⏱️ Last Run Performance"):
+        show_run_performance()
 
 # --- TAB 2: CONFIGURATION ---
 with tab2:
@@ -207,22 +477,9 @@ with tab2:
 # --- TAB 3: ARCHIVES ---
 with tab3:
     st.markdown("### Generated Reports")
-    output_dir = os.getenv("OUTPUT_DIR", "./output")
-    
-    if not os.path.exists(output_dir):
-        st.info("No reports generated yet.")
-    else:
-        files = sorted(os.listdir(output_dir), reverse=True)
-        if not files:
-            st.info("No reports generated yet.")
-        else:
-            for file in files:
-                filepath = os.path.join(output_dir, file)
-                if os.path.isfile(filepath):
-                    with open(filepath, "rb") as f:
-                        btn = st.download_button(
-                            label=f"Download {file}",
-                            data=f,
-                            file_name=file,
-                            mime="application/pdf" if file.endswith(".pdf") else "text/plain"
-                        )
+    show_archives()
+
+# --- TAB 4: SEARCH ---
+with tab4:
+    st.markdown("### Search Past Intelligence")
+    show_search()
@@ -0,0 +1,82 @@
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+from config import OUTPUT_DIR
+from instrumentation import RUN_SUMMARY_PREFIX
+
+# Metadata index of the generated files in OUTPUT_DIR. Only directory entries
+# are stat'ed; file contents are never read here.
+
+KINDS = {
+    "pdf": "PDF report",
+    "whatsapp": "WhatsApp text",
+    "fallback": "Fallback data (PDF failed)",
+    "run_summary": "Run summary",
+    "other": "Other",
+}
+REPORT_KINDS = ("pdf", "whatsapp", "fallback")
+
+WEEK_RE = re.compile(r"(\d{4}-(?:W\d{2}|Q[1-4]|\d{2}))(?:_|\.)") # week, quarter or month label
+MIME_TYPES = {".pdf": "application/pdf", ".json": "application/json", ".txt": "text/plain"}
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    name: str
+    path: str
+    kind: str
+    week: str # period label parsed from the file name (2025-W03, 2025-01 or 2025-Q1), "" if none
+    size: int
+    modified: datetime
+
+    @property
+    def mime(self) -> str:
+        return MIME_TYPES.get(os.path.splitext(self.name)[1], "application/octet-stream")
+
+def classify(name: str) -> str:
+    if name.startswith(RUN_SUMMARY_PREFIX):
+        return "run_summary"
+    if name.startswith("cyber_newsletter_"):
+        return "pdf" if name.endswith(".pdf") else "fallback"
+    if name.startswith("whatsapp_cyber_"):
+        return "whatsapp"
+    return "other"
+
+def scan(output_dir: str = OUTPUT_DIR) -> List[ArchiveEntry]:
+    """Every archived file, newest week first, then newest file first."""
+    if not os.path.isdir(output_dir):
+        return []
+    entries = []
+    with os.scandir(output_dir) as it:
+        for e in it:
+            # Skip in-progress atomic writes and anything that is not a regular file
+            if e.name.startswith(".") or not e.is_file():
+                continue
+            st = e.stat()
+            week = WEEK_RE.search(e.name)
+            entries.append(ArchiveEntry(
+                name=e.name,
+                path=e.path,
+                kind=classify(e.name),
+                week=week.group(1) if week else "",
+                size=st.st_size,
+                modified=datetime.fromtimestamp(st.st_mtime),
+            ))
+    entries.sort(key=lambda a: (a.week, a.modified), reverse=True)
+    return entries
+
+def directory_version(output_dir: str = OUTPUT_DIR) -> float:
+    """Directory mtime: changes whenever a file is added, removed or atomically replaced."""
+    try:
+        return os.stat(output_dir).st_mtime
+    except OSError:
+        return 0.0
+
+def human_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
@@ -0,0 +1,85 @@
+import os
+import re
+import base64
+import mimetypes
+import threading
+from functools import lru_cache
+
+from config import logger
+
+# Local assets (fonts + CSS) served to WeasyPrint and the Streamlit app.
+# Referenced from CSS as `assets:<relative path>`, e.g. url('assets:fonts.css').
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+ASSET_SCHEME = "assets:"
+
+mimetypes.add_type("font/woff2", ".woff2")
+mimetypes.add_type("font/woff", ".woff")
+mimetypes.add_type("font/ttf", ".ttf")
+
+# In-process asset cache: relative path -> bytes. Assets never change at runtime.
+_cache: dict[str, bytes] = {}
+_cache_lock = threading.Lock()
+
+def read_asset(name: str) -> bytes:
+    """Returns the bytes of a file under assets/, read from disk only once."""
+    data = _cache.get(name)
+    if data is not None:
+        return data
+
+    path = os.path.normpath(os.path.join(ASSETS_DIR, name))
+    if not path.startswith(ASSETS_DIR + os.sep):
+        raise ValueError(f"Asset path escapes the assets directory: {name}")
+
+    with open(path, "rb") as f:
+        data = f.read()
+    with _cache_lock:
+        _cache[name] = data
+    return data
+
+def url_fetcher(url: str, timeout=10, ssl_context=None) -> dict:
+    """
+    WeasyPrint url_fetcher that resolves `assets:` URLs from the in-process cache
+    and refuses every network fetch, so rendering never blocks on the network.
+    """
+    if url.startswith(ASSET_SCHEME):
+        name = url[len(ASSET_SCHEME):].lstrip("/")
+        mime_type, _ = mimetypes.guess_type(name)
+        return {
+            "string": read_asset(name),
+            "mime_type": mime_type or "application/octet-stream",
+            "redirected_url": url,
+        }
+
+    if url.startswith("data:"):
+        from weasyprint import default_url_fetcher
+        return default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+
+    logger.debug(f"Blocked remote fetch during offline render: {url}")
+    raise ValueError(f"Remote resources are disabled for offline rendering: {url}")
+
+_ASSET_URL_RE = re.compile(r"url\('assets:([^']+)'\)(?:\s*format\('[^']+'\))?")
+
+@lru_cache(maxsize=None)
+def font_face_css(embed: bool = False) -> str:
+    """
+    Returns assets/fonts.css. With embed=True the `assets:` URLs are inlined as
+    base64 data URIs (for consumers without a url_fetcher, like Streamlit);
+    sources whose file is missing are dropped.
+    """
+    css = read_asset("fonts.css").decode("utf-8")
+    if not embed:
+        return css
+
+    def inline(match):
+        name = match.group(1)
+        try:
+            data = read_asset(name)
+        except OSError:
+            return ""
+        mime_type, _ = mimetypes.guess_type(name)
+        encoded = base64.b64encode(data).decode("ascii")
+        return f"url('data:{mime_type};base64,{encoded}')"
+
+    css = _ASSET_URL_RE.sub(inline, css)
+    # Tidy up the trailing separator left behind by dropped sources
+    return re.sub(r",\s*;", ";", css)
@@ -0,0 +1,116 @@
+"""
+Historical backfill: rebuilds the reports of past weeks from the item store
+and generates monthly / quarterly roll-ups.
+
+    python backfill.py --from 2025-01-01 --to 2025-03-31
+    python backfill.py --from 2025-01-01 --to 2025-06-30 --period quarter
+
+Weeks are independent and are built in parallel worker processes. Roll-ups
+reuse the weekly reports and the precomputed week aggregates (see rollup.py).
+Weeks that already have a report and aggregate (e.g. delivered by the weekly
+run) are kept unless --force is given. Nothing is emailed.
+"""
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import List
+
+from config import logger, TIMEZONE, OUTPUT_DIR, ITEM_STORE_PATH
+from utils import Period, PERIOD_KINDS, deduplicate_items, periods_between
+import item_store
+
+BACKFILL_WORKERS = 4
+
+def _render(newsletter, label: str) -> dict:
+    import pdf_generator
+    import whatsapp_formatter
+    return {
+        "pdf": pdf_generator.generate(newsletter, filepath=os.path.join(OUTPUT_DIR, f"cyber_newsletter_{label}.pdf")),
+        "whatsapp": whatsapp_formatter.generate(newsletter, filepath=os.path.join(OUTPUT_DIR, f"whatsapp_cyber_{label}.txt")),
+    }
+
+def build_week(period: Period) -> dict:
+    """Worker: one week's report from the stored items, as the weekly run would have built it."""
+    import cve_index
+    import delta
+    import rollup
+    import search_index
+
+    items = deduplicate_items(item_store.items_between(period.start, period.end))
+    if not items:
+        logger.warning(f"{period.label}: no stored items, skipped")
+        return {"period": period.label, "items": 0}
+    cve_index.enrich(items)
+    rollup.store_week_aggregate(period.label, items)
+
+    # Delta mode compares against whatever was recorded before; for a backfill
+    # that history is incomplete, so every item is synthesized.
+    newsletter = delta.synthesize(items, period.label, enabled=False, period=period.date_range)
+    if "RAW DIGEST" not in newsletter.week_label:
+        newsletter.week_label = period.title
+    search_index.index_newsletter_safely(newsletter, period.label)
+    return {"period": period.label, "items": len(items), **_render(newsletter, period.label)}
+
+def build_rollup(period: Period) -> dict:
+    """Worker: one month / quarter from its weekly reports."""
+    import rollup
+    newsletter = rollup.build_rollup(period)
+    return {"period": period.label, "items": newsletter.stats.total_items_analyzed, **_render(newsletter, period.label)}
+
+def _existing_reports(weeks: List[str]) -> set:
+    """Weeks with both a stored report and its aggregate (a roll-up needs both)."""
+    with item_store.connect(ITEM_STORE_PATH) as conn:
+        return {r["week"] for r in conn.execute(
+            f"SELECT week FROM reports JOIN week_aggregates USING (week) WHERE week IN ({','.join('?' * len(weeks))})", weeks
+        )}
+
+def _run(worker, periods: List[Period], workers: int) -> List[dict]:
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(worker, p): p for p in periods}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+                logger.info(f"Backfilled {futures[future].label}")
+            except Exception as e:
+                logger.error(f"Backfill of {futures[future].label} failed: {e}")
+    return sorted(results, key=lambda r: r["period"])
+
+def _missing_weeks(weeks: List[Period], force: bool) -> List[Period]:
+    """Weeks without a stored report and aggregate (all of them with `force`)."""
+    done = set() if force or not weeks else _existing_reports([w.label for w in weeks])
+    missing = [w for w in weeks if w.label not in done]
+    logger.info(f"{len(weeks) - len(missing)} of {len(weeks)} weekly reports already built")
+    return missing
+
+def backfill(first: date, last: date, kind: str = "week", workers: int = BACKFILL_WORKERS, force: bool = False) -> List[dict]:
+    """Builds every period of `kind` overlapping first..last. Weeks that already have a report and aggregate are kept unless `force`."""
+    if first > last:
+        raise ValueError(f"Empty range: {first} is after {last}")
+    with item_store.connect(ITEM_STORE_PATH): # create / migrate the schema once, before the workers start
+        pass
+    if kind == "week":
+        return _run(build_week, _missing_weeks(periods_between("week", first, last, TIMEZONE), force), workers)
+
+    rollups = periods_between(kind, first, last, TIMEZONE)
+    # The weeks a roll-up covers can extend past first..last (ISO Thursday rule)
+    needed = {w for p in rollups for w in p.week_labels()}
+    weeks = {w.label: w for w in periods_between("week", rollups[0].start.date(), rollups[-1].end.date(), TIMEZONE)}
+    weeks = [w for label, w in sorted(weeks.items()) if label in needed]
+    _run(build_week, _missing_weeks(weeks, force), workers)
+    return _run(build_rollup, rollups, workers)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild past reports from the item store")
+    parser.add_argument("--from", dest="first", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="last", type=date.fromisoformat, default=date.today(), help="YYYY-MM-DD (default: today)")
+    parser.add_argument("--period", choices=PERIOD_KINDS, default="week")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--force", action="store_true", help="Rebuild weekly reports that already exist")
+    args = parser.parse_args()
+    if args.first > args.last:
+        parser.error(f"--from {args.first} is after --to {args.last}")
+
+    for r in backfill(args.first, args.last, args.period, args.workers, args.force):
+        print(f"{r['period']}  {r['items']:>5} items  {r.get('pdf', '-')}")
@@ -0,0 +1,2 @@
+# Offline benchmarks. Run from the project root, e.g.:
+#   python -m benchmarks.render_bench
@@ -0,0 +1,44 @@
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+def measure(fn, repeat: int = 3):
+    """Runs fn() `repeat` times. Returns (timing stats, result of the last run)."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    stats = {
+        "runs": repeat,
+        "median_s": round(statistics.median(durations), 5),
+        "min_s": round(min(durations), 5),
+        "max_s": round(max(durations), 5),
+    }
+    if isinstance(result, (list, tuple)):
+        stats["items"] = len(result)
+    return stats, result
+
+def environment() -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        rev = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_rev": rev,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+
+def write_results(results: dict, path: str = None):
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
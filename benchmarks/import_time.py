@@ -0,0 +1,95 @@
+"""
+Import-time benchmark: how long does `import <module>` take, and which heavy
+dependencies does it drag in?
+
+Each module is imported in a fresh interpreter with `-X importtime`; the
+cumulative time of the top-level import is reported (median of --repeat runs)
+along with the slowest nested imports, the heavy dependencies that ended up in
+sys.modules and the process's peak RSS. With --max-ms or --forbid-heavy it
+exits 1 on a budget violation, so it can gate CI:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --max-ms 400 --forbid-heavy
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import environment, write_results
+
+# Entry points and the modules they import
+MODULES = ["cyber_newsletter", "scraper", "ai_synthesizer", "pdf_generator", "pipeline"]
+# Dependencies that should only load when their feature is used
+HEAVY = ["playwright", "bs4", "lxml", "feedparser", "google.generativeai", "weasyprint", "apscheduler", "prometheus_client"]
+
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+PROBE = """
+import json, resource, sys
+import {module}
+print(json.dumps({{
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+}}))
+"""
+
+def _run_once(module: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY)],
+        capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    # importtime prints nested imports before their parent: the module's own
+    # subtree is every row after the previous top-level row, up to the module's row
+    end = next(i for i, (name, _, _, depth) in enumerate(rows) if name == module and depth == 0)
+    start = end
+    while start > 0 and rows[start - 1][3] > 0:
+        start -= 1
+    return {"total_us": rows[end][2], "nested": rows[start:end], **json.loads(out.stdout.strip().splitlines()[-1])}
+
+def run(modules: list[str], repeat: int, top: int) -> dict:
+    results = {}
+    for module in modules:
+        runs = [_run_once(module) for _ in range(repeat)]
+        last = runs[-1]
+        # Slowest direct imports of the module (depth 1 of its import tree)
+        slowest = sorted((r for r in last["nested"] if r[3] == 1), key=lambda r: -r[2])[:top]
+        results[module] = {
+            "median_ms": round(statistics.median(r["total_us"] for r in runs) / 1000, 1),
+            "min_ms": round(min(r["total_us"] for r in runs) / 1000, 1),
+            "heavy_loaded": last["loaded"],
+            "peak_rss_mb": last["peak_rss_mb"],
+            "slowest_imports_ms": {name: round(cum / 1000, 1) for name, _, cum, _ in slowest},
+        }
+    return {"benchmark": "import_time", "environment": environment(), "repeat": repeat, "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time benchmark using python -X importtime")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Slowest nested imports to list per module")
+    parser.add_argument("--max-ms", type=float, help="Fail if any module's median import time exceeds this")
+    parser.add_argument("--forbid-heavy", action="store_true", help="Fail if any module imports a heavy dependency eagerly")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = run(args.modules, args.repeat, args.top)
+    write_results(results, args.output)
+
+    failures = []
+    for module, r in results["results"].items():
+        if args.max_ms is not None and r["median_ms"] > args.max_ms:
+            failures.append(f"{module}: {r['median_ms']}ms > {args.max_ms}ms")
+        if args.forbid_heavy and r["heavy_loaded"]:
+            failures.append(f"{module}: eagerly imports {', '.join(r['heavy_loaded'])}")
+    if failures:
+        print("Import budget exceeded:\n  " + "\n  ".join(failures), file=sys.stderr)
+        sys.exit(1)
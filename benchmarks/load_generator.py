@@ -0,0 +1,202 @@
+"""
+Synthetic load generator: how does the pipeline scale with more sources and items?
+
+Generates N synthetic RSS/Telegram sources served by the local stand-in and
+drives collect_all_sources -> deduplicate_items -> synthesis (stub model) ->
+PDF + WhatsApp rendering end to end. Each scale point runs in a fresh child
+process so peak RSS is per point.
+
+    python -m benchmarks.load_generator --sources 12 50 100 200 --items-per-feed 50
+    python -m benchmarks.load_generator --sources 100 --items-per-feed 100 --duplicate-ratio 0.3 --output load.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from html import escape
+
+from benchmarks.common import environment, write_results
+
+WORDS = (
+    "remote code execution vulnerability allows unauthenticated attacker crafted request "
+    "privilege escalation kernel driver memory corruption bypass authentication firmware "
+    "update advisory patch exploited wild ransomware campaign phishing credential exposure"
+).split()
+SEVERITIES = ["Critical", "High", "Medium", "Low"]
+
+class FeedGenerator:
+    """Deterministic synthetic feeds. Duplicates re-publish an earlier item (same URL + title) on another feed."""
+
+    def __init__(self, items_per_feed: int, summary_length: int, cve_density: float,
+                 duplicate_ratio: float, telegram_share: float, seed: int):
+        self.items_per_feed = items_per_feed
+        self.summary_length = summary_length
+        self.cve_density = cve_density
+        self.duplicate_ratio = duplicate_ratio
+        self.telegram_share = telegram_share
+        self.rng = random.Random(seed)
+        self.published = [] # (title, url, summary) of every original item so far
+
+    def _text(self, words: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(words))
+
+    def _item(self, source_idx: int, item_idx: int):
+        if self.published and self.rng.random() < self.duplicate_ratio:
+            return self.rng.choice(self.published)
+        cves = " ".join(
+            f"CVE-2025-{self.rng.randint(1000, 99999)}"
+            for _ in range(int(self.cve_density) + (self.rng.random() < self.cve_density % 1))
+        )
+        title = f"{self.rng.choice(SEVERITIES)} {self._text(6)} {cves}".strip()
+        url = f"https://vendor{source_idx}.example.com/advisory/{item_idx}"
+        summary = f"{cves} {self._text(max(1, self.summary_length // 8))}"[: self.summary_length]
+        item = (title, url, summary)
+        self.published.append(item)
+        return item
+
+    def rss(self, source_idx: int, pub_date: str) -> bytes:
+        entries = []
+        for i in range(self.items_per_feed):
+            title, url, summary = self._item(source_idx, i)
+            entries.append(
+                f"<item><title>{escape(title)}</title><link>{escape(url)}</link>"
+                f"<description>{escape(summary)}</description><pubDate>{pub_date}</pubDate></item>"
+            )
+        return (
+            f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            f"<title>Synthetic PSIRT {source_idx}</title>{''.join(entries)}</channel></rss>"
+        ).encode("utf-8")
+
+    def telegram(self, source_idx: int, iso_date: str) -> bytes:
+        messages = []
+        for i in range(self.items_per_feed):
+            title, url, summary = self._item(source_idx, i)
+            messages.append(
+                f'<div class="tgme_widget_message"><div class="tgme_widget_message_text">{escape(title)} • {escape(summary)}</div>'
+                f'<a class="tgme_widget_message_date" href="{escape(url)}"><time datetime="{iso_date}">08:00</time></a></div>'
+            )
+        return f"<html><body>{''.join(messages)}</body></html>".encode("utf-8")
+
+    def build(self, source_count: int, base_url: str):
+        """Returns (routes for the stand-in, source dicts for collect_all_sources)."""
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        routes, sources = {}, []
+        for idx in range(source_count):
+            if self.rng.random() < self.telegram_share:
+                path = f"/telegram/{idx}"
+                routes[path] = ("text/html; charset=utf-8", self.telegram(idx, now.isoformat()))
+                sources.append({"name": f"Synthetic Telegram {idx}", "url": base_url + path,
+                                "type": "telegram_public", "language": "es", "region": "latam", "rate_limit": 1000})
+            else:
+                path = f"/rss/{idx}.xml"
+                routes[path] = ("application/xml; charset=utf-8", self.rss(idx, format_datetime(now)))
+                sources.append({"name": f"Synthetic PSIRT {idx}", "url": base_url + path, "rss": base_url + path,
+                                "type": "rss", "language": "en", "region": "global", "rate_limit": 1000})
+        return routes, sources
+
+def _child(source_count: int, params: dict) -> dict:
+    import scraper
+    import ai_synthesizer
+    import pdf_generator
+    import whatsapp_formatter
+    from utils import deduplicate_items
+    from benchmarks.standin import StandInServer
+    from benchmarks.stub_model import StubModel
+
+    generator = FeedGenerator(**params)
+    timings = {}
+    with StandInServer({}) as server:
+        routes, sources = generator.build(source_count, server.base_url)
+        server.routes.update(routes)
+
+        start = time.perf_counter()
+        raw_items = scraper.collect_all_sources(sources)
+        timings["collect_all_sources"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    items = deduplicate_items(raw_items)
+    timings["deduplicate_items"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    newsletter = ai_synthesizer.synthesize(items, model=StubModel(max_per_section=25))
+    timings["synthesize_stub"] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        pdf_generator.generate(newsletter, filepath=os.path.join(out_dir, "load.pdf"))
+        timings["render_pdf"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        whatsapp_formatter.generate(newsletter, filepath=os.path.join(out_dir, "load.txt"))
+        timings["render_whatsapp"] = time.perf_counter() - start
+
+    total = sum(timings.values())
+    return {
+        "sources": source_count,
+        "raw_items": len(raw_items),
+        "unique_items": len(items),
+        "timings_s": {k: round(v, 4) for k, v in timings.items()},
+        "total_s": round(total, 4),
+        "items_per_s": round(len(raw_items) / total, 1) if total else 0.0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def _bar(value: float, max_value: float, width: int = 30) -> str:
+    return "#" * max(1, int(width * value / max_value)) if max_value else ""
+
+def print_chart(rows: list[dict]):
+    """Text chart of throughput and peak memory per scale point (stderr, keeps stdout JSON-only)."""
+    max_tp = max(r["items_per_s"] for r in rows)
+    max_mem = max(r["peak_rss_mb"] for r in rows)
+    print(f"{'sources':>8} {'items':>7} {'items/s':>9}  {'throughput':<30} {'RSS MB':>8}  memory", file=sys.stderr)
+    for r in rows:
+        print(
+            f"{r['sources']:>8} {r['raw_items']:>7} {r['items_per_s']:>9.1f}  {_bar(r['items_per_s'], max_tp):<30} "
+            f"{r['peak_rss_mb']:>8.1f}  {_bar(r['peak_rss_mb'], max_mem)}",
+            file=sys.stderr
+        )
+
+def run(source_counts: list[int], params: dict) -> dict:
+    rows = []
+    for count in source_counts:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.load_generator", "--child", str(count), "--params", json.dumps(params)],
+            capture_output=True, text=True, check=True
+        )
+        rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    print_chart(rows)
+    return {"benchmark": "load", "environment": environment(), "params": params, "results": rows}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic load generator for the end-to-end pipeline")
+    parser.add_argument("--sources", type=int, nargs="+", default=[12, 50, 100, 200])
+    parser.add_argument("--items-per-feed", type=int, default=50)
+    parser.add_argument("--summary-length", type=int, default=400, help="Characters per item summary")
+    parser.add_argument("--cve-density", type=float, default=1.5, help="Average CVE IDs per item")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="Share of items re-published by another feed")
+    parser.add_argument("--telegram-share", type=float, default=0.1, help="Share of sources that are Telegram pages")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--params", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(_child(args.child, json.loads(args.params))))
+    else:
+        params = {
+            "items_per_feed": args.items_per_feed,
+            "summary_length": args.summary_length,
+            "cve_density": args.cve_density,
+            "duplicate_ratio": args.duplicate_ratio,
+            "telegram_share": args.telegram_share,
+            "seed": args.seed,
+        }
+        write_results(run(args.sources, params), args.output)
@@ -0,0 +1,59 @@
+"""
+Peak RSS of a PDF render for growing report sizes.
+
+Each size is rendered in a fresh child process so the peak is not polluted
+by earlier (larger) runs.
+
+    python -m benchmarks.memory_bench --cards 10 100 1000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+def _child(cards: int) -> dict:
+    import pdf_generator
+    from benchmarks.samples import make_newsletter
+
+    newsletter = make_newsletter(cards)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        path = pdf_generator.generate(newsletter, filepath=os.path.join(out_dir, "bench.pdf"))
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # KiB on Linux
+    return {
+        "cards": cards,
+        "output": os.path.splitext(path)[1].lstrip("."),
+        "render_s": round(elapsed, 3),
+        "output_bytes": size,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "render_peak_delta_mb": round((peak_kb - baseline_kb) / 1024, 1),
+    }
+
+def run(sizes: list[int]) -> dict:
+    results = []
+    for cards in sizes:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.memory_bench", "--child", str(cards)],
+            capture_output=True, text=True, check=True
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {"benchmark": "pdf_peak_rss", "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak RSS of PDF rendering per report size")
+    parser.add_argument("--cards", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(_child(args.child)))
+    else:
+        print(json.dumps(run(args.cards), indent=2))
@@ -0,0 +1,117 @@
+"""
+Offline, reproducible benchmark of every pipeline stage.
+
+Recorded responses for each source type (RSS, Atom/XML, Telegram HTML,
+static HTML and JS-rendered HTML) are replayed through a local HTTP
+stand-in; synthesis uses a stub model. Results are JSON and can be compared
+against a previous run to catch regressions before deploy:
+
+    python -m benchmarks.offline_suite --output bench_results.json
+    python -m benchmarks.offline_suite --compare bench_results.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import scraper
+import ai_synthesizer
+import pdf_generator
+import whatsapp_formatter
+from utils import deduplicate_items, extract_cves
+from benchmarks.common import measure, environment, write_results
+from benchmarks.standin import StandInServer, fixture_routes
+from benchmarks.stub_model import StubModel
+
+SUITE_VERSION = 1
+
+def _sources(server: StandInServer) -> dict:
+    return {
+        "rss": {"name": "MSRC (fixture)", "url": server.url("/"), "rss": server.url("/msrc_rss.xml"), "type": "rss", "language": "en", "rate_limit": 1000},
+        "xml": {"name": "VMware (fixture)", "url": server.url("/vmware_advisories.xml"), "type": "xml", "language": "en", "rate_limit": 1000},
+        "telegram": {"name": "CIAC Telegram (fixture)", "url": server.url("/telegram_ciac.html"), "type": "telegram_public", "language": "es", "region": "latam", "rate_limit": 1000},
+        "static": {"name": "Static bulletins (fixture)", "url": server.url("/static_page.html"), "type": "html", "language": "es", "region": "latam", "rate_limit": 1000},
+        "js": {"name": "Fortinet PSIRT (fixture)", "url": server.url("/js_page.html"), "type": "html", "language": "en", "concurrency": "browser", "rate_limit": 1000},
+    }
+
+def run(repeat: int = 5, include_browser: bool = False) -> dict:
+    results = {}
+    with StandInServer(fixture_routes()) as server:
+        sources = _sources(server)
+        fetchers = [
+            ("fetch_rss", lambda: scraper.fetch_rss(sources["rss"]["rss"], sources["rss"])),
+            ("fetch_xml", lambda: scraper.fetch_xml(sources["xml"]["url"], sources["xml"])),
+            ("fetch_telegram_public", lambda: scraper.fetch_telegram_public(sources["telegram"]["url"], sources["telegram"])),
+            ("fetch_html_requests", lambda: scraper.fetch_html_requests(sources["static"]["url"], sources["static"])),
+        ]
+        if include_browser:
+            # Includes Playwright's fixed post-load wait; off by default
+            fetchers.append(("fetch_html_playwright", lambda: scraper.fetch_html_playwright(sources["js"]["url"], sources["js"])))
+
+        items = []
+        for stage, fn in fetchers:
+            results[stage], fetched = measure(fn, repeat)
+            items.extend(fetched)
+
+    # Amplify the recorded items so the CPU-bound stages are measurable
+    amplified = items * 20
+    texts = [f"{i.title} {i.summary}" for i in amplified]
+    results["deduplicate_items"], unique = measure(lambda: deduplicate_items(amplified), repeat)
+    results["extract_cves"], _ = measure(lambda: [extract_cves(t) for t in texts], repeat)
+    results["synthesize_stub"], newsletter = measure(lambda: ai_synthesizer.synthesize(unique, model=StubModel()), repeat)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        pdf_path = os.path.join(out_dir, "bench.pdf")
+
+        def cold_pdf():
+            pdf_generator.reset_caches()
+            return pdf_generator.generate(newsletter, filepath=pdf_path)
+
+        results["render_pdf_cold"], _ = measure(cold_pdf, repeat)
+        results["render_pdf_warm"], _ = measure(lambda: pdf_generator.generate(newsletter, filepath=pdf_path), repeat)
+        results["render_whatsapp"], _ = measure(
+            lambda: whatsapp_formatter.generate(newsletter, filepath=os.path.join(out_dir, "wa.txt")), repeat
+        )
+
+    return {
+        "suite": "offline",
+        "version": SUITE_VERSION,
+        "environment": environment(),
+        "inputs": {"recorded_items": len(items), "amplified_items": len(amplified), "unique_items": len(unique)},
+        "results": results,
+    }
+
+def compare(current: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Returns the stages whose median got slower than baseline by more than max_regression."""
+    regressions = []
+    for stage, stats in current["results"].items():
+        base = baseline.get("results", {}).get(stage)
+        if not base or not base.get("median_s"):
+            continue
+        ratio = stats["median_s"] / base["median_s"]
+        flag = "REGRESSION" if ratio > 1 + max_regression else "ok"
+        print(f"{stage:<24} {base['median_s']:>10.5f}s -> {stats['median_s']:>10.5f}s  x{ratio:5.2f}  {flag}", file=sys.stderr)
+        if flag != "ok":
+            regressions.append(stage)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with recorded source fixtures")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--browser", action="store_true", help="Also benchmark the Playwright fetcher")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown ratio per stage (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    current = run(args.repeat, args.browser)
+    write_results(current, args.output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.max_regression)
+        if regressions:
+            print(f"Regressions detected: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
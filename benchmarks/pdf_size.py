@@ -0,0 +1,45 @@
+"""
+PDF and email size benchmark.
+
+Renders reports of increasing size and measures the PDF and the resulting
+email message: base64 attachment vs. the link-only HTML digest
+(EMAIL_DELIVERY_MODE=link).
+
+    python -m benchmarks.pdf_size --cards 10 40 100
+"""
+import argparse
+import os
+import tempfile
+
+import pdf_generator
+import gmail_sender
+from benchmarks.common import environment, write_results
+from benchmarks.samples import make_newsletter
+
+def _message_kb(newsletter, attachment=None, archive_url: str = "") -> float:
+    make_message = gmail_sender.message_factory(newsletter, "Benchmark", attachment, archive_url=archive_url)
+    return round(len(make_message(["reader@example.com"]).as_bytes()) / 1024, 1)
+
+def run(cards_list: list[int]) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for cards in cards_list:
+            newsletter = make_newsletter(cards)
+            path = pdf_generator.generate(newsletter, filepath=os.path.join(out_dir, f"report_{cards}.pdf"))
+            email_kb = {
+                "attachment": _message_kb(newsletter, gmail_sender.build_attachment(path)),
+                "link": _message_kb(newsletter, archive_url=f"https://reports.example.com/{os.path.basename(path)}"),
+            }
+            results[cards] = {
+                "pdf_kb": round(os.path.getsize(path) / 1024, 1),
+                "email_kb": email_kb,
+                "link_reduction_pct": round(100 * (1 - email_kb["link"] / email_kb["attachment"]), 1),
+            }
+    return {"benchmark": "pdf_size", "environment": environment(), "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF size and resulting email size, attachment vs. link")
+    parser.add_argument("--cards", type=int, nargs="+", default=[10, 40, 100])
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+    write_results(run(args.cards), args.output)
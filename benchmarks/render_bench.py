@@ -0,0 +1,45 @@
+"""
+Cold vs. warm PDF render benchmark.
+
+A cold render compiles the Jinja template and parses the stylesheet; warm
+renders reuse the cached objects, as in the long-lived Streamlit process.
+
+    python -m benchmarks.render_bench --cards 40 --warm-runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import pdf_generator
+from benchmarks.samples import make_newsletter
+
+def _render(newsletter, out_dir: str, run: int) -> float:
+    start = time.perf_counter()
+    pdf_generator.generate(newsletter, filepath=os.path.join(out_dir, f"bench_{run}.pdf"))
+    return time.perf_counter() - start
+
+def run(cards: int, warm_runs: int) -> dict:
+    newsletter = make_newsletter(cards)
+    with tempfile.TemporaryDirectory() as out_dir:
+        pdf_generator.reset_caches()
+        cold = _render(newsletter, out_dir, 0)
+        warm = [_render(newsletter, out_dir, i) for i in range(1, warm_runs + 1)]
+
+    return {
+        "benchmark": "pdf_render",
+        "cards": cards,
+        "cold_s": round(cold, 4),
+        "warm_mean_s": round(statistics.mean(warm), 4),
+        "warm_min_s": round(min(warm), 4),
+        "speedup": round(cold / statistics.mean(warm), 2),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold vs. warm PDF render benchmark")
+    parser.add_argument("--cards", type=int, default=40)
+    parser.add_argument("--warm-runs", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.cards, args.warm_runs), indent=2))
@@ -0,0 +1,62 @@
+from models import Newsletter
+
+def make_newsletter(cards: int = 12) -> Newsletter:
+    """Builds a deterministic newsletter with `cards` entries spread across all sections."""
+    critical, vulns, breaches, latam = [], [], [], []
+    for i in range(cards):
+        url = f"https://example.com/advisory/{i}"
+        bucket = i % 4
+        if bucket == 0:
+            critical.append({
+                "title": f"Critical remote code execution in Product {i}",
+                "severity": "CRITICAL" if i % 8 == 0 else "HIGH",
+                "description": "An unauthenticated attacker can execute arbitrary code via a crafted request. " * 2,
+                "cve_ids": [f"CVE-2025-{10000 + i}", f"CVE-2025-{20000 + i}"],
+                "affected_products": [f"Product {i}"],
+                "source_name": "Benchmark PSIRT",
+                "source_url": url,
+            })
+        elif bucket == 1:
+            vulns.append({
+                "title": f"Security update for Component {i}",
+                "severity": "MEDIUM" if i % 2 else "LOW",
+                "description": "Fixes an information disclosure issue in the management interface.",
+                "cve_ids": [f"CVE-2025-{30000 + i}"],
+                "affected_products": [f"Component {i}"],
+                "source_name": "Benchmark Vendor",
+                "source_url": url,
+            })
+        elif bucket == 2:
+            breaches.append({
+                "title": f"Data breach at Organization {i}",
+                "description": "Customer records were exposed through a misconfigured storage bucket.",
+                "impact": "Personal data of customers",
+                "source_name": "Benchmark News",
+                "source_url": url,
+            })
+        else:
+            latam.append({
+                "title": f"Campaña de phishing dirigida {i}",
+                "description": "Se detectó una campaña de phishing contra entidades financieras de la región.",
+                "source_name": "Benchmark CERT",
+                "source_url": url,
+                "language": "es",
+            })
+
+    return Newsletter.model_validate({
+        "week_label": "Week of Jan 06 - Jan 12, 2025 (BENCHMARK)",
+        "executive_summary": "Synthetic newsletter used for offline benchmarks. " * 3,
+        "critical_alerts": critical,
+        "vulnerabilities_and_patches": vulns,
+        "breaches_and_incidents": breaches,
+        "latam_venezuela_intelligence": latam,
+        "recommended_actions": ["Apply vendor patches."],
+        "stats": {
+            "total_items_analyzed": cards,
+            "critical_count": len(critical),
+            "high_count": 0,
+            "medium_count": len(vulns),
+            "sources_scraped": 4,
+            "cves_identified": cards,
+        },
+    })
@@ -0,0 +1,126 @@
+"""
+Email delivery benchmark against a local SMTP stand-in (aiosmtpd, no TLS/auth).
+
+Compares a fresh connection per message with the pooled session of
+gmail_sender.deliver (individual and BCC-batch modes), using a real PDF-sized
+attachment. --flaky makes the server answer 451 to a share of first attempts so
+the retry path is exercised too. Needs `pip install aiosmtpd`.
+
+    python -m benchmarks.smtp_bench --recipients 50 --attachment-kb 800
+    python -m benchmarks.smtp_bench --recipients 50 --flaky 0.2
+"""
+import argparse
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import environment, write_results
+from benchmarks.samples import make_newsletter
+
+BENCH_SENDER = "bench@example.com" # not GMAIL_SENDER, which is empty without a .env
+
+class CountingHandler:
+    """aiosmtpd handler: counts delivered envelopes, optionally defers some recipients once."""
+
+    def __init__(self, flaky: float, latency: float, seed: int = 7):
+        self.flaky, self.latency = flaky, latency
+        self.rng = random.Random(seed)
+        self.deferred = set()
+        self.messages = 0
+        self.recipients = 0
+        self.lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        with self.lock:
+            if address not in self.deferred and self.rng.random() < self.flaky:
+                self.deferred.add(address)
+                return "451 4.3.0 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            time.sleep(self.latency) # blocking on purpose: a slow upstream MTA
+        with self.lock:
+            self.messages += 1
+            self.recipients += len(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def run(recipients: int, attachment_kb: int, flaky: float, latency: float) -> dict:
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        sys.exit("aiosmtpd is required: pip install aiosmtpd")
+    import gmail_sender
+
+    addresses = [f"Reader {i} <reader{i}@example.com>" for i in range(recipients)]
+    newsletter = make_newsletter(10)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(b"%PDF-1.7\n" + os.urandom(attachment_kb * 1024))
+
+        scenarios = [
+            ("connection_per_message", "individual", True),
+            ("pooled_individual", "individual", False),
+            ("pooled_bcc", "bcc", False),
+        ]
+        for name, mode, reconnect_each in scenarios:
+            handler = CountingHandler(flaky, latency)
+            port = _free_port()
+            controller = Controller(handler, hostname="127.0.0.1", port=port)
+            controller.start()
+            try:
+                session = lambda: gmail_sender.SMTPSession("127.0.0.1", port, password="", starttls=False)
+                start = time.perf_counter()
+                attachment = gmail_sender.build_attachment(pdf_path)
+                make_message = gmail_sender.message_factory(newsletter, "Benchmark", attachment, mode=mode, sender=BENCH_SENDER)
+                if reconnect_each:
+                    # Previous behaviour: a new connection for every message
+                    deliveries = []
+                    for address in addresses:
+                        deliveries += gmail_sender.deliver([address], make_message, session, mode=mode, backoff=0.05)
+                else:
+                    deliveries = gmail_sender.deliver(addresses, make_message, session, mode=mode, backoff=0.05)
+                elapsed = time.perf_counter() - start
+            finally:
+                controller.stop()
+
+            per_recipient = sorted(d.seconds for d in deliveries)
+            results[name] = {
+                "total_s": round(elapsed, 4),
+                "delivered": sum(d.ok for d in deliveries),
+                "retried": sum(d.attempts > 1 for d in deliveries),
+                "server_messages": handler.messages,
+                "server_recipients": handler.recipients,
+                "per_recipient_p50_ms": round(per_recipient[len(per_recipient) // 2] * 1000, 2),
+                "per_recipient_max_ms": round(per_recipient[-1] * 1000, 2),
+            }
+
+    return {
+        "benchmark": "smtp",
+        "environment": environment(),
+        "params": {"recipients": recipients, "attachment_kb": attachment_kb, "flaky": flaky, "latency_s": latency},
+        "results": results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Email delivery benchmark against a local aiosmtpd server")
+    parser.add_argument("--recipients", type=int, default=50)
+    parser.add_argument("--attachment-kb", type=int, default=800)
+    parser.add_argument("--flaky", type=float, default=0.0, help="Share of recipients deferred (451) on first attempt")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the server takes to accept each message")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+    write_results(run(args.recipients, args.attachment_kb, args.flaky, args.latency), args.output)
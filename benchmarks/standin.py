@@ -0,0 +1,96 @@
+"""
+Local HTTP stand-in for upstream sources.
+
+Serves recorded fixtures (or generated bodies) on 127.0.0.1 so the fetchers
+run their real code paths without touching the network. Date placeholders in
+fixtures are rewritten to "now" so items pass the current-week filter.
+"""
+import os
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple, Union
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+CONTENT_TYPES = {
+    ".xml": "application/xml; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+}
+
+# path -> (content type, body or callable returning the body)
+Route = Tuple[str, Union[bytes, Callable[[], bytes]]]
+
+def this_week_placeholders() -> Dict[str, str]:
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    return {
+        "__THIS_WEEK_RFC822__": format_datetime(now),
+        "__THIS_WEEK_ISO__": now.isoformat(),
+        "__THIS_WEEK_DATE__": now.strftime("%b %d, %Y"),
+    }
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        text = f.read()
+    for placeholder, value in this_week_placeholders().items():
+        text = text.replace(placeholder, value)
+    return text.encode("utf-8")
+
+def fixture_routes() -> Dict[str, Route]:
+    """One route per recorded fixture: /<fixture file name>."""
+    routes = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        ext = os.path.splitext(name)[1]
+        if ext in CONTENT_TYPES:
+            routes[f"/{name}"] = (CONTENT_TYPES[ext], load_fixture(name))
+    return routes
+
+class StandInServer:
+    """Threaded HTTP server on an ephemeral localhost port. Use as a context manager."""
+
+    def __init__(self, routes: Dict[str, Route]):
+        self.routes = routes
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                route = server.routes.get(self.path.split("?", 1)[0])
+                with server._lock:
+                    server.requests += 1
+                if route is None:
+                    self.send_error(404)
+                    return
+                content_type, body = route
+                if callable(body):
+                    body = body()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
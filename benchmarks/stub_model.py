@@ -0,0 +1,57 @@
+import json
+import time
+from types import SimpleNamespace
+
+class StubModel:
+    """
+    Deterministic stand-in for genai.GenerativeModel used by the benchmarks.
+    Echoes the INPUT DATA items back in the newsletter schema, so the
+    synthesizer's prompt building, JSON parsing and validation run for real.
+    """
+
+    def __init__(self, latency: float = 0.0, max_per_section: int = 10):
+        self.latency = latency
+        self.max_per_section = max_per_section
+
+    def generate_content(self, prompt: str, generation_config=None):
+        payload = prompt.split("INPUT DATA:\n", 1)[1].rsplit("\n\nOUTPUT SCHEMA ONLY JSON:", 1)[0]
+        items = json.loads(payload)
+
+        sections = {
+            "critical_alerts": [],
+            "vulnerabilities_and_patches": [],
+            "breaches_and_incidents": [],
+            "latam_venezuela_intelligence": [],
+        }
+        for item in items:
+            entry = {
+                "title": item["title"],
+                "severity": item["severity"],
+                "description": (item["summary"] or "")[:200],
+                "cve_ids": item["cve_ids"],
+                "affected_products": [],
+                "source_name": item["source_name"],
+                "source_url": item["url"],
+            }
+            if item["region"] == "latam":
+                section = "latam_venezuela_intelligence"
+            elif item["severity"] in ("CRITICAL", "HIGH"):
+                section = "critical_alerts"
+            else:
+                section = "vulnerabilities_and_patches"
+            if len(sections[section]) < self.max_per_section:
+                sections[section].append(entry)
+
+        text = json.dumps({
+            "week_label": "Week of BENCHMARK",
+            "executive_summary": f"Stub synthesis of {len(items)} items.",
+            **sections,
+            "recommended_actions": [],
+            "stats": {},
+        })
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4),
+        )
@@ -14,14 +14,48 @@ GMAIL_SENDER = os.getenv("GMAIL_SENDER", "")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD", "")
 GMAIL_RECIPIENTS = [email.strip() for email in os.getenv("GMAIL_RECIPIENTS", "").split(",") if email.strip()]
 SEND_EMAIL = os.getenv("SEND_EMAIL", "true").lower() == "true"
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+EMAIL_MODE = os.getenv("EMAIL_MODE", "individual") # individual (one message per recipient) | bcc
+EMAIL_BCC_BATCH = int(os.getenv("EMAIL_BCC_BATCH", "50")) # recipients per message in bcc mode
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+EMAIL_RETRY_BACKOFF = float(os.getenv("EMAIL_RETRY_BACKOFF", "5")) # seconds, doubled per retry
+EMAIL_DELIVERY_MODE = os.getenv("EMAIL_DELIVERY_MODE", "attachment") # attachment | link (HTML digest + link to the archived PDF)
+ARCHIVE_BASE_URL = os.getenv("ARCHIVE_BASE_URL", "") # public URL where OUTPUT_DIR is served, used for link delivery
+EMAIL_MAX_ATTACHMENT_MB = float(os.getenv("EMAIL_MAX_ATTACHMENT_MB", "10")) # bigger PDFs go out as a link when ARCHIVE_BASE_URL is set
 
 # --- General Configuration ---
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "./output")
 TIMEZONE = os.getenv("TIMEZONE", "America/Caracas")
+DATA_DIR = os.getenv("DATA_DIR", "./data")
+ITEM_STORE_PATH = os.path.join(DATA_DIR, "items.db")
+SOURCE_HEALTH_PATH = os.path.join(DATA_DIR, "source_health.json")
+# Local CVE index (NVD + CISA KEV), bulk imported from the feed files in CVE_FEEDS_DIR
+CVE_INDEX_PATH = os.path.join(DATA_DIR, "cve_index.db")
+CVE_FEEDS_DIR = os.getenv("CVE_FEEDS_DIR", os.path.join(DATA_DIR, "cve_feeds"))
+CVE_FEED_URLS = [u.strip() for u in os.getenv(
+    "CVE_FEED_URLS",
+    "https://www.cisa.gov/sites/default/files/feeds/known_exploited_vulnerabilities.json,"
+    "https://nvd.nist.gov/feeds/json/cve/2.0/nvdcve-2.0-modified.json.gz"
+).split(",") if u.strip()] # empty = fully offline, import only what is dropped in CVE_FEEDS_DIR
+CVE_INDEX_REFRESH_HOURS = float(os.getenv("CVE_INDEX_REFRESH_HOURS", "24"))
+# Dashboard caches of the current week's scrape, synthesis and rendered outputs (seconds)
+DASHBOARD_ITEMS_TTL = int(os.getenv("DASHBOARD_ITEMS_TTL", "1800"))
+DASHBOARD_SYNTHESIS_TTL = int(os.getenv("DASHBOARD_SYNTHESIS_TTL", "21600"))
+DASHBOARD_ARTIFACTS_TTL = int(os.getenv("DASHBOARD_ARTIFACTS_TTL", "21600"))
+# Delta mode: only new/updated items go to synthesis; unchanged carry-overs are listed as "still open"
+DELTA_MODE = os.getenv("DELTA_MODE", "false").lower() == "true"
+DELTA_LOOKBACK_WEEKS = int(os.getenv("DELTA_LOOKBACK_WEEKS", "12")) # how far back previous reports count
+DELTA_STILL_OPEN_MAX = int(os.getenv("DELTA_STILL_OPEN_MAX", "25"))
+WHATSAPP_MAX_CHARS = int(os.getenv("WHATSAPP_MAX_CHARS", "4000")) # per message; WhatsApp's hard limit is 4096
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) # Prometheus endpoint for the scheduler, 0 = disabled
 
 # Ensure output directory exists (relative to where script is run, usually project root)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs("logs", exist_ok=True)
 
 # --- Logging Configuration ---
@@ -55,83 +89,9 @@ def setup_logger(name="cyber_newsletter"):
 logger = setup_logger()
 
 # --- Sources Configuration ---
-GLOBAL_SOURCES = [
-    {
-        "name": "Microsoft Security Response Center",
-        "url": "https://msrc.microsoft.com/update-guide/",
-        "rss": "https://api.msrc.microsoft.com/update-guide/rss",
-        "type": "rss",
-        "language": "en"
-    },
-    {
-        "name": "Red Hat Security Advisories",
-        "url": "https://access.redhat.com/security/security-updates/",
-        "rss": "https://access.redhat.com/security/data/metrics/rhsa.rss",
-        "type": "rss",
-        "language": "en"
-    },
-    {
-        "name": "Red Hat Security Data",
-        "url": "https://access.redhat.com/security/data",
-        "type": "html",
-        "language": "en"
-    },
-    {
-        "name": "Broadcom Security Advisories",
-        "url": "https://support.broadcom.com/group/ecx/security-advisories",
-        "type": "html",
-        "language": "en"
-    },
-    {
-        "name": "VMware Security Advisories",
-        "url": "https://www.vmware.com/security/advisories.xml",
-        "type": "xml",
-        "language": "en"
-    },
-    {
-        "name": "Fortinet FortiGuard PSIRT",
-        "url": "https://www.fortiguard.com/psirt",
-        "type": "html",
-        "language": "en"
-    },
-    {
-        "name": "Stellar Cyber Support",
-        "url": "https://stellarcyber.ai/support/",
-        "type": "html",
-        "language": "en"
-    },
-    {
-        "name": "Stellar Cyber Trust Center",
-        "url": "https://stellarcyber.ai/trust-center/",
-        "type": "html",
-        "language": "en"
-    }
-]
-
-LATAM_SOURCES = [
-    {
-        "name": "CIAC Venezuela (Telegram)",
-        "url": "https://t.me/ciberciac",
-        "type": "telegram_public",
-        "language": "es"
-    },
-    {
-        "name": "InfoDefensa CIAC",
-        "url": "https://www.infodefensa.com/tag/ciac",
-        "type": "html",
-        "language": "es"
-    },
-    {
-        "name": "VenCERT / SUSCERTE Boletines",
-        "url": "https://vencert.suscerte.gob.ve/boletines/",
-        "type": "html",
-        "language": "es"
-    },
-    {
-        "name": "Telefónica Tech Boletín Ciberseguridad",
-        "url": "https://telefonicatech.com/blog/boletin-ciberseguridad",
-        "type": "html",
-        "language": "es",
-        "note": "Always get the most recent weekly bulletin available"
-    }
-]
+# Sources live in the registry file (see sources.yaml / source_registry.py),
+# hot-reloaded by the scheduler; each source is polled into the item store.
+SOURCES_FILE = os.getenv("SOURCES_FILE", "sources.yaml")
+HTTP_POLL_WORKERS = int(os.getenv("HTTP_POLL_WORKERS", "8"))
+HOST_RATE_LIMIT = float(os.getenv("HOST_RATE_LIMIT", "1.0")) # requests/second per host, lowered by robots.txt Crawl-delay
+HOST_BURST = float(os.getenv("HOST_BURST", "3"))
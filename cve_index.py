@@ -0,0 +1,318 @@
+import os
+import glob
+import gzip
+import json
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import formatdate
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from config import logger, CVE_INDEX_PATH, CVE_FEEDS_DIR, CVE_FEED_URLS
+from utils import NewsItem, atomic_write
+import instrumentation
+
+# Local CVE index built from offline NVD JSON feeds (1.1 "CVE_Items" or 2.0
+# "vulnerabilities" format, .json or .json.gz) and the CISA KEV catalog.
+# Feed files are dropped in (or downloaded into) CVE_FEEDS_DIR and bulk
+# imported into SQLite; enrich() then adds CVSS, CWE, vendor/product and the
+# KEV flag to items with batched primary-key lookups.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cves (
+    cve_id        TEXT PRIMARY KEY,
+    cvss          REAL,              -- highest-version base score available (3.1 > 3.0 > 2.0)
+    cvss_vector   TEXT,
+    cwe_ids       TEXT,              -- JSON list
+    products      TEXT,              -- JSON list of "vendor product" from vulnerable CPEs
+    published     TEXT,
+    last_modified TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS kev (
+    cve_id     TEXT PRIMARY KEY,
+    vendor     TEXT,
+    product    TEXT,
+    date_added TEXT,
+    due_date   TEXT,
+    ransomware INTEGER NOT NULL      -- known use in ransomware campaigns
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS feed_imports (
+    path        TEXT PRIMARY KEY,
+    mtime       REAL NOT NULL,
+    records     INTEGER NOT NULL,
+    imported_at TEXT NOT NULL
+);
+"""
+
+MAX_PRODUCTS = 10
+LOOKUP_BATCH = 500 # stays under SQLite's bound-parameter limit
+
+SEVERITY_RANK = {"UNKNOWN": 0, "INFO": 0, "LOW": 1, "MEDIUM": 2, "HIGH": 3, "CRITICAL": 4}
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+@dataclass
+class CVEInfo:
+    cve_id: str
+    cvss: Optional[float] = None
+    cvss_vector: str = ""
+    cwe_ids: List[str] = field(default_factory=list)
+    products: List[str] = field(default_factory=list)
+    kev: bool = False
+    kev_due_date: str = ""
+    ransomware: bool = False
+
+def cvss_severity(score: float) -> str:
+    """CVSS v3 qualitative rating of a base score."""
+    if score >= 9.0:
+        return "CRITICAL"
+    if score >= 7.0:
+        return "HIGH"
+    if score >= 4.0:
+        return "MEDIUM"
+    if score > 0:
+        return "LOW"
+    return "INFO"
+
+@contextmanager
+def connect(path: str = CVE_INDEX_PATH):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with _init_lock:
+            if path not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                _initialized.add(path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _product(cpe: str) -> Optional[str]:
+    """'cpe:2.3:a:apache:http_server:2.4.1:...' -> 'apache http_server'"""
+    parts = cpe.split(":")
+    if len(parts) < 5 or parts[3] in ("*", "-"):
+        return None
+    return f"{parts[3]} {parts[4]}"
+
+def _add_products(products: List[str], cpes: Iterable[str]):
+    for cpe in cpes:
+        name = _product(cpe)
+        if name and name not in products and len(products) < MAX_PRODUCTS:
+            products.append(name)
+
+def _nvd11_nodes(nodes: list) -> Iterator[str]:
+    for node in nodes or []:
+        for match in node.get("cpe_match", []):
+            if match.get("vulnerable"):
+                yield match.get("cpe23Uri", "")
+        yield from _nvd11_nodes(node.get("children"))
+
+def _parse_nvd11(doc: dict) -> Iterator[tuple]:
+    for entry in doc.get("CVE_Items", []):
+        cve = entry.get("cve", {})
+        impact = entry.get("impact", {})
+        metric = impact.get("baseMetricV3", {}).get("cvssV3") or impact.get("baseMetricV2", {}).get("cvssV2") or {}
+        cwes = [
+            d["value"] for p in cve.get("problemtype", {}).get("problemtype_data", [])
+            for d in p.get("description", []) if d.get("value", "").startswith("CWE-")
+        ]
+        products = []
+        _add_products(products, _nvd11_nodes(entry.get("configurations", {}).get("nodes")))
+        yield (
+            cve.get("CVE_data_meta", {}).get("ID"), metric.get("baseScore"), metric.get("vectorString", ""),
+            sorted(set(cwes)), products, entry.get("publishedDate"), entry.get("lastModifiedDate")
+        )
+
+def _parse_nvd20(doc: dict) -> Iterator[tuple]:
+    for entry in doc.get("vulnerabilities", []):
+        cve = entry.get("cve", {})
+        metrics = cve.get("metrics", {})
+        metric = {}
+        for key in ("cvssMetricV31", "cvssMetricV30", "cvssMetricV2"):
+            candidates = metrics.get(key) or []
+            # Prefer NVD's own ("Primary") score over a CNA's
+            chosen = next((m for m in candidates if m.get("type") == "Primary"), candidates[0] if candidates else None)
+            if chosen:
+                metric = chosen.get("cvssData", {})
+                break
+        cwes = [
+            d["value"] for w in cve.get("weaknesses", [])
+            for d in w.get("description", []) if d.get("value", "").startswith("CWE-")
+        ]
+        products = []
+        for config in cve.get("configurations", []):
+            for node in config.get("nodes", []):
+                _add_products(products, (m.get("criteria", "") for m in node.get("cpeMatch", []) if m.get("vulnerable")))
+        yield (
+            cve.get("id"), metric.get("baseScore"), metric.get("vectorString", ""),
+            sorted(set(cwes)), products, cve.get("published"), cve.get("lastModified")
+        )
+
+def _parse_kev(doc: dict) -> Iterator[tuple]:
+    for entry in doc.get("vulnerabilities", []):
+        yield (
+            entry.get("cveID"), entry.get("vendorProject", ""), entry.get("product", ""),
+            entry.get("dateAdded", ""), entry.get("dueDate", ""),
+            int(entry.get("knownRansomwareCampaignUse", "").lower() == "known")
+        )
+
+def _load(path: str) -> dict:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def import_file(path: str, db_path: str = CVE_INDEX_PATH) -> int:
+    """Bulk-imports one NVD feed or KEV catalog in a single transaction. Returns the number of records."""
+    doc = _load(path)
+    with connect(db_path) as conn:
+        if "catalogVersion" in doc:
+            rows = [r for r in _parse_kev(doc) if r[0]]
+            # The catalog is always published whole: replace it, so removals apply too
+            conn.execute("DELETE FROM kev")
+            conn.executemany("INSERT OR REPLACE INTO kev VALUES (?, ?, ?, ?, ?, ?)", rows)
+        else:
+            parsed = _parse_nvd11(doc) if "CVE_Items" in doc else _parse_nvd20(doc)
+            rows = [
+                (cve_id, score, vector, json.dumps(cwes), json.dumps(products), published, modified)
+                for cve_id, score, vector, cwes, products, published, modified in parsed if cve_id
+            ]
+            # Yearly and "modified" feeds overlap: keep whichever record is newer, in any import order
+            conn.executemany("""
+                INSERT INTO cves VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(cve_id) DO UPDATE SET
+                    cvss = excluded.cvss, cvss_vector = excluded.cvss_vector, cwe_ids = excluded.cwe_ids,
+                    products = excluded.products, published = excluded.published,
+                    last_modified = excluded.last_modified
+                WHERE excluded.last_modified >= cves.last_modified OR cves.last_modified IS NULL
+            """, rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO feed_imports VALUES (?, ?, ?, ?)",
+            (os.path.abspath(path), os.path.getmtime(path), len(rows), datetime.now(timezone.utc).isoformat())
+        )
+    return len(rows)
+
+def import_feeds(feed_dir: str = CVE_FEEDS_DIR, db_path: str = CVE_INDEX_PATH, force: bool = False) -> int:
+    """Imports every feed file in `feed_dir` that changed since its last import. Returns records imported."""
+    paths = sorted(glob.glob(os.path.join(feed_dir, "*.json")) + glob.glob(os.path.join(feed_dir, "*.json.gz")))
+    with connect(db_path) as conn:
+        imported = {r["path"]: r["mtime"] for r in conn.execute("SELECT path, mtime FROM feed_imports")}
+    total = 0
+    for path in paths:
+        if not force and imported.get(os.path.abspath(path)) == os.path.getmtime(path):
+            continue
+        try:
+            with instrumentation.span("cve_import", feed=os.path.basename(path)) as s:
+                records = import_file(path, db_path)
+                s.set("records", records)
+            logger.info(f"Imported {records} records from {os.path.basename(path)} into the CVE index")
+            total += records
+        except (OSError, ValueError, sqlite3.Error) as e:
+            logger.error(f"Failed to import CVE feed {path}: {e}")
+    return total
+
+def download_feeds(urls: List[str] = CVE_FEED_URLS, feed_dir: str = CVE_FEEDS_DIR) -> List[str]:
+    """Downloads each feed URL into `feed_dir` unless the server reports it unchanged. Returns updated paths."""
+    import requests
+    os.makedirs(feed_dir, exist_ok=True)
+    updated = []
+    for url in urls:
+        path = os.path.join(feed_dir, url.rstrip("/").rsplit("/", 1)[-1])
+        headers = {"If-Modified-Since": formatdate(os.path.getmtime(path), usegmt=True)} if os.path.exists(path) else {}
+        try:
+            with requests.get(url, headers=headers, timeout=60, stream=True) as response:
+                if response.status_code == 304:
+                    continue
+                response.raise_for_status()
+                with atomic_write(path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=1 << 16):
+                        f.write(chunk)
+            updated.append(path)
+        except (requests.RequestException, OSError) as e:
+            logger.error(f"Failed to download CVE feed {url}: {e}")
+    return updated
+
+def refresh() -> int:
+    """Scheduler job: downloads the configured feeds, then imports whatever changed."""
+    with instrumentation.run("cve_index"):
+        if CVE_FEED_URLS:
+            download_feeds()
+        return import_feeds()
+
+def lookup(cve_ids: Iterable[str], db_path: str = CVE_INDEX_PATH) -> Dict[str, CVEInfo]:
+    """CVE id -> CVEInfo for every id the index knows (NVD and/or KEV)."""
+    ids = sorted({c.upper() for c in cve_ids})
+    found: Dict[str, CVEInfo] = {}
+    with connect(db_path) as conn:
+        for i in range(0, len(ids), LOOKUP_BATCH):
+            batch = ids[i:i + LOOKUP_BATCH]
+            marks = ",".join("?" * len(batch))
+            for r in conn.execute(f"SELECT * FROM cves WHERE cve_id IN ({marks})", batch):
+                found[r["cve_id"]] = CVEInfo(
+                    r["cve_id"], r["cvss"], r["cvss_vector"] or "",
+                    json.loads(r["cwe_ids"] or "[]"), json.loads(r["products"] or "[]")
+                )
+            for r in conn.execute(f"SELECT * FROM kev WHERE cve_id IN ({marks})", batch):
+                info = found.setdefault(r["cve_id"], CVEInfo(r["cve_id"]))
+                info.kev, info.kev_due_date, info.ransomware = True, r["due_date"] or "", bool(r["ransomware"])
+                if not info.products and r["vendor"]:
+                    info.products.append(f"{r['vendor']} {r['product']}".strip())
+    return found
+
+def enrich(items: List[NewsItem], db_path: str = CVE_INDEX_PATH) -> int:
+    """
+    Adds CVSS, CWE, affected products and the KEV flag to items that mention
+    indexed CVEs. Severity becomes the rating of the highest CVSS score, and
+    at least HIGH for a known exploited vulnerability. Returns items enriched.
+    """
+    wanted = {c for item in items for c in item.cve_ids}
+    if not wanted:
+        return 0
+    try:
+        known = lookup(wanted, db_path)
+    except sqlite3.Error as e:
+        logger.warning(f"CVE index unavailable, skipping enrichment: {e}")
+        return 0
+
+    enriched = 0
+    for item in items:
+        infos = [known[c.upper()] for c in item.cve_ids if c.upper() in known]
+        if not infos:
+            continue
+        scores = [i.cvss for i in infos if i.cvss is not None]
+        if scores:
+            item.cvss = max(scores)
+            item.severity = cvss_severity(item.cvss)
+        item.kev = any(i.kev for i in infos)
+        if item.kev and SEVERITY_RANK.get(item.severity, 0) < SEVERITY_RANK["HIGH"]:
+            item.severity = "HIGH"
+        item.cwe_ids = sorted({cwe for i in infos for cwe in i.cwe_ids})
+        products = []
+        for info in infos:
+            products += [p for p in info.products if p not in products]
+        item.affected_products = products[:MAX_PRODUCTS]
+        enriched += 1
+    logger.info(f"CVE index enriched {enriched}/{len(items)} items ({len(known)}/{len(wanted)} CVEs known)")
+    return enriched
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the local CVE index from NVD / CISA KEV feeds")
+    parser.add_argument("files", nargs="*", help=f"Feed files to import (default: changed files in {CVE_FEEDS_DIR})")
+    parser.add_argument("--download", action="store_true", help="Download CVE_FEED_URLS into the feeds directory first")
+    parser.add_argument("--force", action="store_true", help="Re-import files even if unchanged")
+    args = parser.parse_args()
+
+    if args.files:
+        for path in args.files:
+            logger.info(f"Imported {import_file(path)} records from {path}")
+    else:
+        if args.download:
+            download_feeds()
+        import_feeds(force=args.force)
@@ -1,69 +1,163 @@
 import argparse
 import sys
-from apscheduler.schedulers.blocking import BlockingScheduler
+from datetime import datetime, timedelta
 
 import config
 from config import logger, TIMEZONE
 import scraper
-import ai_synthesizer
-import pdf_generator
-import whatsapp_formatter
-import gmail_sender
-from utils import deduplicate_items
+import delta
+import pipeline
+import instrumentation
+import metrics
+import profiling
+import item_store
+import source_registry
+import cve_index
+import search_index
+import rollup
+from utils import deduplicate_items, get_week_label, week_bounds
 
 def run_weekly_newsletter():
     logger.info("=== Starting Weekly Cyber Newsletter Generation ===")
+    profiling.new_run()
     
-    try:
-        # Step 1: Scrape all sources
-        raw_items = scraper.collect_all_sources()
-        logger.info(f"Collected {len(raw_items)} raw items from sources")
-        
-        # Deduplicate
-        all_items = deduplicate_items(raw_items)
-        logger.info(f"After deduplication: {len(all_items)} unique items")
-
-        # Step 2: Validate
-        if len(all_items) == 0:
-            logger.warning("No items collected for this week. Proceeding with empty report generation to notify stakeholders.")
-        
-        # Step 3: AI synthesis
-        newsletter_data = ai_synthesizer.synthesize(all_items)
-        
-        # Step 4: Generate PDF
-        pdf_path = pdf_generator.generate(newsletter_data)
-        logger.info(f"PDF generated: {pdf_path}")
-        
-        # Step 5: Generate WhatsApp version
-        wa_path = whatsapp_formatter.generate(newsletter_data)
-        logger.info(f"WhatsApp text generated: {wa_path}")
-        
-        # Step 6: Send email (if enabled)
-        if config.SEND_EMAIL:
-            gmail_sender.send(pdf_path, newsletter_data)
-        else:
-            logger.info(f"Email sending disabled in config. PDF saved at: {pdf_path}")
+    with instrumentation.run("weekly_newsletter") as report:
+        try:
+            with profiling.stage("scrape"):
+                # Step 1: Poll the sources that are due, then read the week from the item store
+                with instrumentation.span("scrape") as s:
+                    scraper.refresh_stale_sources()
+                    raw_items = item_store.items_between(*week_bounds(TIMEZONE))
+                    s.set("items", len(raw_items))
+                logger.info(f"Collected {len(raw_items)} raw items for this week from the item store")
+                
+                # Deduplicate
+                with instrumentation.span("dedup") as s:
+                    all_items = deduplicate_items(raw_items)
+                    s.set("items", len(all_items))
+
+                # CVSS / CWE / products / KEV from the local CVE index
+                with instrumentation.span("enrich") as s:
+                    s.set("items", cve_index.enrich(all_items))
+            logger.info(f"After deduplication: {len(all_items)} unique items")
+
+            # Precomputed counts for monthly/quarterly roll-ups
+            week = get_week_label(TIMEZONE)
+            try:
+                rollup.store_week_aggregate(week, all_items)
+            except Exception as e:
+                logger.error(f"Failed to store this week's aggregate: {e}")
+
+            # Step 2: Validate
+            if len(all_items) == 0:
+                logger.warning("No items collected for this week. Proceeding with empty report generation to notify stakeholders.")
             
-    except Exception as e:
-        logger.exception(f"FATAL ERROR inside main execution loop: {e}")
-        
+            # Step 3: AI synthesis (only new/updated items in delta mode)
+            with profiling.stage("synthesize"), instrumentation.span("synthesize"):
+                newsletter_data = delta.synthesize(all_items, week)
+            search_index.index_newsletter_safely(newsletter_data, week)
+            
+            # Step 4: Render PDF + WhatsApp concurrently, email as soon as the PDF is ready (if enabled)
+            with profiling.stage("render"):
+                rendered = pipeline.render_outputs(newsletter_data, send_email=config.SEND_EMAIL)
+            if not config.SEND_EMAIL:
+                logger.info(f"Email sending disabled in config. PDF saved at: {rendered.pdf_path}")
+                
+        except Exception as e:
+            report.status = "error"
+            logger.exception(f"FATAL ERROR inside main execution loop: {e}")
+    
+    instrumentation.write_summary(report, get_week_label(TIMEZONE))
     logger.info("=== Newsletter Generation Complete ===")
 
+def poll_registered_source(name: str):
+    """Scheduler job: polls one source, looked up at run time so registry edits apply immediately."""
+    source = source_registry.get_registry().get(name)
+    if source is None or not source["enabled"]:
+        return
+    with instrumentation.run(f"poll:{name}"):
+        scraper.poll_source(source)
+
+_source_job_signatures = {} # job id -> (poll_interval, concurrency)
+
+def sync_source_jobs(scheduler):
+    """Adds, reschedules or removes one polling job per enabled source."""
+    wanted = {}
+    for rank, source in enumerate(source_registry.get_registry().sources):
+        job_id = f"poll:{source['name']}"
+        signature = (source["poll_interval"], source["concurrency"])
+        wanted[job_id] = source
+        if _source_job_signatures.get(job_id) == signature:
+            continue
+        scheduler.add_job(
+            poll_registered_source, 'interval',
+            minutes=source["poll_interval"],
+            args=[source["name"]],
+            id=job_id,
+            replace_existing=True,
+            executor="browser" if source["concurrency"] == "browser" else "default",
+            # Stagger the first polls, highest priority first
+            next_run_time=datetime.now(scheduler.timezone) + timedelta(seconds=5 + rank * 2)
+        )
+        _source_job_signatures[job_id] = signature
+        logger.info(f"Polling '{source['name']}' every {source['poll_interval']:g} min ({source['concurrency']})")
+
+    for job_id in list(_source_job_signatures):
+        if job_id not in wanted:
+            scheduler.remove_job(job_id)
+            del _source_job_signatures[job_id]
+            logger.info(f"Stopped polling '{job_id[len('poll:'):]}'")
+
+def reload_sources(scheduler):
+    if source_registry.get_registry().reload_if_changed():
+        sync_source_jobs(scheduler)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Cybersecurity Newsletter Automation")
     parser.add_argument("--run-now", action="store_true", help="Run the newsletter generation immediately once.")
+    parser.add_argument(
+        "--profile", choices=profiling.MODES,
+        help="Profile each stage (scrape/synthesize/render) with cProfile (cpu) or tracemalloc (mem). "
+             "Reports are written next to the outputs."
+    )
     args = parser.parse_args()
 
+    if args.profile:
+        profiling.enable(args.profile)
+
     if args.run_now:
         run_weekly_newsletter()
         sys.exit(0)
 
-    # Schedule setup
+    # Optional Prometheus endpoint (METRICS_PORT)
+    metrics.start_server(config.METRICS_PORT)
+
+    # Schedule setup (APScheduler is only needed in daemon mode)
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    from apscheduler.executors.pool import ThreadPoolExecutor
     logger.info(f"Starting APScheduler... Timezone configured: {TIMEZONE}")
-    scheduler = BlockingScheduler(timezone=TIMEZONE)
+    scheduler = BlockingScheduler(
+        timezone=TIMEZONE,
+        executors={
+            "default": ThreadPoolExecutor(config.HTTP_POLL_WORKERS),
+            "browser": ThreadPoolExecutor(1), # Playwright sources, one at a time
+            "newsletter": ThreadPoolExecutor(1),
+        },
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 600}
+    )
     
     # Schedule: Every Monday at 08:00 local time
-    scheduler.add_job(run_weekly_newsletter, 'cron', day_of_week='mon', hour=8, minute=0)
+    scheduler.add_job(run_weekly_newsletter, 'cron', day_of_week='mon', hour=8, minute=0, id="weekly_newsletter", executor="newsletter")
+    
+    # Per-source polling into the item store, kept in sync with the (hot-reloaded) registry
+    sync_source_jobs(scheduler)
+    scheduler.add_job(reload_sources, 'interval', seconds=30, args=[scheduler], id="registry_reload")
+
+    # Periodic bulk import of the NVD / CISA KEV feeds into the local CVE index
+    scheduler.add_job(
+        cve_index.refresh, 'interval', hours=config.CVE_INDEX_REFRESH_HOURS, id="cve_index",
+        next_run_time=datetime.now(scheduler.timezone) + timedelta(seconds=60)
+    )
     
     logger.info("Scheduler is running. Press Ctrl+C to exit. Next run scheduled for next Monday at 08:00.")
     try:
@@ -0,0 +1,191 @@
+import re
+import hashlib
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from config import logger, TIMEZONE, ITEM_STORE_PATH, DELTA_MODE, DELTA_LOOKBACK_WEEKS, DELTA_STILL_OPEN_MAX
+from utils import NewsItem, canonical_url, get_week_date_range
+from models import Newsletter, StillOpen, SECTION_MODELS, compute_stats
+from cve_index import SEVERITY_RANK
+import ai_synthesizer
+import instrumentation
+import item_store
+
+# Week-over-week delta mode. Every week's input items are recorded in the
+# item store (reported_items). In delta mode this week's items are compared
+# with those of the previous DELTA_LOOKBACK_WEEKS reports:
+#   same canonical URL and content            -> unchanged (carry-over)
+#   same canonical URL, different content     -> updated
+#   other URL, same content                   -> unchanged (re-post)
+#   other URL, different content, same CVEs   -> updated
+# Becoming KEV-listed counts as an update. Only new and updated items are
+# synthesized; carry-overs are rendered locally as the "still open" list.
+
+NEW, UPDATED, UNCHANGED = "new", "updated", "unchanged"
+LOOKUP_BATCH = 500
+
+_SPACE_RE = re.compile(r"\s+")
+
+def content_hash(item: NewsItem) -> str:
+    text = _SPACE_RE.sub(" ", f"{item.title}\n{item.summary}".lower()).strip()
+    return hashlib.sha256(f"{text}\0{cve_key(item)}".encode("utf-8")).hexdigest()[:24]
+
+def cve_key(item: NewsItem) -> str:
+    return ",".join(sorted({c.upper() for c in item.cve_ids}))
+
+def week_offset(week: str, weeks: int) -> str:
+    """ISO week label `weeks` weeks before `week` ("2025-W03", 2 -> "2025-W01")."""
+    year, number = week.split("-W")
+    monday = date.fromisocalendar(int(year), int(number), 1) - timedelta(weeks=weeks)
+    iso = monday.isocalendar()
+    return f"{iso[0]}-W{iso[1]:02d}"
+
+@dataclass
+class Previous:
+    first_week: str
+    content_hash: str = ""
+    kev: bool = False
+
+@dataclass
+class DeltaResult:
+    new: List[NewsItem] = field(default_factory=list)
+    updated: List[NewsItem] = field(default_factory=list)
+    unchanged: List[NewsItem] = field(default_factory=list)
+    first_reported: Dict[str, str] = field(default_factory=dict) # canonical URL of a carry-over -> week
+
+    @property
+    def changed(self) -> List[NewsItem]:
+        return self.new + self.updated
+
+def _previous(items: List[NewsItem], week: str, path: str):
+    """Earlier reports' rows that share a URL, content hash or CVE set with `items`, oldest first."""
+    keys = {
+        "canonical_url": sorted({canonical_url(i.url) for i in items}),
+        "content_hash": sorted({content_hash(i) for i in items}),
+        "cve_key": sorted({k for k in map(cve_key, items) if k}),
+    }
+    since = week_offset(week, DELTA_LOOKBACK_WEEKS)
+    rows = {}
+    with item_store.connect(path) as conn:
+        for column, values in keys.items():
+            for n in range(0, len(values), LOOKUP_BATCH):
+                batch = values[n:n + LOOKUP_BATCH]
+                for r in conn.execute(
+                    f"SELECT * FROM reported_items WHERE week >= ? AND week < ? AND {column} IN ({','.join('?' * len(batch))})",
+                    (since, week, *batch)
+                ):
+                    rows[(r["week"], r["canonical_url"])] = r
+    return [rows[k] for k in sorted(rows)]
+
+def classify(items: List[NewsItem], week: str, path: str = ITEM_STORE_PATH) -> DeltaResult:
+    by_url: Dict[str, Previous] = {}
+    by_hash: Dict[str, Previous] = {}
+    by_cves: Dict[str, Previous] = {}
+    for r in _previous(items, week, path):
+        for index, key in ((by_url, r["canonical_url"]), (by_hash, r["content_hash"]), (by_cves, r["cve_key"])):
+            if not key:
+                continue
+            prev = index.setdefault(key, Previous(r["week"]))
+            # Rows come oldest first: keep the first week, compare against the latest state
+            prev.content_hash, prev.kev = r["content_hash"], bool(r["kev"])
+
+    result = DeltaResult()
+    for item in items:
+        url, digest, cves = canonical_url(item.url), content_hash(item), cve_key(item)
+        prev = by_url.get(url)
+        if prev is not None:
+            status = UNCHANGED if prev.content_hash == digest else UPDATED
+        else:
+            prev = by_hash.get(digest)
+            if prev is not None:
+                status = UNCHANGED # re-post of the same content
+            elif cves and cves in by_cves:
+                status = UPDATED # new coverage (exploitation, patches...) of CVEs reported before
+            else:
+                status = NEW
+        if status == UNCHANGED and item.kev and not prev.kev:
+            status = UPDATED # newly known exploited
+        if status == UNCHANGED:
+            result.unchanged.append(item)
+            result.first_reported[url] = prev.first_week
+        else:
+            (result.updated if status == UPDATED else result.new).append(item)
+    return result
+
+def record(items: List[NewsItem], week: str, path: str = ITEM_STORE_PATH) -> int:
+    """Stores what `week`'s report was built from, replacing an earlier run of the same week."""
+    rows = [
+        (week, canonical_url(i.url), content_hash(i), cve_key(i), int(i.kev), i.title, i.source_name, i.url, i.severity)
+        for i in items if i.url
+    ]
+    with item_store.connect(path) as conn:
+        conn.execute("DELETE FROM reported_items WHERE week = ?", (week,))
+        conn.executemany("INSERT OR REPLACE INTO reported_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return len(rows)
+
+def still_open(result: DeltaResult, limit: int = DELTA_STILL_OPEN_MAX) -> List[StillOpen]:
+    """Carry-overs, most severe and longest open first."""
+    entries = [
+        StillOpen(
+            title=i.title, source_name=i.source_name, source_url=i.url, severity=i.severity,
+            cve_ids=i.cve_ids, kev=i.kev, first_reported=result.first_reported[canonical_url(i.url)]
+        )
+        for i in result.unchanged
+    ]
+    entries.sort(key=lambda e: (-SEVERITY_RANK.get(e.severity, 0), -e.kev, e.first_reported))
+    return entries[:limit]
+
+def _unchanged_week(result: DeltaResult, period: str = None) -> Newsletter:
+    """Report for a week without new or updated items: no synthesis needed."""
+    return Newsletter(
+        week_label=f"Week of {period or get_week_date_range(TIMEZONE)}",
+        executive_summary=(
+            f"No new or updated items this week. {len(result.unchanged)} previously reported "
+            f"item(s) reappeared unchanged and are listed as still open."
+        ),
+    )
+
+def apply(newsletter: Newsletter, result: DeltaResult, items: List[NewsItem]) -> Newsletter:
+    """Adds the still-open list, flags updated entries and recomputes stats over every item of the week."""
+    updated = {canonical_url(i.url) for i in result.updated}
+    for section in SECTION_MODELS:
+        for entry in getattr(newsletter, section):
+            entry.change = UPDATED if canonical_url(entry.source_url) in updated else ""
+    newsletter.still_open = still_open(result)
+    stats = compute_stats(items)
+    stats.new_count, stats.updated_count, stats.carried_over_count = len(result.new), len(result.updated), len(result.unchanged)
+    newsletter.stats = stats
+    return newsletter
+
+def synthesize(items: List[NewsItem], week: str, enabled: bool = DELTA_MODE, model=None, period: str = None,
+               path: str = ITEM_STORE_PATH) -> Newsletter:
+    """
+    Synthesis entry point of the pipeline. In delta mode only new and updated
+    items reach the model. In both modes the week's items are recorded, so
+    delta mode has a history to compare against once it is turned on.
+    """
+    result: Optional[DeltaResult] = None
+    if enabled:
+        with instrumentation.span("delta") as s:
+            result = classify(items, week, path)
+            s.set("new", len(result.new))
+            s.set("updated", len(result.updated))
+            s.set("unchanged", len(result.unchanged))
+        logger.info(
+            f"Delta mode: {len(result.new)} new, {len(result.updated)} updated, "
+            f"{len(result.unchanged)} unchanged of {len(items)} items"
+        )
+
+    if result is None:
+        newsletter = ai_synthesizer.synthesize(items, model=model, period=period)
+    elif result.changed or not result.unchanged:
+        newsletter = apply(ai_synthesizer.synthesize(result.changed, model=model, period=period), result, items)
+    else:
+        newsletter = apply(_unchanged_week(result, period), result, items)
+
+    try:
+        record(items, week, path)
+    except Exception as e:
+        logger.error(f"Failed to record this week's items for delta mode: {e}")
+    return newsletter
@@ -1,55 +1,215 @@
 import smtplib
+import time
+from dataclasses import dataclass
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
+from email.utils import parseaddr, formataddr
+from html import escape
+from typing import Callable, List, Optional
+from urllib.parse import quote
 import os
 
-from config import logger, GMAIL_SENDER, GMAIL_APP_PASSWORD, GMAIL_RECIPIENTS, TIMEZONE
+from config import (
+    logger, GMAIL_SENDER, GMAIL_APP_PASSWORD, GMAIL_RECIPIENTS, TIMEZONE,
+    SMTP_HOST, SMTP_PORT, SMTP_STARTTLS, SMTP_TIMEOUT, EMAIL_MODE, EMAIL_BCC_BATCH,
+    EMAIL_MAX_RETRIES, EMAIL_RETRY_BACKOFF, EMAIL_DELIVERY_MODE, ARCHIVE_BASE_URL, EMAIL_MAX_ATTACHMENT_MB
+)
 from utils import get_week_label
+from models import Newsletter
+import instrumentation
 
-def send(pdf_path: str, data: dict):
-    if not os.path.exists(pdf_path):
-        logger.error(f"Cannot send email. PDF not found at {pdf_path}")
-        return
-        
-    if not GMAIL_SENDER or not GMAIL_APP_PASSWORD or not GMAIL_RECIPIENTS:
-        logger.error("Gmail credentials or recipients missing in .env. Skipping email.")
-        return
-        
-    logger.info(f"Sending email to {len(GMAIL_RECIPIENTS)} recipients...")
-    
-    stats = data.get('stats', {})
-    crit_count = stats.get('critical_count', 0)
-    week_label = get_week_label(TIMEZONE)
-    
-    subject = f"🔐 Cyber Intelligence Weekly | {week_label} | {crit_count} Critical Alerts"
-    
-    msg = MIMEMultipart()
-    msg['From'] = GMAIL_SENDER
-    msg['To'] = ", ".join(GMAIL_RECIPIENTS)
-    msg['Subject'] = subject
-    
-    # HTML Body
-    html_body = f"""
+# Batched delivery: one authenticated SMTP connection per delivery round,
+# one individually addressed message per recipient (or per BCC batch), the
+# PDF attachment encoded once and shared by every message. Recipients that
+# fail with a transient error are retried in a new round with backoff.
+
+@dataclass
+class Delivery:
+    recipient: str
+    ok: bool = False
+    attempts: int = 0
+    seconds: float = 0.0 # time spent in SMTP sends for this recipient, all attempts
+    error: str = ""
+
+class SMTPSession:
+    """One SMTP connection (STARTTLS + login when configured), reopened once if the server drops it."""
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, username: str = GMAIL_SENDER,
+                 password: str = GMAIL_APP_PASSWORD, starttls: bool = SMTP_STARTTLS, timeout: float = SMTP_TIMEOUT):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.starttls, self.timeout = starttls, timeout
+        self.server = None
+
+    def connect(self):
+        self.server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            self.server.starttls()
+        if self.password:
+            self.server.login(self.username, self.password)
+
+    def send(self, msg, recipients: List[str]) -> dict:
+        """Sends msg to `recipients` (envelope). Returns the recipients the server refused."""
+        try:
+            return self.server.send_message(msg, to_addrs=recipients)
+        except smtplib.SMTPServerDisconnected:
+            logger.warning("SMTP connection dropped, reconnecting")
+            self.connect()
+            return self.server.send_message(msg, to_addrs=recipients)
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                self.server.close()
+            self.server = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _is_transient(e: Exception) -> bool:
+    """4xx replies and connection problems are worth retrying; 5xx are permanent."""
+    code = getattr(e, "smtp_code", None)
+    if code is not None:
+        return 400 <= code < 500
+    return isinstance(e, (smtplib.SMTPServerDisconnected, OSError))
+
+def deliver(recipients: List[str], make_message: Callable[[List[str]], MIMEMultipart],
+            session_factory: Callable[[], SMTPSession] = SMTPSession, mode: str = EMAIL_MODE,
+            bcc_batch: int = EMAIL_BCC_BATCH, max_retries: int = EMAIL_MAX_RETRIES,
+            backoff: float = EMAIL_RETRY_BACKOFF) -> List[Delivery]:
+    """
+    Delivers one message per recipient ("individual") or per batch of
+    `bcc_batch` recipients ("bcc"), all over one connection per round.
+    Raises smtplib.SMTPAuthenticationError, which no retry can fix.
+    """
+    deliveries = {r: Delivery(r) for r in recipients}
+    if mode == "bcc":
+        pending = [recipients[i:i + bcc_batch] for i in range(0, len(recipients), bcc_batch)]
+    else:
+        pending = [[r] for r in recipients]
+
+    permanent = set()
+    for attempt in range(1, max_retries + 1):
+        retry, tried = [], set()
+        try:
+            with session_factory() as session:
+                for unit in pending:
+                    start = time.perf_counter()
+                    try:
+                        refused = session.send(make_message(unit), [parseaddr(r)[1] for r in unit])
+                        errors = {}
+                    except smtplib.SMTPRecipientsRefused as e:
+                        refused, errors = e.recipients, {}
+                    except smtplib.SMTPAuthenticationError:
+                        raise
+                    except Exception as e:
+                        # Recorded on the unit's deliveries; retried only if transient (see _is_transient)
+                        refused, errors = {}, {r: e for r in unit}
+                    elapsed = time.perf_counter() - start
+
+                    failed_unit = []
+                    for r in unit:
+                        d = deliveries[r]
+                        d.attempts += 1
+                        tried.add(r)
+                        d.seconds += elapsed / len(unit)
+                        error = errors.get(r)
+                        refusal = refused.get(parseaddr(r)[1])
+                        if error is None and refusal is None:
+                            d.ok, d.error = True, ""
+                            continue
+                        if refusal is not None:
+                            code, reply = refusal
+                            error = smtplib.SMTPResponseException(code, reply)
+                        d.error = str(error)
+                        if _is_transient(error):
+                            failed_unit.append(r)
+                        else:
+                            permanent.add(r)
+                    instrumentation.record("email.send", elapsed, parent="email", recipients=len(unit), attempt=attempt)
+                    if failed_unit:
+                        retry.append(failed_unit)
+        except smtplib.SMTPAuthenticationError:
+            raise
+        except (smtplib.SMTPException, OSError) as e:
+            # Could not connect/log in: every unit not yet delivered is retried
+            logger.warning(f"SMTP session failed on attempt {attempt}: {e}")
+            retry = [[r for r in unit if not deliveries[r].ok and r not in permanent] for unit in pending]
+            retry = [unit for unit in retry if unit]
+            for unit in retry:
+                for r in unit:
+                    deliveries[r].error = str(e)
+                    if r not in tried:
+                        deliveries[r].attempts += 1
+
+        if not retry:
+            break
+        pending = retry
+        if attempt < max_retries:
+            wait = backoff * 2 ** (attempt - 1)
+            logger.warning(f"{sum(map(len, retry))} recipient(s) failed, retrying in {wait:.0f}s")
+            time.sleep(wait)
+
+    return list(deliveries.values())
+
+def _digest_html(data: Newsletter) -> str:
+    """Headline list of every section, linked to the sources: the email body when the PDF is not attached."""
+    sections = [
+        ("Critical Alerts", data.critical_alerts),
+        ("Vulnerabilities & Patches", data.vulnerabilities_and_patches),
+        ("Breaches & Incidents", data.breaches_and_incidents),
+        ("LATAM & Venezuela", data.latam_venezuela_intelligence),
+        ("Still Open", data.still_open),
+    ]
+    html = []
+    for heading, entries in sections:
+        if not entries:
+            continue
+        html.append(f'<h3 style="font-size: 14px; margin-bottom: 5px;">{escape(heading)}</h3><ul>')
+        for entry in entries:
+            severity = getattr(entry, "severity", "")
+            label = f"[{escape(severity)}] " if severity else ""
+            html.append(f'<li>{label}<a href="{escape(entry.source_url)}">{escape(entry.title)}</a></li>')
+        html.append("</ul>")
+    return "\n".join(html)
+
+def build_html(data: Newsletter, week_label: str, greeting_name: str = "", archive_url: str = "") -> str:
+    """Email body: summary and stats, plus the headline digest and a report link when `archive_url` is set."""
+    greeting = f"<p>Hello {escape(greeting_name)},</p>" if greeting_name else ""
+    stats = data.stats
+    if archive_url:
+        report = f"""{_digest_html(data)}
+        <p><a href="{escape(archive_url)}">Download the full visual report (PDF)</a></p>"""
+    else:
+        report = "<p>Please find the full visual report attached as a PDF.</p>"
+    return f"""
     <html>
       <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
         <h2>Cyber Intelligence Weekly Briefing</h2>
-        <p><strong>{data.get('week_label', week_label)}</strong></p>
-        
+        {greeting}
+        <p><strong>{data.week_label or week_label}</strong></p>
+
         <div style="background: #f8f9fa; padding: 15px; border-left: 4px solid #C8102E; margin-bottom: 20px;">
           <h3 style="margin-top: 0; font-size: 14px; text-transform: uppercase; color: #555;">Executive Summary</h3>
-          <p>{data.get('executive_summary', 'See attached PDF for full details.')}</p>
+          <p>{data.executive_summary or 'See the full report for details.'}</p>
         </div>
-        
+
         <p><strong>Quick Stats:</strong></p>
         <ul>
-          <li>Critical Alerts: {crit_count}</li>
-          <li>High Alerts: {stats.get('high_count', 0)}</li>
-          <li>CVEs Identified: {stats.get('cves_identified', 0)}</li>
+          <li>Critical Alerts: {stats.critical_count}</li>
+          <li>High Alerts: {stats.high_count}</li>
+          <li>CVEs Identified: {stats.cves_identified}</li>
         </ul>
-        
-        <p>Please find the full visual report attached as a PDF.</p>
-        
+
+        {report}
+
         <br>
         <hr>
         <p style="font-size: 11px; color: #888;">
@@ -59,23 +219,85 @@ def send(pdf_path: str, data: dict):
       </body>
     </html>
     """
-    
-    msg.attach(MIMEText(html_body, 'html'))
-    
-    # Attach PDF
+
+def build_attachment(pdf_path: str) -> MIMEApplication:
+    """Reads and base64-encodes the PDF once; the part is shared by every message of the batch."""
     with open(pdf_path, 'rb') as f:
-        pdf_attachment = MIMEApplication(f.read(), _subtype="pdf")
-        pdf_attachment.add_header('Content-Disposition', 'attachment', filename=os.path.basename(pdf_path))
-        msg.attach(pdf_attachment)
-        
-    # Send
+        part = MIMEApplication(f.read(), _subtype="pdf")
+    part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(pdf_path))
+    return part
+
+def archive_link(pdf_path: str) -> str:
+    """Public URL of an output file under ARCHIVE_BASE_URL, or "" when no archive is configured."""
+    if not ARCHIVE_BASE_URL:
+        return ""
+    return f"{ARCHIVE_BASE_URL.rstrip('/')}/{quote(os.path.basename(pdf_path))}"
+
+def message_factory(data: Newsletter, subject: str, attachment: Optional[MIMEApplication], mode: str = EMAIL_MODE,
+                    archive_url: str = "", sender: str = GMAIL_SENDER):
+    """
+    Returns make_message(recipients): personalised To/greeting for one recipient,
+    Bcc-only for a batch. Without an attachment the body links to `archive_url`.
+    """
+    week_label = get_week_label(TIMEZONE)
+    shared_html = MIMEText(build_html(data, week_label, archive_url=archive_url), 'html')
+
+    def make_message(recipients: List[str]) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = sender
+        msg['Subject'] = subject
+        if mode == "bcc":
+            msg['To'] = sender # recipients only appear in the envelope
+            msg.attach(shared_html)
+        else:
+            name, address = parseaddr(recipients[0])
+            msg['To'] = formataddr((name, address))
+            msg.attach(MIMEText(build_html(data, week_label, name, archive_url), 'html') if name else shared_html)
+        if attachment is not None:
+            msg.attach(attachment)
+        return msg
+
+    return make_message
+
+def _use_link(pdf_path: str, archive_url: str) -> bool:
+    """Link delivery when configured, or automatically for a PDF over EMAIL_MAX_ATTACHMENT_MB."""
+    size_mb = os.path.getsize(pdf_path) / (1024 * 1024)
+    if EMAIL_DELIVERY_MODE == "link":
+        if archive_url:
+            return True
+        logger.warning("EMAIL_DELIVERY_MODE=link needs ARCHIVE_BASE_URL; attaching the PDF instead")
+        return False
+    if size_mb > EMAIL_MAX_ATTACHMENT_MB:
+        if archive_url:
+            logger.info(f"PDF is {size_mb:.1f} MB (> {EMAIL_MAX_ATTACHMENT_MB} MB), sending a link instead")
+            return True
+        logger.warning(f"PDF is {size_mb:.1f} MB (> {EMAIL_MAX_ATTACHMENT_MB} MB) and no ARCHIVE_BASE_URL is set; attaching anyway")
+    return False
+
+def send(pdf_path: str, data: Newsletter) -> bool:
+    """Emails the newsletter with the PDF attached, or linked from the archive. Returns True if every recipient got it."""
+    if not os.path.exists(pdf_path):
+        logger.error(f"Cannot send email. PDF not found at {pdf_path}")
+        return False
+
+    if not GMAIL_SENDER or not GMAIL_APP_PASSWORD or not GMAIL_RECIPIENTS:
+        logger.error("Gmail credentials or recipients missing in .env. Skipping email.")
+        return False
+
+    archive_url = archive_link(pdf_path)
+    delivery = "link" if _use_link(pdf_path, archive_url) else "attachment"
+    logger.info(f"Sending email to {len(GMAIL_RECIPIENTS)} recipients ({EMAIL_MODE} mode, PDF as {delivery})...")
+    subject = f"🔐 Cyber Intelligence Weekly | {get_week_label(TIMEZONE)} | {data.stats.critical_count} Critical Alerts"
+    if delivery == "link":
+        make_message = message_factory(data, subject, None, archive_url=archive_url)
+    else:
+        make_message = message_factory(data, subject, build_attachment(pdf_path))
+
     try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(GMAIL_SENDER, GMAIL_APP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        logger.info("Newsletter email sent successfully via Gmail SMTP.")
+        with instrumentation.span("email", recipients=len(GMAIL_RECIPIENTS), delivery=delivery) as s:
+            deliveries = deliver(GMAIL_RECIPIENTS, make_message)
+            s.set("delivered", sum(d.ok for d in deliveries))
+            s.set("retries", sum(d.attempts - 1 for d in deliveries))
     except smtplib.SMTPAuthenticationError:
         logger.error(
             "Gmail Authentication Failed! \n"
@@ -86,5 +308,17 @@ def send(pdf_path: str, data: dict):
             "4. Generate a new App Password.\n"
             "5. Place that 16-character password in your .env file."
         )
+        return False
     except Exception as e:
         logger.error(f"Failed to send email: {e}")
+        return False
+
+    for d in deliveries:
+        status = "delivered" if d.ok else f"FAILED ({d.error})"
+        logger.info(f"  {d.recipient}: {status} in {d.seconds * 1000:.0f} ms after {d.attempts} attempt(s)")
+    failed = [d.recipient for d in deliveries if not d.ok]
+    if failed:
+        logger.error(f"Newsletter email not delivered to {len(failed)}/{len(deliveries)} recipients: {', '.join(failed)}")
+        return False
+    logger.info("Newsletter email sent successfully via Gmail SMTP.")
+    return True
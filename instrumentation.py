@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from config import logger, OUTPUT_DIR
+from utils import atomic_write
+
+# Lightweight run instrumentation: spans (name + duration + counters) recorded
+# into the active RunReport. The active run is context-local, so runs started
+# concurrently on different scheduler threads (source polls during the weekly
+# run) don't see each other's spans; work handed to a thread pool joins the
+# submitter's run through submit(). With no active run, spans are still timed
+# but not stored, so instrumented code works outside a pipeline run.
+
+@dataclass
+class Span:
+    name: str
+    start: float # seconds since run start
+    duration: float = 0.0
+    status: str = "ok"
+    parent: Optional[str] = None
+    attrs: Dict[str, object] = field(default_factory=dict)
+
+    def add(self, key: str, value=1):
+        """Accumulates a counter on the span (bytes, items, retries, tokens...)."""
+        self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def set(self, key: str, value):
+        self.attrs[key] = value
+
+@dataclass
+class RunReport:
+    name: str
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    started_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    duration: float = 0.0
+    status: str = "ok"
+    spans: List[Span] = field(default_factory=list)
+    t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def summary(self) -> dict:
+        stages = {}
+        sources = {}
+        totals = {}
+        for s in self.spans:
+            if s.parent is None:
+                stages[s.name] = round(stages.get(s.name, 0.0) + s.duration, 4)
+            if s.name == "fetch" and "source" in s.attrs:
+                sources[s.attrs["source"]] = {
+                    "duration": round(s.duration, 4),
+                    "status": s.status,
+                    **{k: v for k, v in s.attrs.items() if k != "source"}
+                }
+            for key in ("bytes", "errors", "retries", "prompt_tokens", "output_tokens", "rate_wait_s"):
+                if isinstance(s.attrs.get(key), (int, float)):
+                    totals[key] = totals.get(key, 0) + s.attrs[key]
+
+        data = asdict(self)
+        data.pop("t0")
+        for s in data["spans"]:
+            s["start"] = round(s["start"], 4)
+            s["duration"] = round(s["duration"], 4)
+        data["duration"] = round(self.duration, 4)
+        data["stages"] = stages
+        data["sources"] = sources
+        data["totals"] = totals
+        return data
+
+_active_run: contextvars.ContextVar[Optional[RunReport]] = contextvars.ContextVar("active_run", default=None)
+_lock = threading.Lock()
+_span_listeners: List[Callable[[Span], None]] = []
+_run_listeners: List[Callable[[RunReport], None]] = []
+_local = threading.local() # per-thread span stack, for parent names + current_span()
+
+def add_listener(on_span: Callable[[Span], None] = None, on_run: Callable[[RunReport], None] = None):
+    """Registers callbacks for finished spans / runs (e.g. the metrics exporter)."""
+    if on_span is not None:
+        _span_listeners.append(on_span)
+    if on_run is not None:
+        _run_listeners.append(on_run)
+
+def _notify(listeners: list, obj):
+    for listener in listeners:
+        try:
+            listener(obj)
+        except Exception as e:
+            logger.debug(f"Instrumentation listener failed: {e}")
+
+def _stack() -> list:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+@contextmanager
+def run(name: str):
+    """Starts a RunReport that collects every span of this context until the block exits."""
+    report = RunReport(name=name)
+    token = _active_run.set(report)
+    try:
+        yield report
+    except BaseException:
+        report.status = "error"
+        raise
+    finally:
+        report.duration = time.perf_counter() - report.t0
+        _active_run.reset(token)
+        _notify(_run_listeners, report)
+
+def submit(pool, fn: Callable, *args, **kwargs):
+    """pool.submit() that runs `fn` in a copy of the caller's context, so its spans join the caller's run."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+@contextmanager
+def span(name: str, parent: Optional[str] = None, **attrs):
+    """
+    Times a block and records it on the active run. `parent` defaults to the
+    enclosing span on this thread; pass it explicitly for work handed to threads.
+    """
+    report = _active_run.get()
+    stack = _stack()
+    if parent is None and stack:
+        parent = stack[-1].name
+    start = time.perf_counter()
+    s = Span(name=name, start=start - (report.t0 if report else start), parent=parent, attrs=dict(attrs))
+    stack.append(s)
+    try:
+        yield s
+    except BaseException:
+        s.status = "error"
+        raise
+    finally:
+        stack.pop()
+        s.duration = time.perf_counter() - start
+        if report is not None:
+            with _lock:
+                report.spans.append(s)
+        _notify(_span_listeners, s)
+
+def record(name: str, duration: float, parent: Optional[str] = None, **attrs):
+    """Records a span measured elsewhere (e.g. inside a worker process)."""
+    report = _active_run.get()
+    t0 = report.t0 if report else time.perf_counter()
+    s = Span(name=name, start=time.perf_counter() - t0 - duration, duration=duration, parent=parent, attrs=dict(attrs))
+    if report is not None:
+        with _lock:
+            report.spans.append(s)
+    _notify(_span_listeners, s)
+
+def current_span() -> Optional[Span]:
+    stack = _stack()
+    return stack[-1] if stack else None
+
+def add(key: str, value=1):
+    """Adds to a counter on the innermost span of this thread, if any."""
+    s = current_span()
+    if s is not None:
+        s.add(key, value)
+
+RUN_SUMMARY_PREFIX = "run_summary_"
+
+def write_summary(report: RunReport, week_label: str) -> str:
+    """Writes the run summary JSON to OUTPUT_DIR and returns its path."""
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(OUTPUT_DIR, f"{RUN_SUMMARY_PREFIX}{week_label}_{stamp}.json")
+    summary = report.summary()
+    with atomic_write(path) as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    logger.info(
+        f"Run summary written to {path}: " +
+        ", ".join(f"{k}={v:.2f}s" for k, v in summary["stages"].items())
+    )
+    return path
+
+def latest_summary(output_dir: str = OUTPUT_DIR) -> Optional[dict]:
+    """Loads the most recent run summary from output_dir, if any."""
+    if not os.path.isdir(output_dir):
+        return None
+    summaries = [f for f in os.listdir(output_dir) if f.startswith(RUN_SUMMARY_PREFIX) and f.endswith(".json")]
+    if not summaries:
+        return None
+    latest = max(summaries, key=lambda f: os.path.getmtime(os.path.join(output_dir, f)))
+    with open(os.path.join(output_dir, latest), "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,254 @@
+import json
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from dateutil import parser as date_parser
+
+from config import logger, ITEM_STORE_PATH
+from utils import NewsItem
+
+# SQLite store of every collected NewsItem. Sources are polled into it on their
+# own cadence; report generation reads the items of a period back out.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id        TEXT PRIMARY KEY,  -- md5(url_title), same key as utils.deduplicate_items
+    source_name    TEXT NOT NULL,
+    title          TEXT NOT NULL,
+    summary        TEXT,
+    url            TEXT NOT NULL,
+    published_date TEXT,              -- ISO 8601, UTC
+    severity       TEXT,
+    cve_ids        TEXT,              -- JSON list
+    category       TEXT,
+    language       TEXT,
+    region         TEXT,
+    first_seen     TEXT NOT NULL,
+    last_seen      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_published ON items(published_date);
+CREATE INDEX IF NOT EXISTS idx_items_source ON items(source_name);
+
+-- What each week's report was built from, for delta mode (see delta.py)
+CREATE TABLE IF NOT EXISTS reported_items (
+    week          TEXT NOT NULL,      -- ISO week label
+    canonical_url TEXT NOT NULL,
+    content_hash  TEXT NOT NULL,      -- normalized title + summary + CVEs
+    cve_key       TEXT NOT NULL,      -- sorted CVE ids, comma-joined; '' if none
+    kev           INTEGER NOT NULL,
+    title         TEXT NOT NULL,
+    source_name   TEXT,
+    url           TEXT NOT NULL,
+    severity      TEXT,
+    PRIMARY KEY (week, canonical_url)
+);
+CREATE INDEX IF NOT EXISTS idx_reported_url ON reported_items(canonical_url);
+CREATE INDEX IF NOT EXISTS idx_reported_hash ON reported_items(content_hash);
+CREATE INDEX IF NOT EXISTS idx_reported_cves ON reported_items(cve_key);
+
+-- Every generated weekly newsletter, for search and roll-ups (see search_index.py, rollup.py)
+CREATE TABLE IF NOT EXISTS reports (
+    week         TEXT PRIMARY KEY,  -- ISO week label, e.g. 2025-W03
+    generated_at TEXT NOT NULL,
+    newsletter   TEXT NOT NULL      -- Newsletter JSON
+);
+
+-- Per-week counts, precomputed for monthly/quarterly roll-ups (see rollup.py)
+CREATE TABLE IF NOT EXISTS week_aggregates (
+    week        TEXT PRIMARY KEY,
+    items       INTEGER NOT NULL,
+    critical    INTEGER NOT NULL,
+    high        INTEGER NOT NULL,
+    medium      INTEGER NOT NULL,
+    kev         INTEGER NOT NULL,
+    sources     TEXT NOT NULL,        -- JSON {source_name: items}
+    cves        TEXT NOT NULL,        -- JSON list
+    computed_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS source_polls (
+    source_name TEXT PRIMARY KEY,
+    last_polled TEXT NOT NULL,
+    items       INTEGER NOT NULL,
+    ok          INTEGER NOT NULL
+);
+"""
+
+# Full-text index (FTS5) over the items and the entries of every generated
+# newsletter. The item index is an external-content table kept in sync by
+# triggers, so each upsert updates it incrementally.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    title, summary, source_name, cve_ids,
+    content='items', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts(rowid, title, summary, source_name, cve_ids)
+    VALUES (new.rowid, new.title, new.summary, new.source_name, new.cve_ids);
+END;
+CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts(items_fts, rowid, title, summary, source_name, cve_ids)
+    VALUES ('delete', old.rowid, old.title, old.summary, old.source_name, old.cve_ids);
+END;
+-- Re-polls only bump last_seen: reindex a row only when its text changed
+CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE ON items
+WHEN old.summary IS NOT new.summary OR old.cve_ids IS NOT new.cve_ids BEGIN
+    INSERT INTO items_fts(items_fts, rowid, title, summary, source_name, cve_ids)
+    VALUES ('delete', old.rowid, old.title, old.summary, old.source_name, old.cve_ids);
+    INSERT INTO items_fts(rowid, title, summary, source_name, cve_ids)
+    VALUES (new.rowid, new.title, new.summary, new.source_name, new.cve_ids);
+END;
+
+CREATE TABLE IF NOT EXISTS report_entries (
+    entry_id    INTEGER PRIMARY KEY,
+    week        TEXT NOT NULL,
+    section     TEXT NOT NULL,
+    title       TEXT NOT NULL,
+    description TEXT,
+    source_name TEXT,
+    source_url  TEXT,
+    severity    TEXT,
+    cve_ids     TEXT,               -- JSON list
+    products    TEXT                -- JSON list
+);
+CREATE INDEX IF NOT EXISTS idx_report_entries_week ON report_entries(week);
+CREATE VIRTUAL TABLE IF NOT EXISTS report_fts USING fts5(
+    title, description, source_name, cve_ids, products,
+    content='report_entries', content_rowid='entry_id'
+);
+CREATE TRIGGER IF NOT EXISTS report_fts_insert AFTER INSERT ON report_entries BEGIN
+    INSERT INTO report_fts(rowid, title, description, source_name, cve_ids, products)
+    VALUES (new.entry_id, new.title, new.description, new.source_name, new.cve_ids, new.products);
+END;
+CREATE TRIGGER IF NOT EXISTS report_fts_delete AFTER DELETE ON report_entries BEGIN
+    INSERT INTO report_fts(report_fts, rowid, title, description, source_name, cve_ids, products)
+    VALUES ('delete', old.entry_id, old.title, old.description, old.source_name, old.cve_ids, old.products);
+END;
+"""
+
+_init_lock = threading.Lock()
+_initialized = set()
+_search_available = {} # path -> whether this SQLite build has FTS5
+
+def search_available(path: str = ITEM_STORE_PATH) -> bool:
+    with connect(path):
+        return _search_available.get(path, False)
+
+def _init_search(conn: sqlite3.Connection, path: str):
+    existed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'items_fts'").fetchone() is not None
+    try:
+        conn.executescript(SEARCH_SCHEMA)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Full-text search disabled, SQLite has no FTS5: {e}")
+        _search_available[path] = False
+        return
+    if not existed:
+        # Store created before the search index: index the existing rows once
+        conn.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+        conn.commit()
+    _search_available[path] = True
+
+def item_id(item: NewsItem) -> str:
+    return hashlib.md5(f"{item.url}_{item.title}".encode("utf-8")).hexdigest()
+
+def _utc_iso(dt: Optional[datetime]) -> Optional[str]:
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+@contextmanager
+def connect(path: str = ITEM_STORE_PATH):
+    """One short-lived connection per operation, so pollers on different threads don't share one."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with _init_lock:
+            if path not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                _init_search(conn, path)
+                _initialized.add(path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def upsert_items(items: Iterable[NewsItem], path: str = ITEM_STORE_PATH) -> int:
+    """Inserts new items and refreshes existing ones. Returns the number of rows written."""
+    now = _now()
+    rows = [(
+        item_id(i), i.source_name, i.title, i.summary, i.url, _utc_iso(i.published_date),
+        i.severity, json.dumps(i.cve_ids), i.category, i.language, i.region, now, now
+    ) for i in items if i.url]
+    if not rows:
+        return 0
+    with connect(path) as conn:
+        conn.executemany("""
+            INSERT INTO items (item_id, source_name, title, summary, url, published_date, severity,
+                               cve_ids, category, language, region, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(item_id) DO UPDATE SET
+                summary = excluded.summary,
+                severity = excluded.severity,
+                cve_ids = excluded.cve_ids,
+                published_date = excluded.published_date,
+                last_seen = excluded.last_seen
+        """, rows)
+    return len(rows)
+
+def _row_to_item(row: sqlite3.Row) -> NewsItem:
+    return NewsItem(
+        source_name=row["source_name"],
+        title=row["title"],
+        summary=row["summary"] or "",
+        url=row["url"],
+        published_date=date_parser.parse(row["published_date"]) if row["published_date"] else None,
+        severity=row["severity"] or "UNKNOWN",
+        cve_ids=json.loads(row["cve_ids"] or "[]"),
+        category=row["category"] or "UNKNOWN",
+        language=row["language"] or "en",
+        region=row["region"] or "global",
+    )
+
+def items_between(start: datetime, end: datetime, path: str = ITEM_STORE_PATH) -> List[NewsItem]:
+    """Items published in [start, end), oldest first."""
+    with connect(path) as conn:
+        rows = conn.execute(
+            "SELECT * FROM items WHERE published_date >= ? AND published_date < ? ORDER BY published_date",
+            (_utc_iso(start), _utc_iso(end))
+        ).fetchall()
+    return [_row_to_item(r) for r in rows]
+
+def store_report(week: str, newsletter_json: str, path: str = ITEM_STORE_PATH):
+    """Stores a generated newsletter, replacing that week's previous version."""
+    with connect(path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO reports (week, generated_at, newsletter) VALUES (?, ?, ?)",
+            (week, _now(), newsletter_json)
+        )
+
+def record_poll(source_name: str, items: int, ok: bool, path: str = ITEM_STORE_PATH):
+    with connect(path) as conn:
+        conn.execute("""
+            INSERT INTO source_polls (source_name, last_polled, items, ok) VALUES (?, ?, ?, ?)
+            ON CONFLICT(source_name) DO UPDATE SET
+                last_polled = excluded.last_polled, items = excluded.items, ok = excluded.ok
+        """, (source_name, _now(), items, int(ok)))
+
+def last_polls(path: str = ITEM_STORE_PATH) -> dict:
+    """source_name -> {"last_polled": datetime, "items": int, "ok": bool}"""
+    with connect(path) as conn:
+        rows = conn.execute("SELECT * FROM source_polls").fetchall()
+    return {
+        r["source_name"]: {"last_polled": date_parser.parse(r["last_polled"]), "items": r["items"], "ok": bool(r["ok"])}
+        for r in rows
+    }
@@ -0,0 +1,120 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from config import logger
+
+# Background jobs for the dashboard. The pipeline runs on a worker thread and
+# reports stage progress on its Job; the UI only polls. Jobs are keyed (e.g. by
+# week label) so concurrent submissions for the same key share one in-flight run.
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "error", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+class JobCancelled(Exception):
+    pass
+
+@dataclass
+class Job:
+    job_id: str
+    key: str
+    status: str = QUEUED
+    stage: str = "queued"
+    progress: float = 0.0 # 0..1
+    message: str = ""
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: object = None
+    error: str = ""
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status not in FINISHED
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def update(self, stage: str, progress: float, message: str = ""):
+        """Called by the job function at stage boundaries. Raises JobCancelled if cancellation was requested."""
+        self.check_cancelled()
+        self.stage, self.progress, self.message = stage, progress, message
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.job_id} cancelled")
+
+    def cancel(self):
+        self._cancel.set()
+        if self.status == QUEUED:
+            self.status, self.finished_at = CANCELLED, time.time()
+
+class JobRunner:
+    """Runs job functions on a small thread pool and keeps the last `history` jobs."""
+
+    def __init__(self, max_workers: int = 1, history: int = 20):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._history = history
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable[[Job], object]) -> Job:
+        """Starts fn(job) in the background, or returns the in-flight job for the same key."""
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job.key == key and job.active:
+                    logger.info(f"Job for '{key}' already in flight ({job.job_id}), joining it")
+                    return job
+            job = Job(job_id=uuid.uuid4().hex[:8], key=key)
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self._history:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.active:
+                    break
+                self._jobs.popitem(last=False)
+        self._pool.submit(self._run, job, fn)
+        logger.info(f"Submitted job {job.job_id} for '{key}'")
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], object]):
+        if job.status == CANCELLED:
+            return
+        job.status, job.started_at = RUNNING, time.time()
+        try:
+            job.result = fn(job)
+            job.status, job.stage, job.progress = DONE, "done", 1.0
+        except JobCancelled:
+            logger.info(f"Job {job.job_id} cancelled at stage '{job.stage}'")
+            job.status, job.stage = CANCELLED, "cancelled"
+        except Exception as e:
+            job.status, job.error = FAILED, str(e)
+            logger.exception(f"Job {job.job_id} failed")
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def latest(self, key: str) -> Optional[Job]:
+        """Most recent job for `key` — lets every session see a run started elsewhere."""
+        with self._lock:
+            return next((j for j in reversed(self._jobs.values()) if j.key == key), None)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel()
+        return True
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
@@ -0,0 +1,82 @@
+from config import logger
+import instrumentation
+
+# Optional Prometheus exporter for the scheduler process. Metrics are fed from
+# the instrumentation spans, so the pipeline code does not know about them.
+# prometheus_client is only imported when the endpoint is enabled.
+
+_started = False
+
+def _build_metrics():
+    from prometheus_client import Counter, Gauge, Histogram
+    global FETCH_SECONDS, FETCH_TOTAL, SOURCE_ITEMS, GEMINI_SECONDS, GEMINI_TOKENS
+    global RENDER_SECONDS, STAGE_SECONDS, RUNS_TOTAL, LAST_SUCCESS, RATE_WAIT_SECONDS
+
+    FETCH_SECONDS = Histogram(
+        "newsletter_source_fetch_seconds", "Fetch latency per source", ["source"],
+        buckets=(0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60, 120)
+    )
+    FETCH_TOTAL = Counter("newsletter_source_fetch_total", "Source fetches by outcome", ["source", "outcome"])
+    SOURCE_ITEMS = Gauge("newsletter_source_items", "Current-week items returned by the last fetch", ["source"])
+    RATE_WAIT_SECONDS = Histogram(
+        "newsletter_rate_limit_wait_seconds", "Time a request waited on the per-host rate limiter", ["host"],
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    )
+    GEMINI_SECONDS = Histogram(
+        "newsletter_gemini_request_seconds", "Gemini generate_content latency",
+        buckets=(1, 2.5, 5, 10, 20, 40, 60, 120)
+    )
+    GEMINI_TOKENS = Counter("newsletter_gemini_tokens_total", "Gemini tokens used", ["kind"])
+    RENDER_SECONDS = Histogram(
+        "newsletter_render_seconds", "Render time per output format", ["renderer"],
+        buckets=(0.1, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+    )
+    STAGE_SECONDS = Gauge("newsletter_stage_seconds", "Duration of each stage in the last run", ["stage"])
+    RUNS_TOTAL = Counter("newsletter_runs_total", "Pipeline runs by outcome", ["run", "status"])
+    LAST_SUCCESS = Gauge("newsletter_last_success_timestamp_seconds", "Unix time of the last successful run", ["run"])
+
+def _on_span(span: instrumentation.Span):
+    if span.name == "fetch" and "source" in span.attrs:
+        source = span.attrs["source"]
+        if span.attrs.get("circuit") == "open":
+            FETCH_TOTAL.labels(source=source, outcome="skipped").inc()
+            return
+        failed = span.status != "ok" or span.attrs.get("errors", 0) > 0
+        FETCH_SECONDS.labels(source=source).observe(span.duration)
+        FETCH_TOTAL.labels(source=source, outcome="failure" if failed else "success").inc()
+        SOURCE_ITEMS.labels(source=source).set(span.attrs.get("items", 0))
+    elif span.name == "rate_wait":
+        RATE_WAIT_SECONDS.labels(host=span.attrs.get("host", "")).observe(span.duration)
+    elif span.name == "gemini":
+        GEMINI_SECONDS.observe(span.duration)
+        GEMINI_TOKENS.labels(kind="prompt").inc(span.attrs.get("prompt_tokens", 0))
+        GEMINI_TOKENS.labels(kind="output").inc(span.attrs.get("output_tokens", 0))
+    elif span.name.startswith("render."):
+        RENDER_SECONDS.labels(renderer=span.name.split(".", 1)[1]).observe(span.duration)
+    elif span.parent is None:
+        STAGE_SECONDS.labels(stage=span.name).set(span.duration)
+
+def _on_run(report: instrumentation.RunReport):
+    RUNS_TOTAL.labels(run=report.name, status=report.status).inc()
+    if report.status == "ok":
+        LAST_SUCCESS.labels(run=report.name).set_to_current_time()
+
+def start_server(port: int) -> bool:
+    """Starts the /metrics HTTP endpoint on `port`. Returns False if it is disabled or unavailable."""
+    global _started
+    if _started:
+        return True
+    if not port:
+        return False
+    try:
+        from prometheus_client import start_http_server
+    except ImportError:  # pragma: no cover - optional dependency
+        logger.warning("METRICS_PORT is set but prometheus_client is not installed. Metrics endpoint disabled.")
+        return False
+
+    _build_metrics()
+    instrumentation.add_listener(on_span=_on_span, on_run=_on_run)
+    start_http_server(port)
+    _started = True
+    logger.info(f"Prometheus metrics exposed on :{port}/metrics")
+    return True
@@ -0,0 +1,91 @@
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+from utils import NewsItem
+
+# Newsletter schema shared by the synthesizer and every renderer.
+# Mirrors the OUTPUT SCHEMA in ai_synthesizer.SYSTEM_PROMPT.
+
+class _Entry(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    title: str
+    description: str = ""
+    source_name: str = ""
+    source_url: str
+    change: str = "" # "updated" in delta mode when the source item changed since a previous report
+
+class Alert(_Entry):
+    severity: str = "UNKNOWN"
+    cve_ids: List[str] = Field(default_factory=list)
+    affected_products: List[str] = Field(default_factory=list)
+    # From the local CVE index, copied from the input item (never from the model)
+    cvss: Optional[float] = None
+    kev: bool = False
+    cwe_ids: List[str] = Field(default_factory=list)
+
+class Breach(_Entry):
+    impact: str = ""
+
+class LatamItem(_Entry):
+    language: str = "es"
+
+class StillOpen(_Entry):
+    """Carry-over from a previous week, unchanged since (delta mode). Rendered locally, never synthesized."""
+    severity: str = "UNKNOWN"
+    cve_ids: List[str] = Field(default_factory=list)
+    kev: bool = False
+    first_reported: str = "" # week label
+
+class Stats(BaseModel):
+    total_items_analyzed: int = 0
+    critical_count: int = 0
+    high_count: int = 0
+    medium_count: int = 0
+    sources_scraped: int = 0
+    cves_identified: int = 0
+    # Delta mode breakdown of this week's items
+    new_count: int = 0
+    updated_count: int = 0
+    carried_over_count: int = 0
+
+class Newsletter(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    week_label: str = "Current Week"
+    executive_summary: str = ""
+    critical_alerts: List[Alert] = Field(default_factory=list)
+    vulnerabilities_and_patches: List[Alert] = Field(default_factory=list)
+    breaches_and_incidents: List[Breach] = Field(default_factory=list)
+    latam_venezuela_intelligence: List[LatamItem] = Field(default_factory=list)
+    recommended_actions: List[str] = Field(default_factory=list)
+    still_open: List[StillOpen] = Field(default_factory=list)
+    stats: Stats = Field(default_factory=Stats)
+
+# Section name -> entry model, used for the single-pass validation in ai_synthesizer.
+SECTION_MODELS = {
+    "critical_alerts": Alert,
+    "vulnerabilities_and_patches": Alert,
+    "breaches_and_incidents": Breach,
+    "latam_venezuela_intelligence": LatamItem,
+}
+
+def compute_stats(items: List[NewsItem]) -> Stats:
+    """Computes stats locally from the input items instead of trusting the model."""
+    counts = {"CRITICAL": 0, "HIGH": 0, "MEDIUM": 0}
+    sources = set()
+    cves = set()
+    for item in items:
+        if item.severity in counts:
+            counts[item.severity] += 1
+        sources.add(item.source_name)
+        cves.update(item.cve_ids)
+
+    return Stats(
+        total_items_analyzed=len(items),
+        critical_count=counts["CRITICAL"],
+        high_count=counts["HIGH"],
+        medium_count=counts["MEDIUM"],
+        sources_scraped=len(sources),
+        cves_identified=len(cves),
+    )
@@ -1,185 +1,217 @@
 import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 from jinja2 import Environment, DictLoader
-from weasyprint import HTML, CSS
 from config import logger, OUTPUT_DIR, TIMEZONE
-from utils import get_week_label
+from utils import get_week_label, atomic_write
+from models import Newsletter
+import assets
 
-HTML_TEMPLATE = """
+STYLESHEET = """
+@import url('assets:fonts.css');
+
+* { box-sizing: border-box; }
+body {
+    font-family: 'Inter', sans-serif;
+    margin: 0;
+    padding: 0;
+    color: #2D2D2D;
+    background: #FFFFFF;
+    font-size: 14px;
+    line-height: 1.7;
+}
+
+@page {
+    size: A4;
+    margin: 40px 50px;
+    /* Sections are laid out as separate documents, so the footer shows the
+       current section instead of a page count that would reset per section. */
+    @bottom-center {
+        content: "CYBER INTELLIGENCE WEEKLY  ·  " string(section);
+        font-size: 10px;
+        color: #888888;
+        padding-top: 10px;
+    }
+}
+
+.header {
+    background-color: #0A0A0A;
+    color: #FFFFFF;
+    padding: 20px 30px;
+    margin-bottom: 30px;
+    border-radius: 4px;
+}
+
+.header h1 {
+    font-weight: 900;
+    font-size: 28px;
+    margin: 0 0 5px 0;
+    letter-spacing: 1px;
+}
+
+.header .subtitle {
+    color: #C8102E;
+    font-weight: 600;
+    font-size: 14px;
+    margin: 0;
+}
+
+.header .date {
+    float: right;
+    font-size: 12px;
+    opacity: 0.8;
+    margin-top: -25px;
+}
+
+.stats-bar {
+    background: #1A1A2E;
+    color: white;
+    padding: 10px 20px;
+    border-radius: 4px;
+    font-size: 12px;
+    display: flex;
+    justify-content: space-between;
+    margin-bottom: 30px;
+}
+
+.stats-bar span {
+    font-weight: 600;
+}
+
+.exec-summary {
+    background: #F8F9FA;
+    border-left: 4px solid #C8102E;
+    padding: 20px;
+    margin-bottom: 30px;
+    border-radius: 0 4px 4px 0;
+}
+
+.exec-summary h2 {
+    font-size: 14px;
+    color: #888888;
+    margin-top: 0;
+    letter-spacing: 2px;
+    text-transform: uppercase;
+}
+
+h3.section-header {
+    string-set: section content();
+    font-size: 18px;
+    color: #1A1A2E;
+    margin-top: 40px;
+    margin-bottom: 20px;
+    padding-bottom: 10px;
+    border-bottom: 1px solid #E9ECEF;
+}
+
+h3.section-header.red { color: #C8102E; border-bottom-color: #C8102E; }
+h3.section-header.latam { color: #00247D; border-bottom: 1px solid #CF142B; }
+
+.card {
+    background: #FFFFFF;
+    border: 1px solid #E9ECEF;
+    padding: 20px;
+    margin-bottom: 20px;
+    border-radius: 6px;
+    page-break-inside: avoid;
+}
+
+.card h4 {
+    margin-top: 0;
+    margin-bottom: 10px;
+    font-size: 15px;
+    color: #0A0A0A;
+}
+
+.badge {
+    display: inline-block;
+    padding: 3px 8px;
+    border-radius: 3px;
+    font-size: 10px;
+    font-weight: 600;
+    color: white;
+    margin-bottom: 10px;
+}
+
+.badge.critical { background: #FF3B30; }
+.badge.high { background: #FF6B35; }
+.badge.medium { background: #FFB020; }
+.badge.low { background: #34C759; }
+.badge.info { background: #0057B8; }
+
+.cve-pill {
+    display: inline-block;
+    background: #0A0A0A;
+    color: white;
+    font-family: monospace;
+    padding: 2px 6px;
+    border-radius: 3px;
+    font-size: 11px;
+    margin-right: 5px;
+    margin-bottom: 5px;
+}
+
+.products {
+    font-size: 12px;
+    color: #555555;
+    margin: 5px 0;
+}
+
+.source-url {
+    display: block;
+    margin-top: 15px;
+    font-size: 11px;
+    color: #0057B8;
+    word-break: break-all;
+    text-decoration: none;
+}
+
+.footer {
+    margin-top: 50px;
+    padding-top: 20px;
+    border-top: 1px solid #E9ECEF;
+    font-size: 10px;
+    color: #888888;
+    text-align: center;
+}
+
+.still-open { width: 100%; border-collapse: collapse; font-size: 12px; }
+.still-open td { padding: 6px 4px; border-bottom: 1px solid #E9ECEF; vertical-align: top; }
+.still-open a { color: #0A0A0A; text-decoration: none; margin-right: 5px; }
+.still-open .since { color: #888888; white-space: nowrap; }
+.still-open .badge { margin-bottom: 0; }
+
+.two-col {
+    column-count: 2;
+    column-gap: 20px;
+}
+
+.two-col .card { margin-bottom: 20px; }
+"""
+
+LAYOUT_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <title>Cyber Intelligence Weekly</title>
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;900&display=swap');
-        
-        * { box-sizing: border-box; }
-        body {
-            font-family: 'Inter', sans-serif;
-            margin: 0;
-            padding: 0;
-            color: #2D2D2D;
-            background: #FFFFFF;
-            font-size: 14px;
-            line-height: 1.7;
-        }
-        
-        @page {
-            size: A4;
-            margin: 40px 50px;
-            @bottom-center {
-                content: "Page " counter(page) " of " counter(pages);
-                font-size: 10px;
-                color: #888888;
-                padding-top: 10px;
-            }
-        }
-        
-        .header {
-            background-color: #0A0A0A;
-            color: #FFFFFF;
-            padding: 20px 30px;
-            margin-bottom: 30px;
-            border-radius: 4px;
-        }
-        
-        .header h1 {
-            font-weight: 900;
-            font-size: 28px;
-            margin: 0 0 5px 0;
-            letter-spacing: 1px;
-        }
-        
-        .header .subtitle {
-            color: #C8102E;
-            font-weight: 600;
-            font-size: 14px;
-            margin: 0;
-        }
-        
-        .header .date {
-            float: right;
-            font-size: 12px;
-            opacity: 0.8;
-            margin-top: -25px;
-        }
-        
-        .stats-bar {
-            background: #1A1A2E;
-            color: white;
-            padding: 10px 20px;
-            border-radius: 4px;
-            font-size: 12px;
-            display: flex;
-            justify-content: space-between;
-            margin-bottom: 30px;
-        }
-        
-        .stats-bar span {
-            font-weight: 600;
-        }
-        
-        .exec-summary {
-            background: #F8F9FA;
-            border-left: 4px solid #C8102E;
-            padding: 20px;
-            margin-bottom: 30px;
-            border-radius: 0 4px 4px 0;
-        }
-        
-        .exec-summary h2 {
-            font-size: 14px;
-            color: #888888;
-            margin-top: 0;
-            letter-spacing: 2px;
-            text-transform: uppercase;
-        }
-        
-        h3.section-header {
-            font-size: 18px;
-            color: #1A1A2E;
-            margin-top: 40px;
-            margin-bottom: 20px;
-            padding-bottom: 10px;
-            border-bottom: 1px solid #E9ECEF;
-        }
-        
-        h3.section-header.red { color: #C8102E; border-bottom-color: #C8102E; }
-        h3.section-header.latam { color: #00247D; border-bottom: 1px solid #CF142B; }
-        
-        .card {
-            background: #FFFFFF;
-            border: 1px solid #E9ECEF;
-            padding: 20px;
-            margin-bottom: 20px;
-            border-radius: 6px;
-            page-break-inside: avoid;
-        }
-        
-        .card h4 {
-            margin-top: 0;
-            margin-bottom: 10px;
-            font-size: 15px;
-            color: #0A0A0A;
-        }
-        
-        .badge {
-            display: inline-block;
-            padding: 3px 8px;
-            border-radius: 3px;
-            font-size: 10px;
-            font-weight: 600;
-            color: white;
-            margin-bottom: 10px;
-        }
-        
-        .badge.critical { background: #FF3B30; }
-        .badge.high { background: #FF6B35; }
-        .badge.medium { background: #FFB020; }
-        .badge.low { background: #34C759; }
-        .badge.info { background: #0057B8; }
-        
-        .cve-pill {
-            display: inline-block;
-            background: #0A0A0A;
-            color: white;
-            font-family: monospace;
-            padding: 2px 6px;
-            border-radius: 3px;
-            font-size: 11px;
-            margin-right: 5px;
-            margin-bottom: 5px;
-        }
-        
-        .source-url {
-            display: block;
-            margin-top: 15px;
-            font-size: 11px;
-            color: #0057B8;
-            word-break: break-all;
-            text-decoration: none;
-        }
-        
-        .footer {
-            margin-top: 50px;
-            padding-top: 20px;
-            border-top: 1px solid #E9ECEF;
-            font-size: 10px;
-            color: #888888;
-            text-align: center;
-        }
-        
-        .two-col {
-            column-count: 2;
-            column-gap: 20px;
-        }
-        
-        .two-col .card { margin-bottom: 20px; }
-    </style>
 </head>
 <body>
+{% block content %}{% endblock %}
+</body>
+</html>
+"""
 
+# Each section is rendered (and laid out by WeasyPrint) as its own document so
+# unchanged sections can be reused from the section cache. Order = PDF order.
+SECTION_TEMPLATES = {
+    # Carries the generation timestamp, so it is laid out on every render (one page)
+    "overview": """{% extends 'layout.html' %}{% block content %}
     <div class="header">
         <h1>CYBER INTELLIGENCE</h1>
         <p class="subtitle">Weekly Security Intelligence Briefing</p>
@@ -193,19 +225,37 @@ HTML_TEMPLATE = """
         <span>CVEs: {{ data.stats.cves_identified }}</span>
         <span>Sources: {{ data.stats.sources_scraped }}</span>
     </div>
+    {% if data.stats.updated_count or data.stats.carried_over_count %}
+    <div class="stats-bar">
+        <span>New: {{ data.stats.new_count }}</span>
+        <span>Updated: {{ data.stats.updated_count }}</span>
+        <span>Still open: {{ data.stats.carried_over_count }}</span>
+    </div>
+    {% endif %}
 
     <div class="exec-summary">
         <h2>EXECUTIVE SUMMARY</h2>
         <p>{{ data.executive_summary }}</p>
     </div>
 
+    <div class="footer">
+        Generated by Cyber Intelligence Automation | {{ current_date }}<br>
+        <strong>This report contains only information from verified public sources. No AI-generated claims.</strong>
+    </div>
+{% endblock %}""",
+    "critical_alerts": """{% extends 'layout.html' %}{% block content %}
     {% if data.critical_alerts %}
     <h3 class="section-header red">🚨 CRITICAL ALERTS</h3>
     {% for alert in data.critical_alerts %}
     <div class="card">
-        <span class="badge {{ alert.severity|lower }}">{{ alert.severity }}</span>
+        <span class="badge {{ alert.severity|lower }}">{{ alert.severity }}{% if alert.cvss is not none %} · CVSS {{ alert.cvss }}{% endif %}</span>
+        {% if alert.kev %}<span class="badge critical">KNOWN EXPLOITED</span>{% endif %}
+        {% if alert.change == 'updated' %}<span class="badge info">UPDATED</span>{% endif %}
         <h4>{{ alert.title }}</h4>
         <p>{{ alert.description }}</p>
+        {% if alert.affected_products %}
+        <p class="products">Affected: {{ alert.affected_products|join(', ') }}</p>
+        {% endif %}
         
         {% if alert.cve_ids %}
         <div style="margin-top: 10px;">
@@ -222,7 +272,8 @@ HTML_TEMPLATE = """
     </div>
     {% endfor %}
     {% endif %}
-
+{% endblock %}""",
+    "latam_venezuela_intelligence": """{% extends 'layout.html' %}{% block content %}
     {% if data.latam_venezuela_intelligence %}
     <h3 class="section-header latam">🇻🇪 LATAM & VENEZUELA INTELLIGENCE</h3>
     {% for alert in data.latam_venezuela_intelligence %}
@@ -236,15 +287,21 @@ HTML_TEMPLATE = """
     </div>
     {% endfor %}
     {% endif %}
-
+{% endblock %}""",
+    "vulnerabilities_and_patches": """{% extends 'layout.html' %}{% block content %}
     {% if data.vulnerabilities_and_patches %}
     <h3 class="section-header">🛡 VULNERABILITIES & PATCHES</h3>
     <div class="two-col">
     {% for vuln in data.vulnerabilities_and_patches %}
     <div class="card">
-        <span class="badge {{ vuln.severity|lower }}">{{ vuln.severity }}</span>
+        <span class="badge {{ vuln.severity|lower }}">{{ vuln.severity }}{% if vuln.cvss is not none %} · CVSS {{ vuln.cvss }}{% endif %}</span>
+        {% if vuln.kev %}<span class="badge critical">KNOWN EXPLOITED</span>{% endif %}
+        {% if vuln.change == 'updated' %}<span class="badge info">UPDATED</span>{% endif %}
         <h4>{{ vuln.title }}</h4>
         <p>{{ vuln.description }}</p>
+        {% if vuln.affected_products %}
+        <p class="products">Affected: {{ vuln.affected_products|join(', ') }}</p>
+        {% endif %}
         {% if vuln.cve_ids %}
         <div style="margin-top: 10px;">
             {% for cve in vuln.cve_ids %}
@@ -260,54 +317,149 @@ HTML_TEMPLATE = """
     {% endfor %}
     </div>
     {% endif %}
-
+{% endblock %}""",
+    "breaches_and_incidents": """{% extends 'layout.html' %}{% block content %}
     {% if data.breaches_and_incidents %}
     <h3 class="section-header">🏴‍☠️ BREACHES & INCIDENTS</h3>
     {% for breach in data.breaches_and_incidents %}
     <div class="card">
+        {% if breach.change == 'updated' %}<span class="badge info">UPDATED</span>{% endif %}
         <h4>{{ breach.title }}</h4>
         <p>{{ breach.description }}</p>
         <a href="{{ breach.source_url }}" class="source-url">{{ breach.source_url }}</a>
     </div>
     {% endfor %}
     {% endif %}
+{% endblock %}""",
+    # Delta mode: unchanged carry-overs, listed without synthesis
+    "still_open": """{% extends 'layout.html' %}{% block content %}
+    {% if data.still_open %}
+    <h3 class="section-header">⏳ STILL OPEN</h3>
+    <table class="still-open">
+        {% for item in data.still_open %}
+        <tr>
+            <td><span class="badge {{ item.severity|lower }}">{{ item.severity }}</span>{% if item.kev %} <span class="badge critical">KEV</span>{% endif %}</td>
+            <td>
+                <a href="{{ item.source_url }}">{{ item.title }}</a>
+                {% for cve in item.cve_ids %}<span class="cve-pill">{{ cve }}</span>{% endfor %}
+            </td>
+            <td class="since">since {{ item.first_reported }}</td>
+        </tr>
+        {% endfor %}
+    </table>
+    {% endif %}
+{% endblock %}""",
+}
 
-    <div class="footer">
-        Generated by Cyber Intelligence Automation | {{ current_date }}<br>
-        <strong>This report contains only information from verified public sources. No AI-generated claims.</strong>
-    </div>
+# Compiled template, parsed stylesheet and font configuration are built once on
+# first use and reused for every render in this process (e.g. the Streamlit app).
+# WeasyPrint itself is only imported there, so importing this module stays cheap.
+_jinja_env = Environment(loader=DictLoader({'layout.html': LAYOUT_TEMPLATE, **SECTION_TEMPLATES}))
 
-</body>
-</html>
-"""
+@lru_cache(maxsize=None)
+def _get_template(section: str):
+    return _jinja_env.get_template(section)
+
+@lru_cache(maxsize=None)
+def _get_font_config():
+    from weasyprint.text.fonts import FontConfiguration
+    return FontConfiguration()
 
-def generate(newsletter_data: dict) -> str:
+@lru_cache(maxsize=None)
+def _get_stylesheet():
+    from weasyprint import CSS
+    return CSS(string=STYLESHEET, font_config=_get_font_config(), url_fetcher=assets.url_fetcher)
+
+def reset_caches():
+    """Drops the cached template/stylesheet objects and rendered sections (used by the render benchmark for cold runs)."""
+    with _section_lock:
+        _section_cache.clear()
+    _get_template.cache_clear()
+    _get_font_config.cache_clear()
+    _get_stylesheet.cache_clear()
+    _jinja_env.cache.clear()
+
+# Per-section render cache: content hash of the section HTML -> laid-out
+# WeasyPrint Document. Bounded LRU so the long-lived processes stay small.
+SECTION_CACHE_SIZE = 32
+_section_cache: "OrderedDict[str, object]" = OrderedDict()
+_section_lock = threading.Lock()
+
+def _render_section(section: str, newsletter_data: Newsletter, current_date: str, work_dir: str, image_cache: dict):
+    """
+    Returns (document, from_cache) for one section, laying it out only if its content changed.
+    The section HTML is streamed chunk by chunk from the template into a temp file
+    (hashed on the way) instead of being built as one string in memory.
+    """
+    digest = hashlib.sha256(f"{section}\0".encode("utf-8"))
+    html_path = os.path.join(work_dir, f"{section}.html")
+    with open(html_path, "wb") as f:
+        for chunk in _get_template(section).generate(data=newsletter_data, current_date=current_date):
+            data = chunk.encode("utf-8")
+            digest.update(data)
+            f.write(data)
+    key = digest.hexdigest()
+
+    with _section_lock:
+        document = _section_cache.get(key)
+        if document is not None:
+            _section_cache.move_to_end(key)
+            return document, True
+
+    from weasyprint import HTML
+    # The image cache is shared by the sections of one generate() call; laid-out
+    # documents read image data back from it when the PDF is written, so it lives
+    # (and is evicted) with the sections that reference it
+    document = HTML(filename=html_path, encoding="utf-8", url_fetcher=assets.url_fetcher).render(
+        stylesheets=[_get_stylesheet()],
+        font_config=_get_font_config(),
+        cache=image_cache
+    )
+    with _section_lock:
+        _section_cache[key] = document
+        while len(_section_cache) > SECTION_CACHE_SIZE:
+            _section_cache.popitem(last=False)
+    return document, False
+
+def generate(newsletter_data: Newsletter, filepath: str = None) -> str:
     """Generates the PDF and returns its file path."""
     logger.info("Generating PDF newsletter")
     
-    # Setup Jinja environment
-    env = Environment(loader=DictLoader({'newsletter.html': HTML_TEMPLATE}))
-    template = env.get_template('newsletter.html')
-    
     import pytz
     tz = pytz.timezone(TIMEZONE)
     current_date = datetime.now(tz).strftime('%B %d, %Y %H:%M %Z')
     
-    html_out = template.render(data=newsletter_data, current_date=current_date)
-    
-    filename = f"cyber_newsletter_{get_week_label(TIMEZONE)}.pdf"
-    filepath = os.path.join(OUTPUT_DIR, filename)
+    if filepath is None:
+        filename = f"cyber_newsletter_{get_week_label(TIMEZONE)}.pdf"
+        filepath = os.path.join(OUTPUT_DIR, filename)
     
     try:
-        HTML(string=html_out).write_pdf(filepath)
-        logger.info(f"PDF successfully written to {filepath}")
+        documents = []
+        reused = 0
+        image_cache = {}
+        with tempfile.TemporaryDirectory(prefix="newsletter_html_") as work_dir:
+            for section in SECTION_TEMPLATES:
+                if section != "overview" and not getattr(newsletter_data, section):
+                    continue
+                document, from_cache = _render_section(section, newsletter_data, current_date, work_dir, image_cache)
+                documents.append(document)
+                reused += from_cache
+
+        # Stitch the independently laid-out sections into one PDF, written in
+        # chunks to a temp file that is atomically renamed into place. WeasyPrint's
+        # defaults already give the smallest file for this template: compressed
+        # streams, each font embedded once, subset to the glyphs used.
+        pages = [page for document in documents for page in document.pages]
+        with atomic_write(filepath, "wb") as f:
+            documents[0].copy(pages).write_pdf(f)
+        size_kb = os.path.getsize(filepath) / 1024
+        logger.info(f"PDF successfully written to {filepath} ({size_kb:.0f} KB, {reused}/{len(documents)} sections reused from cache)")
         return filepath
     except Exception as e:
         logger.error(f"Error generating PDF: {e}")
         # Fallback to plain text if WeasyPrint fails (system dependencies missing)
         fallback_path = filepath.replace(".pdf", ".txt")
-        import json
-        with open(fallback_path, "w", encoding="utf-8") as f:
-            f.write(json.dumps(newsletter_data, indent=2))
+        with atomic_write(fallback_path) as f:
+            json.dump(newsletter_data.model_dump(mode="json"), f, indent=2)
         logger.warning(f"Fallback text file generated at {fallback_path}")
         return fallback_path
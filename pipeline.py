@@ -0,0 +1,118 @@
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from config import logger
+import pdf_generator
+import whatsapp_formatter
+import gmail_sender
+from models import Newsletter
+import instrumentation
+import profiling
+
+@dataclass
+class RenderResult:
+    pdf_path: Optional[str] = None
+    wa_path: Optional[str] = None
+    email_sent: bool = False
+    timings: Dict[str, float] = field(default_factory=dict) # renderer -> seconds
+
+# One long-lived PDF worker process, so pdf_generator's compiled templates and
+# per-section render cache survive between renders.
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=1)
+        return _pdf_pool
+
+def _reset_pdf_pool():
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False)
+        _pdf_pool = None
+
+def _timed(fn, *args):
+    """Runs fn(*args) and returns (result, elapsed_seconds). Executed inside the worker."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def _pdf_result(pdf_future, newsletter: Newsletter):
+    try:
+        return pdf_future.result()
+    except BrokenProcessPool as e:
+        # e.g. the worker was killed or could not be spawned: render in-process instead
+        logger.warning(f"PDF worker process failed ({e}). Rendering PDF in-process.")
+        _reset_pdf_pool()
+        return _timed(pdf_generator.generate, newsletter)
+
+def _send_when_ready(pdf_stage, newsletter: Newsletter):
+    pdf_path, _ = pdf_stage.result()
+    return _timed(gmail_sender.send, pdf_path, newsletter)
+
+def _render_concurrent(newsletter: Newsletter, send_email: bool, result: RenderResult):
+    with ThreadPoolExecutor(max_workers=3) as threads:
+        pdf_future = _get_pdf_pool().submit(_timed, pdf_generator.generate, newsletter)
+        pdf_stage = instrumentation.submit(threads, _pdf_result, pdf_future, newsletter)
+        wa_future = instrumentation.submit(threads, _timed, whatsapp_formatter.generate, newsletter)
+        email_future = instrumentation.submit(threads, _send_when_ready, pdf_stage, newsletter) if send_email else None
+
+        result.pdf_path, result.timings["pdf"] = pdf_stage.result()
+        logger.info(f"PDF generated: {result.pdf_path}")
+
+        try:
+            result.wa_path, result.timings["whatsapp"] = wa_future.result()
+            logger.info(f"WhatsApp text generated: {result.wa_path}")
+        except Exception as e:
+            logger.error(f"Error generating WhatsApp text: {e}")
+
+        if email_future is not None:
+            try:
+                result.email_sent, result.timings["email"] = email_future.result()
+            except Exception as e:
+                logger.error(f"Error sending email: {e}")
+
+def _render_sequential(newsletter: Newsletter, send_email: bool, result: RenderResult):
+    result.pdf_path, result.timings["pdf"] = _timed(pdf_generator.generate, newsletter)
+    logger.info(f"PDF generated: {result.pdf_path}")
+    try:
+        result.wa_path, result.timings["whatsapp"] = _timed(whatsapp_formatter.generate, newsletter)
+        logger.info(f"WhatsApp text generated: {result.wa_path}")
+    except Exception as e:
+        logger.error(f"Error generating WhatsApp text: {e}")
+
+    if send_email:
+        try:
+            result.email_sent, result.timings["email"] = _timed(gmail_sender.send, result.pdf_path, newsletter)
+        except Exception as e:
+            logger.error(f"Error sending email: {e}")
+
+def render_outputs(newsletter: Newsletter, send_email: bool = False) -> RenderResult:
+    """
+    Fans the validated newsletter out to every output format concurrently.
+    WeasyPrint runs in a worker process (CPU-bound), the WhatsApp formatter in a
+    thread, and the email is sent as soon as the PDF is ready.
+    """
+    result = RenderResult()
+    start = time.perf_counter()
+
+    with instrumentation.span("render"):
+        if profiling.enabled():
+            # cProfile only profiles the calling thread, and neither profiler sees the PDF worker process
+            _render_sequential(newsletter, send_email, result)
+        else:
+            _render_concurrent(newsletter, send_email, result)
+
+    for renderer, seconds in result.timings.items():
+        instrumentation.record(f"render.{renderer}", seconds, parent="render")
+    result.timings["total"] = time.perf_counter() - start
+    logger.info("Render timings: " + ", ".join(f"{k}={v:.2f}s" for k, v in result.timings.items()))
+    return result
@@ -0,0 +1,96 @@
+import os
+import io
+import pstats
+import cProfile
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Optional
+
+from config import logger, OUTPUT_DIR
+
+# Opt-in per-stage profiling (`cyber_newsletter.py --profile cpu|mem`).
+# When disabled, stage() returns a shared no-op context manager, so the
+# instrumented pipeline pays nothing beyond one attribute check.
+
+MODES = ("cpu", "mem")
+TOP_N = 30
+
+_mode: Optional[str] = None
+_out_dir: str = OUTPUT_DIR
+_stamp: str = ""
+_NULL = nullcontext()
+
+def enable(mode: str, out_dir: str = OUTPUT_DIR):
+    global _mode, _out_dir
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode '{mode}', expected one of {MODES}")
+    _mode = mode
+    _out_dir = out_dir
+    new_run()
+    logger.info(f"{mode.upper()} profiling enabled. Reports will be written to {out_dir}")
+
+def new_run():
+    """Starts a new report file name stamp, so each run of the daemon keeps its own profiles."""
+    global _stamp
+    _stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+
+def enabled() -> bool:
+    return _mode is not None
+
+def stage(name: str):
+    """Profiles the enclosed block as stage `name` (scrape/synthesize/render) if profiling is enabled."""
+    if _mode is None:
+        return _NULL
+    return _cpu_stage(name) if _mode == "cpu" else _mem_stage(name)
+
+def _report_path(name: str, ext: str) -> str:
+    return os.path.join(_out_dir, f"profile_{_stamp}_{name}.{ext}")
+
+@contextmanager
+def _cpu_stage(name: str):
+    # cProfile only sees the calling thread; scraper.refresh_stale_sources and
+    # pipeline.render_outputs run sequentially while profiling is enabled so
+    # fetching, parsing and WeasyPrint show up here.
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        stats_path = _report_path(name, "pstats")
+        profiler.dump_stats(stats_path)
+
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(TOP_N)
+        with open(_report_path(name, "txt"), "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        logger.info(f"CPU profile for stage '{name}' written to {stats_path}")
+
+@contextmanager
+def _mem_stage(name: str):
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(25)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    try:
+        yield
+    finally:
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started_here:
+            tracemalloc.stop()
+
+        report_path = _report_path(name, "mem.txt")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(f"Stage: {name}\n")
+            f.write(f"Traced memory after stage: {current / 1024 / 1024:.1f} MiB, peak during stage: {peak / 1024 / 1024:.1f} MiB\n\n")
+            f.write(f"Top {TOP_N} allocations by size delta (file:line):\n")
+            for diff in after.compare_to(before, "lineno")[:TOP_N]:
+                f.write(f"{diff}\n")
+            f.write(f"\nTop {TOP_N} allocation sites still held after the stage (traceback):\n")
+            for stat in after.statistics("traceback")[:TOP_N]:
+                f.write(f"\n{stat.count} blocks, {stat.size / 1024:.1f} KiB\n")
+                f.write("\n".join(stat.traceback.format(limit=8)) + "\n")
+        logger.info(f"Memory profile for stage '{name}' written to {report_path} (peak {peak / 1024 / 1024:.1f} MiB)")
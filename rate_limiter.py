@@ -0,0 +1,140 @@
+import time
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from config import logger, HOST_RATE_LIMIT, HOST_BURST
+import instrumentation
+
+# Per-host politeness: one token bucket per host, refilled at the host's rate.
+# The rate is the configured default (or a source's `rate_limit`; the strictest
+# one when several sources share a host), lowered to the robots.txt
+# Crawl-delay / Request-rate when the site asks for less.
+# Callers reserve a token under the lock and sleep outside it, so concurrent
+# fetches to different hosts never wait on each other.
+
+ROBOTS_TTL = 24 * 3600 # seconds
+ROBOTS_TIMEOUT = 5 # seconds
+ROBOTS_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate # tokens per second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes one token, going into debt if none is left. Returns how long the caller must wait."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def configure(self, rate: float, burst: float):
+        """Switches to a new rate, crediting the tokens refilled at the old one so far."""
+        with self._lock:
+            if (rate, burst) == (self.rate, self.burst):
+                return
+            now = time.monotonic()
+            self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate, self.burst = rate, burst
+
+_buckets: Dict[str, TokenBucket] = {}
+_robots: Dict[str, Tuple[float, Optional[float]]] = {} # host -> (fetched at, min seconds between requests)
+_rates: Dict[str, Dict[float, float]] = {} # host -> {requested rate: last requested at}, expires after ROBOTS_TTL
+_lock = threading.Lock()
+_robots_locks: Dict[str, threading.Lock] = {}
+
+def _robots_delay(scheme: str, host: str) -> Optional[float]:
+    """Crawl-delay (or 1 / Request-rate) from the host's robots.txt, cached for ROBOTS_TTL."""
+    with _lock:
+        cached = _robots.get(host)
+        if cached and time.time() - cached[0] < ROBOTS_TTL:
+            return cached[1]
+        host_lock = _robots_locks.setdefault(host, threading.Lock())
+
+    with host_lock: # one robots.txt fetch per host, even with many concurrent callers
+        with _lock:
+            cached = _robots.get(host)
+        if cached and time.time() - cached[0] < ROBOTS_TTL:
+            return cached[1]
+
+        delay = None
+        try:
+            res = requests.get(f"{scheme}://{host}/robots.txt", headers={"User-Agent": ROBOTS_USER_AGENT}, timeout=ROBOTS_TIMEOUT)
+            if res.status_code == 200:
+                parser = RobotFileParser()
+                parser.parse(res.text.splitlines())
+                crawl_delay = parser.crawl_delay("*")
+                request_rate = parser.request_rate("*")
+                delays = [float(crawl_delay)] if crawl_delay else []
+                if request_rate and request_rate.requests:
+                    delays.append(request_rate.seconds / request_rate.requests)
+                delay = max(delays) if delays else None
+                if delay:
+                    logger.info(f"robots.txt for {host} asks for {delay:g}s between requests")
+        except Exception as e:
+            logger.debug(f"Could not read robots.txt for {host}: {e}")
+
+        with _lock:
+            _robots[host] = (time.time(), delay)
+        return delay
+
+def _host_rate(host: str, rate: float) -> float:
+    """Strictest rate requested for `host` in the last ROBOTS_TTL, so sources sharing a host don't override each other."""
+    now = time.time()
+    with _lock:
+        requested = _rates.setdefault(host, {})
+        requested[rate] = now
+        for r, seen in list(requested.items()):
+            if now - seen >= ROBOTS_TTL:
+                del requested[r]
+        return min(requested)
+
+def _bucket(scheme: str, host: str, rate: Optional[float]) -> TokenBucket:
+    rate = _host_rate(host, rate or HOST_RATE_LIMIT)
+    burst = HOST_BURST
+    delay = _robots_delay(scheme, host)
+    if delay:
+        # The site's own limit wins when it is stricter; no bursting past it
+        rate, burst = min(rate, 1 / delay), 1
+    with _lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(rate, burst)
+            return bucket
+    bucket.configure(rate, burst)
+    return bucket
+
+def acquire(url: str, rate: Optional[float] = None) -> float:
+    """
+    Blocks until a request to `url`'s host is allowed. `rate` (requests/second)
+    overrides HOST_RATE_LIMIT for that host. Returns the seconds spent waiting.
+    """
+    parts = urlsplit(url)
+    if not parts.hostname:
+        return 0.0
+    host = parts.netloc.lower()
+    wait = _bucket(parts.scheme or "https", host, rate).reserve()
+    if wait > 0:
+        logger.debug(f"Rate limiting {host}: waiting {wait:.2f}s")
+        time.sleep(wait)
+        parent = instrumentation.current_span()
+        instrumentation.record("rate_wait", wait, parent=parent.name if parent else None, host=host)
+        instrumentation.add("rate_wait_s", round(wait, 3))
+    return wait
+
+def reset():
+    """Forgets every bucket and cached robots.txt (e.g. for benchmarks)."""
+    with _lock:
+        _buckets.clear()
+        _robots.clear()
+        _rates.clear()
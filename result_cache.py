@@ -0,0 +1,86 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Tuple
+
+from config import logger
+from utils import NewsItem
+from models import Newsletter
+
+# In-process TTL cache for the dashboard's pipeline stages. Entries are keyed
+# by stage + week (+ a fingerprint of the stage input), so a re-render reuses
+# the scrape and synthesis of the same week until they expire.
+
+class TTLCache:
+    def __init__(self, max_entries: int = 32):
+        self._entries: "OrderedDict[Hashable, Tuple[float, float, object]]" = OrderedDict() # key -> (stored at, ttl, value)
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[Optional[object], float]:
+        """Returns (value, age in seconds); value is None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, 0.0
+            stored_at, ttl, value = entry
+            age = time.time() - stored_at
+            if age > ttl:
+                del self._entries[key]
+                return None, 0.0
+            self._entries.move_to_end(key)
+            return value, age
+
+    def set(self, key: Hashable, value: object, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.time(), ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, ttl: float, fn: Callable[[], object],
+                       empty_ttl: float = 0.0) -> Tuple[object, Optional[float]]:
+        """
+        Returns (value, age of the cached value or None if it was just computed).
+        An empty result (e.g. a scrape while the network is down) is kept only
+        for `empty_ttl` seconds, not at all by default, so the next call retries.
+        """
+        value, age = self.get(key)
+        if value is not None:
+            logger.info(f"Cache hit for {key[0] if isinstance(key, tuple) else key} ({age:.0f}s old)")
+            return value, age
+        value = fn()
+        if value is None:
+            return value, None
+        if isinstance(value, (list, dict, tuple)) and not value:
+            if empty_ttl > 0:
+                self.set(key, value, empty_ttl)
+            return value, None
+        self.set(key, value, ttl)
+        return value, None
+
+    def invalidate(self, predicate: Callable[[Hashable], bool] = None):
+        """Drops every entry, or those whose key matches `predicate`."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate is None or predicate(k)]:
+                del self._entries[key]
+
+    def entries(self) -> List[dict]:
+        now = time.time()
+        with self._lock:
+            return [
+                {"key": key, "age_s": round(now - stored_at), "expires_in_s": round(stored_at + ttl - now)}
+                for key, (stored_at, ttl, _) in self._entries.items()
+                if now - stored_at <= ttl
+            ]
+
+def items_fingerprint(items: List[NewsItem]) -> str:
+    digest = hashlib.sha256()
+    # Severity/CVSS/KEV come from the CVE index and change when it is refreshed
+    for key in sorted(f"{i.url}\x00{i.title}\x00{i.summary}\x00{i.severity}\x00{i.cvss}\x00{i.kev}" for i in items):
+        digest.update(key.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def newsletter_fingerprint(newsletter: Newsletter) -> str:
+    return hashlib.sha256(newsletter.model_dump_json().encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,93 @@
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from config import logger, ITEM_STORE_PATH
+from utils import NewsItem, Period, canonical_url
+from models import Newsletter, Stats, SECTION_MODELS
+from cve_index import SEVERITY_RANK
+import item_store
+
+# Monthly / quarterly roll-ups built from what the weekly runs already
+# produced: per-week counts precomputed in week_aggregates, and the weekly
+# newsletters stored by search_index.index_newsletter_safely. No raw items are
+# re-read and nothing is re-synthesized.
+
+ROLLUP_MAX_PER_SECTION = 15
+ROLLUP_MAX_ACTIONS = 10
+
+def store_week_aggregate(week: str, items: List[NewsItem], path: str = ITEM_STORE_PATH):
+    """Precomputes the counts a roll-up needs from one week's (deduplicated, enriched) items."""
+    severities = Counter(i.severity for i in items)
+    sources = Counter(i.source_name for i in items)
+    cves = sorted({c for i in items for c in i.cve_ids})
+    with item_store.connect(path) as conn:
+        conn.execute("INSERT OR REPLACE INTO week_aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            week, len(items), severities["CRITICAL"], severities["HIGH"], severities["MEDIUM"],
+            sum(i.kev for i in items), json.dumps(dict(sources)), json.dumps(cves),
+            datetime.now(timezone.utc).isoformat()
+        ))
+
+def rollup_stats(weeks: List[str], path: str = ITEM_STORE_PATH) -> Stats:
+    """Sums the weekly aggregates; sources and CVEs are counted once across the period."""
+    stats = Stats()
+    sources, cves = set(), set()
+    marks = ",".join("?" * len(weeks))
+    with item_store.connect(path) as conn:
+        rows = conn.execute(f"SELECT * FROM week_aggregates WHERE week IN ({marks})", weeks).fetchall()
+    for r in rows:
+        stats.total_items_analyzed += r["items"]
+        stats.critical_count += r["critical"]
+        stats.high_count += r["high"]
+        stats.medium_count += r["medium"]
+        sources.update(json.loads(r["sources"]))
+        cves.update(json.loads(r["cves"]))
+    stats.sources_scraped, stats.cves_identified = len(sources), len(cves)
+    return stats
+
+def weekly_reports(weeks: List[str], path: str = ITEM_STORE_PATH) -> Dict[str, Newsletter]:
+    marks = ",".join("?" * len(weeks))
+    with item_store.connect(path) as conn:
+        rows = conn.execute(f"SELECT week, newsletter FROM reports WHERE week IN ({marks}) ORDER BY week", weeks).fetchall()
+    return {r["week"]: Newsletter.model_validate_json(r["newsletter"]) for r in rows}
+
+def _rank(entry) -> tuple:
+    return (-SEVERITY_RANK.get(getattr(entry, "severity", ""), 0), -getattr(entry, "kev", False), -(getattr(entry, "cvss", None) or 0))
+
+def build_rollup(period: Period, path: str = ITEM_STORE_PATH) -> Newsletter:
+    """Merges the period's weekly reports into one newsletter with precomputed stats."""
+    weeks = period.week_labels()
+    reports = weekly_reports(weeks, path)
+    missing = [w for w in weeks if w not in reports]
+    if missing:
+        logger.warning(f"{period.label} roll-up: no weekly report for {', '.join(missing)}")
+
+    data = {"week_label": period.title}
+    for section in SECTION_MODELS:
+        # An entry reported in several weeks appears once, in its latest version
+        latest = {}
+        for week in sorted(reports):
+            for entry in getattr(reports[week], section):
+                key = canonical_url(entry.source_url)
+                latest.pop(key, None) # re-inserted, so it sorts by its latest week
+                latest[key] = entry
+        entries = list(latest.values())[::-1] # most recent first
+        entries.sort(key=_rank) # stable: most severe first, recency within a severity
+        data[section] = entries[:ROLLUP_MAX_PER_SECTION]
+
+    actions = []
+    for week in sorted(reports, reverse=True):
+        actions += [a for a in reports[week].recommended_actions if a not in actions]
+    data["recommended_actions"] = actions[:ROLLUP_MAX_ACTIONS]
+
+    stats = rollup_stats(weeks, path)
+    data["stats"] = stats
+    headlines = "; ".join(e.title for e in data["critical_alerts"][:3])
+    data["executive_summary"] = (
+        f"{period.kind.capitalize()}ly roll-up of {len(reports)} weekly report(s), {period.date_range}: "
+        f"{stats.total_items_analyzed} items analyzed, {stats.critical_count} critical and {stats.high_count} high, "
+        f"{stats.cves_identified} distinct CVEs from {stats.sources_scraped} sources."
+        + (f" Most significant: {headlines}." if headlines else "")
+    )
+    return Newsletter.model_validate(data)
@@ -1,20 +1,54 @@
 import time
-import feedparser
 import requests
-from bs4 import BeautifulSoup
-from lxml import etree
 from dateutil import parser as date_parser
-from datetime import datetime, timezone
-from playwright.sync_api import sync_playwright
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
-from config import logger, GLOBAL_SOURCES, LATAM_SOURCES, TIMEZONE
+from config import logger, TIMEZONE, HTTP_POLL_WORKERS
 from utils import NewsItem, is_current_week, extract_cves
+import instrumentation
+import profiling
+import item_store
+import source_registry
+import source_health
+import rate_limiter
 
-def fetch_rss(url: str, source: dict) -> list[NewsItem]:
+FEED_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+def _download(url: str, headers: dict = None, timeout: int = 15, rate: float = None) -> requests.Response:
+    """GET a URL through the per-host rate limiter, recording the downloaded bytes on the current fetch span."""
+    rate_limiter.acquire(url, rate)
+    with instrumentation.span("http", url=url) as s:
+        response = requests.get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        s.set("status_code", response.status_code)
+    instrumentation.add("bytes", len(response.content))
+    return response
+
+def _record_error(e: Exception):
+    """Counts a fetch error on the current span and keeps its message for the source health state."""
+    instrumentation.add("errors")
+    s = instrumentation.current_span()
+    if s is not None:
+        s.set("error", str(e))
+
+def source_region(source: dict) -> str:
+    return source.get("region", "global")
+
+def _timeout(source: dict, default: float) -> float:
+    return source.get("timeout", default)
+
+def _parse_feed(content: bytes, source: dict) -> list[NewsItem]:
+    # Parser libraries are imported on first use, keeping `import scraper` cheap
+    import feedparser
+    from bs4 import BeautifulSoup
     items = []
-    try:
-        # Feedparser can handle both RSS and Atom
-        feed = feedparser.parse(url)
+    region = source_region(source) # resolved once, not per entry
+    # Feedparser can handle both RSS and Atom
+    with instrumentation.span("parse", source=source['name']):
+        feed = feedparser.parse(content)
         for entry in feed.entries:
             # Try multiple date formats sometimes provided by feeds
             pub_date_str = entry.get('published', entry.get('updated', None))
@@ -59,31 +93,38 @@ def fetch_rss(url: str, source: dict) -> list[NewsItem]:
                 cve_ids=cves,
                 category="Advisory", # Default
                 language=source.get('language', 'en'),
-                region="global" if source in GLOBAL_SOURCES else "latam"
+                region=region
             ))
-            
-    except Exception as e:
-        logger.error(f"Error fetching RSS from {source['name']} ({url}): {e}")
         
     return items
 
+def fetch_rss(url: str, source: dict) -> list[NewsItem]:
+    try:
+        response = _download(url, headers=FEED_HEADERS, timeout=_timeout(source, 15), rate=source.get('rate_limit'))
+        return _parse_feed(response.content, source)
+    except Exception as e:
+        logger.error(f"Error fetching RSS from {source['name']} ({url}): {e}")
+        _record_error(e)
+    return []
+
 def fetch_xml(url: str, source: dict) -> list[NewsItem]:
     # Similar to RSS but maybe more manual if it's a custom XML like VMware's
     items = []
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        response = _download(url, headers=FEED_HEADERS, timeout=_timeout(source, 10), rate=source.get('rate_limit'))
         
         # Simple extraction using lxml. Adapt based on actual schema if needed.
         # Fallback to feedparser because often .xml is just RSS/Atom.
         # If feedparser fails or we know it's a specific schema, do manual extraction here.
-        # Let's try feedparser first:
-        return fetch_rss(url, source)
+        # Let's try feedparser first (on the already downloaded body):
+        return _parse_feed(response.content, source)
     except Exception as e:
         logger.error(f"Error fetching XML from {source['name']} ({url}): {e}")
+        _record_error(e)
     return items
 
 def fetch_telegram_public(url: str, source: dict) -> list[NewsItem]:
+    from bs4 import BeautifulSoup
     items = []
     try:
         # Convert t.me/ciberciac to t.me/s/ciberciac
@@ -93,13 +134,13 @@ def fetch_telegram_public(url: str, source: dict) -> list[NewsItem]:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
+        response = _download(url, headers=headers, timeout=_timeout(source, 15), rate=source.get('rate_limit'))
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find all message widgets
-        messages = soup.find_all('div', class_='tgme_widget_message')
+        with instrumentation.span("parse", source=source['name']):
+            soup = BeautifulSoup(response.text, 'html.parser')
+            
+            # Find all message widgets
+            messages = soup.find_all('div', class_='tgme_widget_message')
         
         for msg in messages:
             try:
@@ -156,21 +197,27 @@ def fetch_telegram_public(url: str, source: dict) -> list[NewsItem]:
 
     except Exception as e:
         logger.error(f"Error fetching Telegram from {source['name']} ({url}): {e}")
+        _record_error(e)
     return items
 
 def fetch_html_playwright(url: str, source: dict) -> list[NewsItem]:
     items = []
+    region = source_region(source)
     logger.info(f"Using Playwright to scrape {source['name']}")
     try:
+        from bs4 import BeautifulSoup
+        from playwright.sync_api import sync_playwright
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
             page = browser.new_page()
             
             try:
-                page.goto(url, wait_until="networkidle", timeout=30000)
+                rate_limiter.acquire(url, source.get('rate_limit'))
+                page.goto(url, wait_until="networkidle", timeout=_timeout(source, 30) * 1000)
                 time.sleep(3) # Extra wait for JS frameworks
                 
                 content = page.content()
+                instrumentation.add("bytes", len(content.encode("utf-8")))
                 soup = BeautifulSoup(content, 'html.parser')
                 
                 # We need specific CSS selectors for specific sites if we wanted full fidelity
@@ -212,29 +259,31 @@ def fetch_html_playwright(url: str, source: dict) -> list[NewsItem]:
                                     published_date=pub_date,
                                     severity="UNKNOWN",
                                     language=source.get('language', 'en'),
-                                    region="global" if source in GLOBAL_SOURCES else "latam"
+                                    region=region
                                 ))
                          except Exception:
                              pass
                 
             except Exception as e_page:
                 logger.error(f"Playwright page error on {source['name']}: {e_page}")
+                _record_error(e_page)
             finally:
                 browser.close()
                 
     except Exception as e:
         logger.error(f"Error initializing Playwright for {source['name']} ({url}): {e}")
+        _record_error(e)
     return items
 
 def fetch_html_requests(url: str, source: dict) -> list[NewsItem]:
     # Non-JS HTML scraping
+    from bs4 import BeautifulSoup
     items = []
     try:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
-        res = requests.get(url, headers=headers, timeout=15)
-        res.raise_for_status()
+        res = _download(url, headers=headers, timeout=_timeout(source, 15), rate=source.get('rate_limit'))
         
         soup = BeautifulSoup(res.text, 'html.parser')
         
@@ -244,9 +293,37 @@ def fetch_html_requests(url: str, source: dict) -> list[NewsItem]:
         
     except Exception as e:
         logger.error(f"Error fetching HTML from {source['name']} ({url}): {e}")
+        _record_error(e)
     return items
 
 def fetch_source(source: dict) -> list[NewsItem]:
+    return fetch_source_with_status(source)[0]
+
+def fetch_source_with_status(source: dict) -> tuple[list[NewsItem], bool]:
+    """
+    Returns (items, ok); ok is False if the fetcher logged an error or the
+    source's circuit is open (see source_health).
+    """
+    default_timeout = 30 if source.get('concurrency') == 'browser' else 15
+    allowed, timeout = source_health.before_fetch(source, default_timeout)
+    if not allowed:
+        logger.warning(f"Skipping {source['name']}: circuit open after repeated failures")
+        parent = instrumentation.current_span()
+        instrumentation.record("fetch", 0.0, parent=parent.name if parent else None,
+                               source=source['name'], type=source['type'], circuit="open", items=0)
+        return [], False
+    if timeout != source.get('timeout', default_timeout):
+        logger.info(f"{source['name']} is unhealthy, fetching with a {timeout:.0f}s timeout")
+        source = {**source, 'timeout': timeout}
+
+    with instrumentation.span("fetch", source=source['name'], type=source['type']) as s:
+        items = _fetch_source(source)
+        s.set("items", len(items))
+    ok = not s.attrs.get("errors")
+    source_health.record(source['name'], ok, s.duration, s.attrs.get("error", ""))
+    return items, ok
+
+def _fetch_source(source: dict) -> list[NewsItem]:
     logger.info(f"Fetching from {source['name']} ({source['type']})")
     
     # URL to fetch, default to RSS if available, otherwise base URL
@@ -259,19 +336,20 @@ def fetch_source(source: dict) -> list[NewsItem]:
     elif source['type'] == 'telegram_public':
         return fetch_telegram_public(fetch_url, source)
     elif source['type'] == 'html':
-        # Certain sites need Playwright
-        playwright_sites = ["Broadcom", "Stellar Cyber", "Fortinet"]
-        if any(ps in source['name'] for ps in playwright_sites):
+        # Certain sites need Playwright (concurrency class "browser" in the registry)
+        if source.get('concurrency') == 'browser':
             return fetch_html_playwright(fetch_url, source)
         else:
             return fetch_html_requests(fetch_url, source)
     else:
         logger.warning(f"Unknown source type '{source['type']}' for {source['name']}")
+        _record_error(ValueError(f"unknown source type '{source['type']}'"))
         return []
 
-def collect_all_sources() -> list[NewsItem]:
+def collect_all_sources(sources: list[dict] = None) -> list[NewsItem]:
     all_items = []
-    sources = GLOBAL_SOURCES + LATAM_SOURCES
+    if sources is None:
+        sources = source_registry.get_registry().sources
     
     for source in sources:
         items = fetch_source(source)
@@ -279,3 +357,60 @@ def collect_all_sources() -> list[NewsItem]:
         all_items.extend(items)
         
     return all_items
+
+def poll_source(source: dict) -> int:
+    """Fetches one source into the item store. Returns the number of items stored."""
+    items, ok = fetch_source_with_status(source)
+    stored = item_store.upsert_items(items)
+    item_store.record_poll(source['name'], len(items), ok)
+    logger.info(f"Polled {source['name']}: {len(items)} current-week items stored")
+    return stored
+
+def due_sources(sources: list[dict] = None, now: datetime = None) -> list[dict]:
+    """Sources never polled, or whose last poll is older than their poll_interval."""
+    if sources is None:
+        sources = source_registry.get_registry().sources
+    now = now or datetime.now(timezone.utc)
+    polls = item_store.last_polls()
+    return [
+        s for s in sources
+        if s['name'] not in polls
+        or now - polls[s['name']]['last_polled'] >= timedelta(minutes=s.get('poll_interval', 0))
+    ]
+
+def refresh_stale_sources(sources: list[dict] = None) -> int:
+    """
+    Polls every due source into the item store: HTTP sources concurrently,
+    browser (Playwright) sources one at a time. Returns the number of sources polled.
+    """
+    due = due_sources(sources)
+    if not due:
+        return 0
+    http = [s for s in due if s.get('concurrency', 'http') != 'browser']
+    browser = [s for s in due if s.get('concurrency') == 'browser']
+    logger.info(f"Refreshing {len(due)} due sources ({len(http)} http, {len(browser)} browser)")
+
+    parent = instrumentation.current_span()
+    parent_name = parent.name if parent else None
+
+    def poll(source):
+        with instrumentation.span("poll", parent=parent_name, source=source['name']):
+            return poll_source(source)
+
+    if profiling.enabled():
+        # cProfile only profiles the calling thread: poll here so fetch and parse show up
+        for s in http + browser:
+            try:
+                poll(s)
+            except Exception as e:
+                logger.error(f"Error polling source: {e}")
+        return len(due)
+
+    with ThreadPoolExecutor(max_workers=HTTP_POLL_WORKERS) as http_pool, ThreadPoolExecutor(max_workers=1) as browser_pool:
+        futures = [instrumentation.submit(http_pool, poll, s) for s in http] + [instrumentation.submit(browser_pool, poll, s) for s in browser]
+        for f in futures:
+            try:
+                f.result()
+            except Exception as e:
+                logger.error(f"Error polling source: {e}")
+    return len(due)
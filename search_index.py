@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, date, time, timedelta, timezone
+from typing import List, Optional
+
+from config import logger, ITEM_STORE_PATH, OUTPUT_DIR
+from models import Newsletter, SECTION_MODELS
+import item_store
+
+# Search over the item store's FTS5 indexes (see item_store.SEARCH_SCHEMA):
+# every collected item, and every entry of every generated newsletter.
+# Items are indexed by triggers as they are upserted; newsletters are indexed
+# by index_newsletter() after each synthesis.
+
+WEEK_RE = re.compile(r"(\d{4}-W\d{2})")
+
+@dataclass
+class SearchHit:
+    kind: str # "item" or "report"
+    title: str
+    snippet: str
+    source_name: str
+    url: str
+    when: str # item: published date; report: week label
+    cve_ids: List[str] = field(default_factory=list)
+    section: str = "" # report entries only
+
+def _phrase(text: str) -> str:
+    """Quotes user input as an FTS5 phrase, so operators and punctuation are matched literally."""
+    return '"' + text.replace('"', '""') + '"'
+
+def _match(query: str = "", cve: str = "", vendor: str = "", vendor_columns: str = "") -> str:
+    """FTS5 MATCH expression: every query word, the CVE in the cve_ids column, the vendor in `vendor_columns`."""
+    terms = [_phrase(word) for word in query.split()]
+    if cve:
+        terms.append(f"cve_ids : {_phrase(cve.strip().upper())}")
+    if vendor:
+        terms.append(f"{{{vendor_columns}}} : {_phrase(vendor.strip())}")
+    return " AND ".join(terms)
+
+def _day_start(d: date) -> str:
+    return datetime.combine(d, time.min, tzinfo=timezone.utc).isoformat()
+
+def _week_label(d: date) -> str:
+    year, week, _ = d.isocalendar()
+    return f"{year}-W{week:02d}"
+
+def search_items(query: str = "", cve: str = "", vendor: str = "", source: str = "",
+                 start: Optional[date] = None, end: Optional[date] = None, limit: int = 50,
+                 path: str = ITEM_STORE_PATH) -> List[SearchHit]:
+    """Stored items matching every given filter (dates inclusive), best match first, else newest first."""
+    match = _match(query, cve, vendor, "title summary")
+    where, params = [], []
+    if match:
+        where.append("items_fts MATCH ?")
+        params.append(match)
+    if source:
+        where.append("items.source_name = ?")
+        params.append(source)
+    if start:
+        where.append("items.published_date >= ?")
+        params.append(_day_start(start))
+    if end:
+        where.append("items.published_date < ?")
+        params.append(_day_start(end + timedelta(days=1)))
+
+    if match:
+        sql = """
+            SELECT items.*, snippet(items_fts, 1, '**', '**', '…', 16) AS snip
+            FROM items_fts JOIN items ON items.rowid = items_fts.rowid
+            WHERE {} ORDER BY bm25(items_fts) LIMIT ?
+        """
+    else:
+        sql = "SELECT items.*, substr(summary, 1, 160) AS snip FROM items WHERE {} ORDER BY published_date DESC LIMIT ?"
+    with item_store.connect(path) as conn:
+        rows = conn.execute(sql.format(" AND ".join(where) or "1"), (*params, limit)).fetchall()
+    return [
+        SearchHit("item", r["title"], r["snip"] or "", r["source_name"], r["url"],
+                  (r["published_date"] or "")[:10], json.loads(r["cve_ids"] or "[]"))
+        for r in rows
+    ]
+
+def search_reports(query: str = "", cve: str = "", vendor: str = "", source: str = "",
+                   start: Optional[date] = None, end: Optional[date] = None, limit: int = 50,
+                   path: str = ITEM_STORE_PATH) -> List[SearchHit]:
+    """Entries of past newsletters matching every given filter; dates select the weeks they cover."""
+    match = _match(query, cve, vendor, "title description products")
+    where, params = [], []
+    if match:
+        where.append("report_fts MATCH ?")
+        params.append(match)
+    if source:
+        where.append("e.source_name = ?")
+        params.append(source)
+    if start:
+        where.append("e.week >= ?") # ISO week labels sort chronologically
+        params.append(_week_label(start))
+    if end:
+        where.append("e.week <= ?")
+        params.append(_week_label(end))
+
+    if match:
+        sql = """
+            SELECT e.*, snippet(report_fts, 1, '**', '**', '…', 16) AS snip
+            FROM report_fts JOIN report_entries e ON e.entry_id = report_fts.rowid
+            WHERE {} ORDER BY bm25(report_fts) LIMIT ?
+        """
+    else:
+        sql = "SELECT e.*, substr(description, 1, 160) AS snip FROM report_entries e WHERE {} ORDER BY week DESC, entry_id LIMIT ?"
+    with item_store.connect(path) as conn:
+        rows = conn.execute(sql.format(" AND ".join(where) or "1"), (*params, limit)).fetchall()
+    return [
+        SearchHit("report", r["title"], r["snip"] or "", r["source_name"] or "", r["source_url"] or "",
+                  r["week"], json.loads(r["cve_ids"] or "[]"), r["section"])
+        for r in rows
+    ]
+
+def index_newsletter(newsletter: Newsletter, week: str, path: str = ITEM_STORE_PATH) -> int:
+    """Stores a generated newsletter and (re)indexes its entries, replacing that week's previous version."""
+    rows = []
+    for section in SECTION_MODELS:
+        for entry in getattr(newsletter, section):
+            rows.append((
+                week, section, entry.title, entry.description, entry.source_name, entry.source_url,
+                getattr(entry, "severity", ""), json.dumps(getattr(entry, "cve_ids", [])),
+                json.dumps(getattr(entry, "affected_products", []))
+            ))
+    item_store.store_report(week, newsletter.model_dump_json(), path)
+    with item_store.connect(path) as conn:
+        conn.execute("DELETE FROM report_entries WHERE week = ?", (week,))
+        conn.executemany("""
+            INSERT INTO report_entries (week, section, title, description, source_name, source_url, severity, cve_ids, products)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    return len(rows)
+
+def index_newsletter_safely(newsletter: Newsletter, week: str):
+    """
+    Pipeline hook: stores the newsletter (roll-ups read it back) and indexes it
+    when SQLite has FTS5. A failure is logged, never fatal to the run.
+    """
+    try:
+        if item_store.search_available():
+            logger.info(f"Indexed {index_newsletter(newsletter, week)} newsletter entries for search ({week})")
+        else:
+            item_store.store_report(week, newsletter.model_dump_json())
+    except Exception as e:
+        logger.error(f"Failed to store the newsletter for search and roll-ups: {e}")
+
+def rebuild(output_dir: str = OUTPUT_DIR, path: str = ITEM_STORE_PATH) -> int:
+    """
+    Rebuilds the item index from the items table and indexes the newsletter
+    JSON found in `output_dir` (fallback dumps) for weeks not indexed yet.
+    Returns the number of newsletters imported.
+    """
+    with item_store.connect(path) as conn:
+        conn.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+        indexed = {r["week"] for r in conn.execute("SELECT week FROM reports")}
+
+    imported = 0
+    for name in sorted(os.listdir(output_dir)) if os.path.isdir(output_dir) else []:
+        week = WEEK_RE.search(name)
+        if not name.startswith("cyber_newsletter_") or not name.endswith((".json", ".txt")) or not week:
+            continue
+        if week.group(1) in indexed:
+            continue
+        try:
+            with open(os.path.join(output_dir, name), encoding="utf-8") as f:
+                newsletter = Newsletter.model_validate(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping {name}: not newsletter JSON ({e})")
+            continue
+        index_newsletter(newsletter, week.group(1), path)
+        indexed.add(week.group(1))
+        imported += 1
+    return imported
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-text search over stored items and past newsletters")
+    parser.add_argument("query", nargs="*", help="Words to match")
+    parser.add_argument("--cve")
+    parser.add_argument("--vendor")
+    parser.add_argument("--source")
+    parser.add_argument("--since", type=date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("--until", type=date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("--reports", action="store_true", help="Search newsletter entries instead of items")
+    parser.add_argument("--rebuild", action="store_true", help=f"Rebuild the item index and import newsletter JSON from {OUTPUT_DIR}")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        logger.info(f"Search index rebuilt, {rebuild()} newsletter(s) imported")
+    else:
+        search = search_reports if args.reports else search_items
+        for hit in search(" ".join(args.query), args.cve or "", args.vendor or "", args.source or "", args.since, args.until):
+            print(f"{hit.when}  {hit.title}  [{hit.source_name}]  {hit.url}")
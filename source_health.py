@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Tuple
+
+from config import logger, SOURCE_HEALTH_PATH
+from utils import atomic_write
+
+# Per-source circuit breaker. Every fetch outcome (ok + latency) goes into a
+# rolling window; a source that keeps failing is "open" and skipped until its
+# cooldown passes, then gets one "half_open" probe with a shortened timeout.
+# State is persisted to JSON so it carries over between runs and processes.
+
+WINDOW = 20 # fetch outcomes kept per source
+FAILURE_THRESHOLD = 3 # consecutive failures that open the circuit
+DEGRADED_ERROR_RATE = 0.5 # rolling error rate above which timeouts are shortened
+BASE_COOLDOWN = 30 * 60 # seconds; doubles on every failed probe
+MAX_COOLDOWN = 24 * 3600
+MIN_TIMEOUT = 5.0 # seconds
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+@dataclass
+class SourceHealth:
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    cooldown: float = BASE_COOLDOWN
+    outcomes: List[Tuple[bool, float]] = field(default_factory=list) # (ok, latency seconds), oldest first
+    last_error: str = ""
+    last_checked: float = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+
+    def latency_p90(self) -> Optional[float]:
+        """90th percentile latency of successful fetches, if any."""
+        latencies = sorted(latency for ok, latency in self.outcomes if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+
+    def score(self, timeout: float) -> int:
+        """0-100: success rate, discounted by how close successful fetches run to the timeout."""
+        if not self.outcomes:
+            return 100
+        p90 = self.latency_p90()
+        slowness = min((p90 or timeout) / timeout, 1.0)
+        return round(100 * (1 - self.error_rate) * (1 - 0.5 * slowness))
+
+_lock = threading.Lock()
+_health: Dict[str, SourceHealth] = {}
+_loaded_mtime: Optional[float] = None
+
+def _load_locked():
+    """(Re)loads the state file if another process has written it since we last read it."""
+    global _health, _loaded_mtime
+    try:
+        mtime = os.path.getmtime(SOURCE_HEALTH_PATH)
+    except OSError:
+        return
+    if mtime == _loaded_mtime:
+        return
+    try:
+        with open(SOURCE_HEALTH_PATH, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        _health = {
+            name: SourceHealth(**{**h, "outcomes": [tuple(o) for o in h.get("outcomes", [])]})
+            for name, h in raw.items()
+        }
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f"Could not read source health state from {SOURCE_HEALTH_PATH}: {e}")
+    _loaded_mtime = mtime
+
+def _save_locked():
+    global _loaded_mtime
+    try:
+        with atomic_write(SOURCE_HEALTH_PATH) as f:
+            json.dump({name: asdict(h) for name, h in _health.items()}, f, indent=2)
+        _loaded_mtime = os.path.getmtime(SOURCE_HEALTH_PATH)
+    except OSError as e:
+        logger.warning(f"Could not persist source health state: {e}")
+
+def before_fetch(source: dict, default_timeout: float) -> Tuple[bool, float]:
+    """
+    Returns (allowed, timeout) for the next fetch of `source`. Open circuits are
+    skipped until their cooldown passes; probes and degraded sources get a
+    timeout shortened to twice their p90 latency.
+    """
+    timeout = source.get("timeout", default_timeout)
+    with _lock:
+        _load_locked()
+        health = _health.get(source["name"])
+        if health is None:
+            return True, timeout
+
+        if health.state == OPEN:
+            if time.time() - health.opened_at < health.cooldown:
+                return False, timeout
+            health.state = HALF_OPEN
+            logger.info(f"Circuit for {source['name']} half-open: probing")
+
+        if health.state == HALF_OPEN or health.error_rate > DEGRADED_ERROR_RATE:
+            p90 = health.latency_p90()
+            timeout = max(MIN_TIMEOUT, min(timeout, 2 * p90)) if p90 else max(MIN_TIMEOUT, timeout / 2)
+        return True, timeout
+
+def record(source_name: str, ok: bool, latency: float, error: str = ""):
+    """Feeds one fetch outcome into the breaker and persists the new state."""
+    with _lock:
+        _load_locked()
+        health = _health.setdefault(source_name, SourceHealth())
+        health.outcomes = (health.outcomes + [(ok, round(latency, 3))])[-WINDOW:]
+        health.last_checked = time.time()
+
+        if ok:
+            if health.state != CLOSED:
+                logger.info(f"Circuit for {source_name} closed: source recovered")
+            health.state = CLOSED
+            health.consecutive_failures = 0
+            health.cooldown = BASE_COOLDOWN
+        else:
+            health.consecutive_failures += 1
+            health.last_error = error[:300]
+            if health.state in (HALF_OPEN, OPEN):
+                # Failed probe: stay open for longer
+                health.cooldown = min(health.cooldown * 2, MAX_COOLDOWN)
+                health.state, health.opened_at = OPEN, time.time()
+                logger.warning(f"Circuit for {source_name} re-opened after failed probe (cooldown {health.cooldown / 60:.0f} min)")
+            elif health.state == CLOSED and health.consecutive_failures >= FAILURE_THRESHOLD:
+                health.state, health.opened_at = OPEN, time.time()
+                logger.warning(f"Circuit for {source_name} opened after {health.consecutive_failures} consecutive failures")
+        _save_locked()
+
+def snapshot(sources: List[dict] = None) -> List[dict]:
+    """Health rows for display, one per known source (or per given source)."""
+    with _lock:
+        _load_locked()
+        names = [s["name"] for s in sources] if sources is not None else sorted(_health)
+        timeouts = {s["name"]: s.get("timeout", 15) for s in sources or []}
+        rows = []
+        for name in names:
+            health = _health.get(name, SourceHealth())
+            p90 = health.latency_p90()
+            rows.append({
+                "source": name,
+                "state": health.state,
+                "score": health.score(timeouts.get(name, 15)),
+                "error_rate": round(health.error_rate, 2),
+                "p90_latency_s": p90,
+                "fetches": len(health.outcomes),
+                "retry_in_min": round(max(0.0, health.opened_at + health.cooldown - time.time()) / 60)
+                    if health.state == OPEN else 0,
+                "last_error": health.last_error,
+            })
+        return rows
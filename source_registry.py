@@ -0,0 +1,122 @@
+import os
+import threading
+from typing import List, Optional
+
+import yaml
+
+from config import logger, SOURCES_FILE
+
+SOURCE_TYPES = ("rss", "xml", "telegram_public", "html")
+CONCURRENCY_CLASSES = ("http", "browser")
+REGIONS = ("global", "latam")
+
+BUILTIN_DEFAULTS = {
+    "poll_interval": 180, # minutes
+    "timeout": 15, # seconds
+    "concurrency": "http",
+    "priority": 50,
+    "enabled": True,
+    "language": "en",
+    "region": "global",
+}
+
+class RegistryError(ValueError):
+    pass
+
+def parse_registry(data: dict) -> List[dict]:
+    """Validates a registry document and returns the source dicts with defaults applied."""
+    if not isinstance(data, dict) or not isinstance(data.get("sources"), list):
+        raise RegistryError("Registry must be a mapping with a 'sources' list")
+
+    defaults = {**BUILTIN_DEFAULTS, **(data.get("defaults") or {})}
+    sources = []
+    names = set()
+    for i, entry in enumerate(data["sources"]):
+        if not isinstance(entry, dict):
+            raise RegistryError(f"Source #{i} is not a mapping")
+        source = {**defaults, **entry}
+        for key in ("name", "url", "type"):
+            if not source.get(key):
+                raise RegistryError(f"Source #{i} is missing '{key}'")
+        if source["name"] in names:
+            raise RegistryError(f"Duplicate source name '{source['name']}'")
+        if source["type"] not in SOURCE_TYPES:
+            raise RegistryError(f"Source '{source['name']}' has unknown type '{source['type']}'")
+        if source["concurrency"] not in CONCURRENCY_CLASSES:
+            raise RegistryError(f"Source '{source['name']}' has unknown concurrency class '{source['concurrency']}'")
+        if source["region"] not in REGIONS:
+            raise RegistryError(f"Source '{source['name']}' has unknown region '{source['region']}'")
+        try:
+            source["poll_interval"] = float(source["poll_interval"])
+            source["timeout"] = float(source["timeout"])
+            source["priority"] = int(source["priority"])
+            if source.get("rate_limit") is not None:
+                source["rate_limit"] = float(source["rate_limit"])
+        except (TypeError, ValueError) as e:
+            raise RegistryError(f"Source '{source['name']}' has a non-numeric setting: {e}")
+        rate_limit = source.get("rate_limit")
+        if source["poll_interval"] <= 0 or source["timeout"] <= 0 or (rate_limit is not None and rate_limit <= 0):
+            raise RegistryError(f"Source '{source['name']}' needs a positive poll_interval, timeout and rate_limit")
+        names.add(source["name"])
+        sources.append(source)
+
+    # Highest priority first; stable for equal priorities (file order)
+    sources.sort(key=lambda s: -s["priority"])
+    return sources
+
+class SourceRegistry:
+    """
+    Sources loaded from the registry file. reload_if_changed() re-reads the file
+    when its mtime changes; an invalid edit is logged and the previous sources kept.
+    """
+
+    def __init__(self, path: str = SOURCES_FILE):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._sources: List[dict] = []
+        self._lock = threading.Lock()
+        self.reload_if_changed(force=True)
+
+    @property
+    def sources(self) -> List[dict]:
+        """Enabled sources, highest priority first."""
+        return [s for s in self._sources if s["enabled"]]
+
+    def get(self, name: str) -> Optional[dict]:
+        return next((s for s in self._sources if s["name"] == name), None)
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """Returns True if the registry was (re)loaded."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            if force:
+                raise RegistryError(f"Source registry not found at {self.path}: {e}")
+            return False
+        if not force and mtime == self._mtime:
+            return False
+
+        with self._lock:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    sources = parse_registry(yaml.safe_load(f))
+            except (yaml.YAMLError, RegistryError) as e:
+                if force:
+                    raise RegistryError(f"Invalid source registry {self.path}: {e}")
+                logger.error(f"Ignoring invalid source registry edit in {self.path}: {e}")
+                self._mtime = mtime
+                return False
+            self._sources = sources
+            self._mtime = mtime
+        logger.info(f"Loaded {len(self.sources)} enabled sources from {self.path}")
+        return True
+
+_registry: Optional[SourceRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> SourceRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SourceRegistry()
+        return _registry
@@ -5,15 +5,17 @@ import logging
 
 from config import logger, TIMEZONE
 import scraper
+import source_registry
 import ai_synthesizer
 import pdf_generator
 import whatsapp_formatter
 from utils import NewsItem, deduplicate_items, get_week_label
+from models import Newsletter
 
 def mock_scrape():
     # Only scrape 2 fast sources to test the pipeline quickly
     fast_sources = [
-        s for s in scraper.GLOBAL_SOURCES + scraper.LATAM_SOURCES 
+        s for s in source_registry.get_registry().sources
         if s['type'] in ('rss', 'telegram_public')
     ][:2]
     
@@ -48,19 +50,14 @@ def test_pipeline():
     print(f"Sending {len(test_subset)} items to Gemini...")
     newsletter_data = ai_synthesizer.synthesize(test_subset)
     
-    # Debug schema
+    # Debug schema (synthesize always returns a validated Newsletter)
     print("AI Response Schema Validation Check:")
-    required_keys = ['week_label', 'executive_summary', 'critical_alerts', "stats"]
-    for k in required_keys:
-        if k in newsletter_data:
-             print(f"✓ Key '{k}' present.")
-        else:
-             print(f"✗ MISSING KEY '{k}'!")
+    print(f"✓ Validated {type(newsletter_data).__name__}: {len(newsletter_data.critical_alerts)} critical alerts, stats={newsletter_data.stats.model_dump()}")
              
-    # Fallback to pure dummy data if no key present (e.g. no API key in env)
-    if 'executive_summary' not in newsletter_data or newsletter_data.get('executive_summary', '').startswith('RAW DIGEST'):
+    # Fallback to pure dummy data if AI was unavailable (e.g. no API key in env)
+    if newsletter_data.executive_summary.startswith('RAW DIGEST'):
          print("Using mock data to test PDF generation layout properly...")
-         newsletter_data = {
+         newsletter_data = Newsletter.model_validate({
             "week_label": f"Week of {get_week_label(TIMEZONE)}",
             "executive_summary": "This is a dummy executive summary for testing the layout of the PDF.",
             "critical_alerts": [
@@ -93,7 +90,7 @@ def test_pipeline():
                 "sources_scraped": 2,
                 "cves_identified": 1
             }
-         }
+         })
              
     print(f"\n--- 3. Testing PDF Generation ---")
     pdf_path = pdf_generator.generate(newsletter_data)
@@ -1,5 +1,8 @@
+import os
 import pytz
-from datetime import datetime, date
+import tempfile
+from contextlib import contextmanager, suppress
+from datetime import datetime, date, timedelta
 from dataclasses import dataclass, field
 import hashlib
 from typing import List, Optional
@@ -17,9 +20,14 @@ class NewsItem:
     category: str = "UNKNOWN"
     language: str = "en"
     region: str = "global"
+    # Filled in from the local CVE index (cve_index.enrich)
+    cvss: Optional[float] = None
+    kev: bool = False
+    cwe_ids: List[str] = field(default_factory=list)
+    affected_products: List[str] = field(default_factory=list)
 
     def to_dict(self):
-        return {
+        data = {
             "source_name": self.source_name,
             "title": self.title,
             "summary": self.summary[:500] if self.summary else "",
@@ -31,11 +39,28 @@ class NewsItem:
             "language": self.language,
             "region": self.region
         }
+        # Only enriched items carry these, keeping the prompt small for the rest
+        if self.cvss is not None:
+            data["cvss"] = self.cvss
+        if self.kev:
+            data["known_exploited"] = True
+        if self.affected_products:
+            data["affected_products"] = self.affected_products
+        return data
 
-def is_current_week(pub_date: datetime, tz_name: str) -> bool:
+def local_now(tz_name: str, now: Optional[datetime] = None) -> datetime:
+    """`now` (default: the current time) as an aware datetime in the given timezone; naive values are taken as local."""
+    tz = pytz.timezone(tz_name)
+    if now is None:
+        return datetime.now(tz)
+    if isinstance(now, date) and not isinstance(now, datetime):
+        now = datetime.combine(now, datetime.min.time())
+    return tz.localize(now) if now.tzinfo is None else now.astimezone(tz)
+
+def is_current_week(pub_date: datetime, tz_name: str, now: Optional[datetime] = None) -> bool:
     """
-    Checks if a given datetime falls within the current ISO week in the configured timezone.
-    Monday 00:00:00 to Sunday 23:59:59 local time.
+    Checks if a given datetime falls within the ISO week of `now` (default: the
+    current week) in the configured timezone. Monday 00:00:00 to Sunday 23:59:59 local time.
     """
     if pub_date is None:
         return False
@@ -52,8 +77,8 @@ def is_current_week(pub_date: datetime, tz_name: str) -> bool:
     # Convert to local timezone
     local_pub_date = pub_date.astimezone(tz)
     
-    # Get current time in local timezone
-    now_local = datetime.now(tz)
+    # Reference time in local timezone
+    now_local = local_now(tz.zone, now)
     
     # Compare ISO calendar week (year, week_num, weekday)
     pub_iso = local_pub_date.isocalendar()
@@ -92,18 +117,132 @@ def extract_cves(text: str) -> List[str]:
     # Deduplicate and uppercase
     return list(set(m.upper() for m in matches))
 
-def get_week_label(tz_name: str) -> str:
-    tz = pytz.timezone(tz_name)
-    now_local = datetime.now(tz)
-    return f"{now_local.strftime('%Y')}-W{now_local.isocalendar()[1]:02d}"
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref"}
+TRACKING_PREFIX = "utm_"
+
+def canonical_url(url: str) -> str:
+    """
+    Normalizes a URL for identity checks: lowercase scheme/host without "www.",
+    no fragment, tracking parameters or trailing slash, query keys sorted.
+    """
+    from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIX)
+    )
+    return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip("/") or "/", urlencode(query), ""))
 
-def get_week_date_range(tz_name: str) -> str:
+def get_week_label(tz_name: str, now: Optional[datetime] = None) -> str:
+    # ISO year, so the last days of December can belong to week 1 of the next year
+    iso = local_now(tz_name, now).isocalendar()
+    return f"{iso[0]}-W{iso[1]:02d}"
+
+def week_bounds(tz_name: str, now: Optional[datetime] = None):
+    """(start, end) of the ISO week of `now` (default: current week): Monday 00:00 to next Monday 00:00."""
+    period = period_for("week", tz_name, now)
+    return period.start, period.end
+
+def get_week_date_range(tz_name: str, now: Optional[datetime] = None) -> str:
     from dateutil.relativedelta import relativedelta, MO, SU
-    tz = pytz.timezone(tz_name)
-    now_local = datetime.now(tz)
+    now_local = local_now(tz_name, now)
     
     # Get Monday and Sunday of the current week
     monday = now_local + relativedelta(weekday=MO(-1))
     sunday = now_local + relativedelta(weekday=SU(1))
     
     return f"{monday.strftime('%b %d')} - {sunday.strftime('%b %d, %Y')}"
+
+PERIOD_KINDS = ("week", "month", "quarter")
+
+@dataclass(frozen=True)
+class Period:
+    """A reporting period in the configured timezone: [start, end)."""
+    kind: str  # week | month | quarter
+    label: str # 2025-W03 | 2025-01 | 2025-Q1 (sorts chronologically within a kind)
+    start: datetime
+    end: datetime
+
+    @property
+    def date_range(self) -> str:
+        last = self.end - timedelta(days=1)
+        return f"{self.start.strftime('%b %d')} - {last.strftime('%b %d, %Y')}"
+
+    @property
+    def title(self) -> str:
+        if self.kind == "week":
+            return f"Week of {self.date_range}"
+        if self.kind == "month":
+            return self.start.strftime("%B %Y")
+        return f"Q{(self.start.month - 1) // 3 + 1} {self.start.year}"
+
+    def week_labels(self) -> List[str]:
+        """ISO weeks belonging to this period: those whose Thursday falls inside it (the ISO rule)."""
+        monday = self.start.date() - timedelta(days=self.start.weekday())
+        labels = []
+        while monday < self.end.date():
+            thursday = monday + timedelta(days=3)
+            if self.start.date() <= thursday < self.end.date():
+                iso = thursday.isocalendar()
+                labels.append(f"{iso[0]}-W{iso[1]:02d}")
+            monday += timedelta(days=7)
+        return labels
+
+def period_for(kind: str, tz_name: str, now: Optional[datetime] = None) -> Period:
+    """The week, month or quarter containing `now` (default: the current time)."""
+    tz = pytz.timezone(tz_name)
+    day = local_now(tz_name, now).date()
+    if kind == "week":
+        first = day - timedelta(days=day.weekday())
+        after = first + timedelta(days=7)
+        iso = first.isocalendar()
+        label = f"{iso[0]}-W{iso[1]:02d}"
+    elif kind == "month":
+        first = day.replace(day=1)
+        after = (first + timedelta(days=32)).replace(day=1)
+        label = first.strftime("%Y-%m")
+    elif kind == "quarter":
+        first = date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+        after = (first + timedelta(days=95)).replace(day=1)
+        label = f"{first.year}-Q{(first.month - 1) // 3 + 1}"
+    else:
+        raise ValueError(f"Unknown period kind {kind!r}, expected one of {PERIOD_KINDS}")
+    start = tz.localize(datetime.combine(first, datetime.min.time()))
+    end = tz.localize(datetime.combine(after, datetime.min.time()))
+    return Period(kind, label, start, end)
+
+def periods_between(kind: str, first: date, last: date, tz_name: str) -> List[Period]:
+    """Every period of `kind` overlapping the days first..last (inclusive), oldest first."""
+    periods = []
+    period = period_for(kind, tz_name, first)
+    while period.start.date() <= last:
+        periods.append(period)
+        period = period_for(kind, tz_name, period.end.date())
+    return periods
+
+# Process umask, read once at import (os.umask can only be read by setting it,
+# which is not thread-safe): outputs get the usual 0666 & ~umask permissions
+# instead of mkstemp's 0600.
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", encoding: Optional[str] = "utf-8"):
+    """
+    Streams writes into a temp file next to `path` and atomically renames it
+    over `path` on success, so readers never see a half-written output.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else encoding) as f:
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp_path)
+        raise
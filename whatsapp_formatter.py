@@ -1,78 +1,185 @@
 import os
-from config import logger, OUTPUT_DIR, TIMEZONE
-from utils import get_week_label
+from typing import Iterable, Iterator, List, Tuple
+from config import logger, OUTPUT_DIR, TIMEZONE, WHATSAPP_MAX_CHARS
+from utils import get_week_label, atomic_write
+from models import Newsletter
+
+DIVIDER = "─────────────────────────────"
+PART_SEPARATOR = "\n\n✂️ ─────────── ✂️\n\n" # between messages in the .txt file
+PART_MARKER_RESERVE = 12 # room for the "_(12/34)_\n" marker added to each message
 
 def truncate_text(text: str, max_len: int = 150) -> str:
-    if len(text) > max_len:
-        return text[:max_len] + "..."
-    return text
+    """Shortens at a word boundary so URLs and emoji sequences are never cut in half."""
+    if len(text) <= max_len:
+        return text
+    cut = text.rfind(" ", 0, max_len)
+    return text[:cut if cut > 0 else max_len].rstrip() + "..."
+
+def wa_len(text: str) -> int:
+    """Length as WhatsApp counts it (UTF-16 code units: most emoji count as 2)."""
+    return len(text.encode("utf-16-le")) // 2
+
+def _alert_block(i: int, alert) -> str:
+    severity = f"Severidad: *{alert.severity}*"
+    if alert.cvss is not None:
+        severity += f" (CVSS {alert.cvss})"
+    title = f"*{i}. {alert.title}*" + (" _(actualizado)_" if alert.change == "updated" else "")
+    lines = [title, severity]
+    if alert.kev:
+        lines.append("⚠️ *Explotada activamente (CISA KEV)*")
+    if alert.affected_products:
+        lines.append("Afecta: " + ", ".join(alert.affected_products[:5]))
+    if alert.cve_ids:
+        lines.append("CVEs: " + ", ".join(f"`{c}`" for c in alert.cve_ids))
+    if alert.description:
+        lines.append(truncate_text(alert.description))
+    lines.append(f"🔗 {alert.source_url}")
+    return "\n".join(lines)
+
+def _breach_block(i: int, breach) -> str:
+    lines = [f"*{i}. {breach.title}*"]
+    if breach.impact:
+        lines.append(f"Impacto: {truncate_text(breach.impact, 100)}")
+    if breach.description:
+        lines.append(truncate_text(breach.description))
+    lines.append(f"🔗 {breach.source_url}")
+    return "\n".join(lines)
+
+def _latam_block(i: int, item) -> str:
+    lines = [f"*{item.title}*"]
+    if item.description:
+        lines.append(truncate_text(item.description))
+    lines.append(f"🔗 {item.source_url}")
+    return "\n".join(lines)
+
+def _blocks(data: Newsletter) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (section heading, block) in message order. A block is the unit that
+    is never split across messages: one item, a heading, the stats or the footer.
+    """
+    yield "", "\n".join([
+        f"*🔐 CYBER INTEL WEEKLY — {data.week_label}*",
+        "_Powered by verified public sources only_",
+        DIVIDER,
+    ])
+
+    sections = [
+        ("*🚨 ALERTAS CRÍTICAS / CRITICAL ALERTS*", data.critical_alerts, _alert_block),
+        ("*🛠️ VULNERABILIDADES Y PARCHES / VULNERABILITIES & PATCHES*", data.vulnerabilities_and_patches, _alert_block),
+        ("*💥 BRECHAS E INCIDENTES / BREACHES & INCIDENTS*", data.breaches_and_incidents, _breach_block),
+        ("*🇻🇪 VENEZUELA / LATAM*", data.latam_venezuela_intelligence, _latam_block),
+    ]
+    for heading, entries, render in sections:
+        if not entries:
+            continue
+        yield heading, heading
+        for i, entry in enumerate(entries, 1):
+            yield heading, render(i, entry)
+        yield "", DIVIDER
+
+    if data.still_open:
+        heading = "*⏳ SIGUEN ABIERTAS / STILL OPEN*"
+        yield heading, heading
+        for item in data.still_open:
+            cves = f" ({', '.join(item.cve_ids)})" if item.cve_ids else ""
+            kev = " ⚠️KEV" if item.kev else ""
+            yield heading, f"• [{item.severity}{kev}] {item.title}{cves} — desde {item.first_reported}\n🔗 {item.source_url}"
+        yield "", DIVIDER
 
-def generate(data: dict) -> str:
-    """Generates a WhatsApp-formatted text summary."""
+    stats = data.stats
+    stats_lines = [
+        "*📊 ESTADÍSTICAS DE LA SEMANA*",
+        f"Total alertas: {stats.total_items_analyzed} | Críticas: {stats.critical_count} | CVEs: {stats.cves_identified}",
+    ]
+    if stats.updated_count or stats.carried_over_count:
+        stats_lines.append(f"Nuevas: {stats.new_count} | Actualizadas: {stats.updated_count} | Siguen abiertas: {stats.carried_over_count}")
+    yield "", "\n".join(stats_lines)
+    yield "", "\n".join([
+        DIVIDER,
+        "_⚠️ Solo información de fuentes públicas verificadas._",
+        "_No generado con información fabricada por IA._",
+    ])
+
+def _fit(block: str, limit: int) -> Iterable[str]:
+    """Splits a block that alone exceeds `limit` at line, then word boundaries."""
+    if wa_len(block) <= limit:
+        yield block
+        return
+    piece, size = [], 0
+    for token in block.replace("\n", "\n ").split(" "):
+        token_len = wa_len(token) + 1
+        if piece and size + token_len > limit:
+            yield " ".join(piece).replace("\n ", "\n").strip()
+            piece, size = [], 0
+        piece.append(token)
+        size += token_len
+    if piece:
+        yield " ".join(piece).replace("\n ", "\n").strip()
+
+def build_messages(data: Newsletter, limit: int = WHATSAPP_MAX_CHARS) -> List[str]:
+    """
+    Splits the newsletter into WhatsApp messages of at most `limit` characters,
+    only at block boundaries. Single pass: running lengths are tracked per
+    message and each message is joined once. A message that starts mid-section
+    repeats the section heading; every message gets a "(n/total)" marker when
+    there is more than one.
+    """
+    budget = limit - PART_MARKER_RESERVE
+    messages: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for heading, block in _blocks(data):
+        pieces = list(_fit(block, budget))
+        while pieces:
+            piece = pieces.pop(0)
+            piece_len = wa_len(piece) + 2 # "\n\n" joiner
+            if current and size + piece_len > budget:
+                carry = []
+                if heading and current[-1] == heading:
+                    carry = [current.pop()] # never leave a heading at the end of a message
+                elif heading and piece != heading:
+                    carry = [f"{heading} _(cont.)_"]
+                if current:
+                    messages.append(current)
+                current, size = carry, sum(wa_len(c) + 2 for c in carry)
+                if carry and size + piece_len > budget:
+                    # The carried heading takes room too: re-split the piece to fit after it
+                    room = budget - size - 2
+                    fitted = list(_fit(piece, room)) if room >= budget // 2 or current[0] == heading else []
+                    if fitted and wa_len(fitted[0]) <= room:
+                        piece, pieces[:0] = fitted[0], fitted[1:]
+                        piece_len = wa_len(piece) + 2
+                    elif current[0] != heading:
+                        current, size = [], 0 # drop the "(cont.)" line rather than overflow
+                    else:
+                        messages.append(current) # heading and piece can't share a message
+                        current, size = [], 0
+            current.append(piece)
+            size += piece_len
+    if current:
+        messages.append(current)
+
+    total = len(messages)
+    if total == 1:
+        return ["\n\n".join(messages[0])]
+    return [f"_({n}/{total})_\n" + "\n\n".join(parts) for n, parts in enumerate(messages, 1)]
+
+def generate(data: Newsletter, filepath: str = None, limit: int = WHATSAPP_MAX_CHARS) -> str:
+    """Writes the WhatsApp messages (separated by PART_SEPARATOR) and returns the file path."""
     logger.info("Generating WhatsApp summary text")
-    
-    lines = []
-    
-    # Header
-    week = data.get('week_label', 'Current Week')
-    lines.append(f"*🔐 CYBER INTEL WEEKLY — {week}*")
-    lines.append("_Powered by verified public sources only_")
-    lines.append("─────────────────────────────\n")
-    
-    # Critical Alerts
-    criticals = data.get('critical_alerts', [])
-    if criticals:
-        lines.append("*🚨 ALERTAS CRÍTICAS / CRITICAL ALERTS*")
-        for i, alert in enumerate(criticals, 1):
-            if i > 5: # Limit top alerts to fit WA length
-                break
-            lines.append(f"\n*{i}. {alert.get('title')}*")
-            lines.append(f"Severidad: *{alert.get('severity')}*")
-            
-            cves = alert.get('cve_ids', [])
-            if cves:
-                cve_str = ", ".join([f"`{c}`" for c in cves])
-                lines.append(f"CVEs: {cve_str}")
-                
-            lines.append(truncate_text(alert.get('description', '')))
-            lines.append(f"🔗 {alert.get('source_url')}")
-            
-        lines.append("\n─────────────────────────────\n")
-        
-    # LATAM Section
-    latams = data.get('latam_venezuela_intelligence', [])
-    if latams:
-        lines.append("*🇻🇪 VENEZUELA / LATAM*\n")
-        for i, item in enumerate(latams, 1):
-            if i > 5:
-                break
-            lines.append(f"*{item.get('title')}*")
-            lines.append(truncate_text(item.get('description', '')))
-            lines.append(f"🔗 {item.get('source_url')}\n")
-            
-        lines.append("─────────────────────────────\n")
-        
-    # Stats
-    stats = data.get('stats', {})
-    lines.append("*📊 ESTADÍSTICAS DE LA SEMANA*")
-    lines.append(f"Total alertas: {stats.get('total_items_analyzed', 0)} | Críticas: {stats.get('critical_count', 0)} | CVEs: {stats.get('cves_identified', 0)}\n")
-    
-    lines.append("─────────────────────────────")
-    lines.append("_⚠️ Solo información de fuentes públicas verificadas._")
-    lines.append("_No generado con información fabricada por IA._")
-    
-    text = "\n".join(lines)
-    
-    # Split if too long (WhatsApp limit is ~4096)
-    if len(text) > 4000:
-        logger.warning("WhatsApp text exceeds 4000 chars. Truncating.")
-        text = text[:3900] + "\n\n...[TRUNCATED ALERTS, SEE FULL PDF]...\n\n_⚠️ Solo información de fuentes públicas verificadas._"
-
-    filename = f"whatsapp_cyber_{get_week_label(TIMEZONE)}.txt"
-    filepath = os.path.join(OUTPUT_DIR, filename)
-    
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(text)
-        
+    messages = build_messages(data, limit)
+    if len(messages) > 1:
+        logger.info(f"WhatsApp summary split into {len(messages)} messages of at most {limit} chars")
+
+    if filepath is None:
+        filename = f"whatsapp_cyber_{get_week_label(TIMEZONE)}.txt"
+        filepath = os.path.join(OUTPUT_DIR, filename)
+
+    with atomic_write(filepath) as f:
+        for n, message in enumerate(messages):
+            if n:
+                f.write(PART_SEPARATOR)
+            f.write(message)
+
     logger.info(f"WhatsApp text generated at {filepath}")
     return filepath